@@ -4,6 +4,7 @@ Academic-friendly admin interface
 """
 from django.contrib import admin
 from .models import Profile, Position, Candidate, Vote
+from .results import annotate_position_tallies, annotate_candidate_tallies, calculate_percentage
 
 
 @admin.register(Profile)
@@ -43,15 +44,21 @@ class PositionAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Annotate vote and candidate counts to avoid per-row queries"""
+        return annotate_position_tallies(super().get_queryset(request))
+    
     def candidates_count(self, obj):
         """Display number of candidates"""
-        return obj.get_candidates_count()
+        return obj.tally_candidates_count
     candidates_count.short_description = 'Candidates'
+    candidates_count.admin_order_field = 'tally_candidates_count'
     
     def total_votes(self, obj):
         """Display total votes"""
-        return obj.get_total_votes()
+        return obj.tally_total_votes
     total_votes.short_description = 'Total Votes'
+    total_votes.admin_order_field = 'tally_total_votes'
 
 
 @admin.register(Candidate)
@@ -72,14 +79,20 @@ class CandidateAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Annotate vote counts to avoid per-row queries"""
+        queryset = super().get_queryset(request).select_related('position')
+        return annotate_candidate_tallies(queryset)
+    
     def vote_count(self, obj):
         """Display vote count"""
-        return obj.get_vote_count()
+        return obj.tally_vote_count
     vote_count.short_description = 'Votes'
+    vote_count.admin_order_field = 'tally_vote_count'
     
     def vote_percentage(self, obj):
         """Display vote percentage"""
-        return f"{obj.get_vote_percentage()}%"
+        return f"{calculate_percentage(obj.tally_vote_count, obj.tally_position_votes)}%"
     vote_percentage.short_description = 'Percentage'
 
 
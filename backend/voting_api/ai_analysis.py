@@ -3,226 +3,633 @@ AI Analysis Module using Groq API
 Lightweight LLM-based analysis for voting insights
 Academic Project: Focus on explainable AI, not heavy ML
 """
+import contextvars
 import os
-from typing import Dict, List, Any
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 from django.conf import settings
-from .models import Position, Candidate, Vote
-from django.contrib.auth.models import User
+from .models import Position
+from .results import compute_position_results, compute_overall_stats, get_results_version
+from . import groq_client, llm_cache, metrics, model_router
+from .instrumentation import timed
+from .analytics import analyze_races
+from .forecast import forecast_tallies, get_forecast
+from .prompt_budget import estimate_tokens, fold_candidates
+
+# Bump when a prompt template changes so cached analyses are regenerated
+PROMPT_VERSION = 5
+
+UNAVAILABLE_MESSAGE = "AI analysis unavailable: Groq API key not configured. Please set GROQ_API_KEY in your .env file."
+
+
+class LLMUnavailable(Exception):
+    """No Groq client is configured"""
 
 
 def get_groq_client():
     """
-    Get Groq API client
+    Get the process-wide Groq API client (pooled connections, timeouts,
+    retries and circuit breaker; see groq_client.py)
     Returns None if API key is not configured
     """
-    try:
-        from groq import Groq
-        api_key = settings.GROQ_API_KEY
-        
-        if not api_key or api_key == '':
-            return None
-        
-        return Groq(api_key=api_key)
-    except ImportError:
-        return None
-    except Exception:
-        return None
+    return groq_client.get_client()
 
 
 def prepare_voting_data_for_ai() -> Dict[str, Any]:
     """
     Prepare structured voting data for AI analysis
-    Returns clean, summarized data suitable for LLM prompts
+    Returns clean, summarized data suitable for LLM prompts, including the
+    precomputed race analytics (margins, intervals, competitiveness)
     """
     # Overall statistics
-    total_users = User.objects.count()
-    total_voters = Vote.objects.values('user').distinct().count()
-    total_votes = Vote.objects.count()
-    turnout = round((total_voters / total_users * 100), 2) if total_users > 0 else 0
+    overall = compute_overall_stats()
     
-    # Position-by-position analysis
+    return {
+        'overall_stats': {
+            'total_registered': overall['total_users'],
+            'total_voters': overall['total_voters'],
+            'total_votes': overall['total_votes'],
+            'turnout_percentage': overall['turnout']
+        },
+        **prepare_races_for_ai(compute_position_results(Position.objects.filter(is_active=True)))
+    }
+
+
+def prepare_races_for_ai(position_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Position-by-position analysis of `position_results`: {positions, most_competitive, confidence}"""
+    races = analyze_races(position_results)
     positions_data = []
     
-    for position in Position.objects.filter(is_active=True):
+    for result, race in zip(position_results, races['positions']):
+        intervals = {candidate['id']: candidate['interval'] for candidate in race['candidates']}
         candidates_info = []
-        total_position_votes = position.get_total_votes()
         
-        for candidate in position.candidates.filter(is_active=True):
-            vote_count = candidate.get_vote_count()
-            percentage = candidate.get_vote_percentage()
-            
+        for candidate in result['candidates']:
             candidates_info.append({
-                'name': candidate.name,
-                'votes': vote_count,
-                'percentage': percentage
+                'name': candidate['name'],
+                'votes': candidate['vote_count'],
+                'percentage': candidate['percentage'],
+                'interval': intervals[candidate['id']]
             })
         
-        # Sort by votes descending
-        candidates_info.sort(key=lambda x: x['votes'], reverse=True)
-        
         positions_data.append({
-            'position': position.name,
-            'total_votes': total_position_votes,
-            'candidates': candidates_info
+            'position': result['position_name'],
+            'total_votes': result['total_votes'],
+            'candidates': candidates_info,
+            'competitiveness': race['competitiveness'],
+            'margin_points': race['margin_points'],
+            'margin_interval': race['margin_interval'],
+            'lead_is_significant': race['lead_is_significant']
         })
     
     return {
-        'overall_stats': {
-            'total_registered': total_users,
-            'total_voters': total_voters,
-            'total_votes': total_votes,
-            'turnout_percentage': turnout
-        },
-        'positions': positions_data
+        'positions': positions_data,
+        'most_competitive': races['most_competitive'],
+        'confidence': races['confidence']
     }
 
 
-def generate_voting_summary_prompt(voting_data: Dict[str, Any]) -> str:
+def describe_race(position: Dict[str, Any], confidence: float) -> str:
+    """Precomputed facts about one race as prompt lines (with its folded tail, if any)"""
+    level = f"{confidence * 100:g}%"
+    lines = [f"\n{position['position']} ({position['total_votes']} votes) - {position['competitiveness'].replace('_', ' ')}:\n"]
+    for i, candidate in enumerate(position['candidates'], 1):
+        low, high = candidate['interval']
+        lines.append(
+            f"  {i}. {candidate['name']}: {candidate['votes']} votes ({candidate['percentage']}%, {level} CI {low}-{high}%)\n"
+        )
+    folded = position.get('folded')
+    if folded:
+        lines.append(f"  +{folded['count']} more candidates: {folded['votes']} votes ({folded['percentage']}%) combined\n")
+    if position['margin_points'] is not None:
+        low, high = position['margin_interval']
+        significance = 'statistically clear' if position['lead_is_significant'] else 'not statistically clear'
+        lines.append(
+            f"  Lead: {position['margin_points']} points ({level} CI {low} to {high}), {significance}\n"
+        )
+    return ''.join(lines)
+
+
+def describe_forecast(position: Optional[Dict[str, Any]], simulations: int, top_k: Optional[int] = None) -> str:
     """
-    Create a concise prompt for Groq LLM to generate voting insights
+    Simulated final outcome of one race (a get_forecast() position) as a prompt line
+    With top_k, only the likeliest top_k winners are named
     """
-    overall = voting_data['overall_stats']
-    positions = voting_data['positions']
-    
-    prompt = f"""You are an election analyst. Provide a brief, professional summary of this voting data.
+    if not position or not position['candidates']:
+        return ''
+    ranked = sorted(position['candidates'], key=lambda candidate: candidate['win_probability'], reverse=True)
+    shown, tail = (ranked[:top_k], ranked[top_k:]) if top_k else (ranked, [])
+    outlooks = ', '.join(
+        f"{candidate['name']} {candidate['win_probability']}% to win (expected {candidate['expected_share']}% of the vote)"
+        for candidate in shown
+    )
+    if tail:
+        outlooks += f", {len(tail)} others {round(sum(candidate['win_probability'] for candidate in tail), 2)}% combined"
+    if not position['remaining_voters']:
+        return f"  Forecast (every registered user has voted): {outlooks}\n"
+    return (
+        f"  Forecast ({simulations:,} simulations, {position['remaining_voters']} registered users yet to vote): {outlooks}\n"
+    )
 
-Overall Statistics:
-- Total Registered Users: {overall['total_registered']}
-- Total Voters: {overall['total_voters']}
-- Voter Turnout: {overall['turnout_percentage']}%
-- Total Votes Cast: {overall['total_votes']}
 
-Position Results:
-"""
+def race_template(position: Dict[str, Any]) -> str:
+    """One race's standing in plain words, for when no model answers in time"""
+    if not position['total_votes']:
+        return 'No votes have been cast yet.'
+    leader = position['candidates'][0]
+    text = f"{leader['name']} leads with {leader['votes']} of {position['total_votes']} votes ({leader['percentage']}%)"
+    if position['margin_points'] is not None:
+        clarity = 'statistically clear' if position['lead_is_significant'] else 'not statistically clear'
+        text += f", {position['margin_points']} points ahead, a lead that is {clarity}"
+    return f"{text}; the race is {position['competitiveness'].replace('_', ' ')}."
+
+
+def forecast_template(position: Dict[str, Any], outlook: Optional[Dict[str, Any]]) -> str:
+    """race_template() plus the favourite's win probability"""
+    text = race_template(position)
+    if outlook and outlook['candidates'] and position['total_votes']:
+        chance = max(candidate['win_probability'] for candidate in outlook['candidates'])
+        if outlook['remaining_voters']:
+            text += f" {outlook['favourite']} is the favourite, winning {chance}% of simulated outcomes."
+        else:
+            text += f" Every registered user has voted, so {outlook['favourite']} is the winner."
+    return text
+
+
+def get_voting_data() -> Dict[str, Any]:
+    """
+    prepare_voting_data_for_ai(), reused while the election-state version is unchanged
+    A repeat request costs one version lookup instead of the results queries
+    """
+    version = get_results_version()
+    key = str(version)
+    cached = llm_cache.snapshots.get(key)
+    if cached is not None:
+        return cached[0]
+    voting_data = prepare_voting_data_for_ai()
+    llm_cache.snapshots.set(key, voting_data)
+    return voting_data
+
+
+def prompt_token_budget() -> int:
+    return getattr(settings, 'AI_PROMPT_TOKEN_BUDGET', 3000)
+
+
+def fit_prompt(render: Callable[[Optional[int]], str]) -> str:
+    """
+    render(None) (every candidate) when it fits AI_PROMPT_TOKEN_BUDGET,
+    else render(AI_PROMPT_TOP_CANDIDATES) with the rest of each race folded
+    """
+    prompt = render(None)
+    if estimate_tokens(prompt) <= prompt_token_budget():
+        return prompt
+    return render(getattr(settings, 'AI_PROMPT_TOP_CANDIDATES', 5))
+
+
+class FragmentedPrompt:
+    """
+    One prompt per position (per group of positions on ballots longer than
+    AI_MAX_FRAGMENTS), answered separately and stitched together
+    Each prompt is rendered from its own races' figures only, so its cached
+    answer stays valid until one of those tallies changes: a refresh asks the
+    model about the changed races alone. `templates` are the races'
+    figures in plain words, the answer when no model replies in time
+    """
+
+    def __init__(self, kind: str, heading: str, titles: List[str], prompts: List[str], templates: List[str]):
+        self.kind = kind
+        self.heading = heading
+        self.titles = titles
+        self.prompts = prompts
+        self.templates = templates
+
+    def complete(self, model: str, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Cached fragments plus new ones for the rest, AI_FRAGMENT_WORKERS at a time; raises like request_completion()
+        on_text receives the stitched text in order as it is generated (see relay())
+        """
+        if get_groq_client() is None:
+            raise LLMUnavailable()
+        keys = [llm_cache.fingerprint(f'{self.kind}-position', PROMPT_VERSION, model, prompt) for prompt in self.prompts]
+        texts = []
+        for key in keys:
+            cached = llm_cache.fragments.get(key)
+            metrics.cache_lookup('llm_fragment', cached is not None)
+            texts.append(cached[0] if cached is not None else None)
+
+        missing = [index for index, text in enumerate(texts) if text is None]
+        channels = {index: queue.SimpleQueue() for index in missing} if on_text else {}
+
+        def answer(index):
+            channel = channels.get(index)
+            try:
+                text = request_completion(self.prompts[index], model, channel.put if channel else None)
+            finally:
+                if channel:
+                    channel.put(None)
+            llm_cache.fragments.set(keys[index], text)
+            return text
+
+        workers = min(getattr(settings, 'AI_FRAGMENT_WORKERS', 4), len(missing))
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='ai-fragment') as executor:
+            # Each in the caller's context, so their LLM time is counted in its request
+            futures = [executor.submit(contextvars.copy_context().run, answer, index) for index in missing]
+            if on_text:
+                self.relay(texts, channels, on_text)
+        # Every call has finished (and the answers are cached) before a failure is raised
+        for index, future in zip(missing, futures):
+            texts[index] = future.result()
+        return self.stitch(texts)
+
+    def relay(self, texts: List[Optional[str]], channels: Dict[int, 'queue.SimpleQueue'], on_text: Callable[[str], None]):
+        """
+        Pass the stitched text to on_text in ballot order: cached races at once,
+        the others token by token from their channels while later races are
+        still being generated. The heading and titles go out with the first
+        race text after them, so nothing is sent before the model answers
+        (see model_router)
+        """
+        pending = self.heading
+        for index, title in enumerate(self.titles):
+            pending += f"\n\n{title}: " if index or self.heading else f"{title}: "
+            pieces = [texts[index]] if texts[index] is not None else iter(channels[index].get, None)
+            for piece in pieces:
+                if pending:
+                    on_text(pending)
+                    pending = ''
+                on_text(piece)
+        if pending:
+            on_text(pending)
+
+    def stitch(self, texts: List[str]) -> str:
+        sections = [self.heading] if self.heading else []
+        sections.extend(f"{title}: {text}" for title, text in zip(self.titles, texts))
+        return '\n\n'.join(sections) or 'No active positions to analyse.'
+
+    def template(self) -> str:
+        """The stitched race templates"""
+        return self.stitch(self.templates)
+
+
+def group_races(positions: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    The ballot in consecutive groups, one fragment each: a race per group
+    until there are more than AI_MAX_FRAGMENTS races, then as many races per
+    group as it takes to stay within that many model calls
+    """
+    limit = max(getattr(settings, 'AI_MAX_FRAGMENTS', 16), 1)
+    size = -(-len(positions) // limit) or 1
+    return [positions[start:start + size] for start in range(0, len(positions), size)]
+
+
+def fit_groups(
+    groups: List[List[Dict[str, Any]]], prompt_for: Callable[[List[Dict[str, Any]]], str]
+) -> Tuple[List[List[Dict[str, Any]]], List[str]]:
+    """
+    (groups, prompts) with every prompt within AI_PROMPT_TOKEN_BUDGET: a group
+    whose prompt is still over budget once folded is split in two until it
+    fits, so the budget wins over AI_MAX_FRAGMENTS (a single race is kept folded)
+    """
+    fitted, prompts = [], []
+    pending = groups[::-1]
+    while pending:
+        group = pending.pop()
+        prompt = prompt_for(group)
+        if len(group) > 1 and estimate_tokens(prompt) > prompt_token_budget():
+            middle = len(group) // 2
+            pending.extend([group[middle:], group[:middle]])
+            continue
+        fitted.append(group)
+        prompts.append(prompt)
+    return fitted, prompts
+
+
+def group_title(group: List[Dict[str, Any]]) -> str:
+    if len(group) == 1:
+        return group[0]['position']
+    return f"{group[0]['position']} to {group[-1]['position']}"
+
+
+def group_template(group: List[Dict[str, Any]], template: Callable[[Dict[str, Any]], str]) -> str:
+    """A group's race templates, each named after its position once there are several"""
+    if len(group) == 1:
+        return template(group[0])
+    return ' '.join(f"{pos['position']}: {template(pos)}" for pos in group)
+
+
+def generate_voting_summary_prompt(voting_data: Dict[str, Any]) -> FragmentedPrompt:
+    """
+    Create concise per-position prompts for Groq LLM to generate voting insights
+    The overall figures are stated directly in the heading, so only the
+    races need the model
+    """
+    overall = voting_data['overall_stats']
     
-    for pos in positions:
-        prompt += f"\n{pos['position']} ({pos['total_votes']} votes):\n"
-        for i, candidate in enumerate(pos['candidates'], 1):
-            prompt += f"  {i}. {candidate['name']}: {candidate['votes']} votes ({candidate['percentage']}%)\n"
+    heading = (
+        f"{overall['total_voters']} of {overall['total_registered']} registered users have voted "
+        f"({overall['turnout_percentage']}% turnout), casting {overall['total_votes']} votes."
+    )
+    if voting_data['most_competitive']:
+        heading += f" The most competitive race is {voting_data['most_competitive']}."
     
-    prompt += """
-Task: Provide a 3-4 sentence summary highlighting:
-1. Overall voter turnout assessment
-2. Most competitive races
-3. Clear winners and their margins
-4. Any notable patterns
+    def prompt_for(group):
+        single = len(group) == 1
+
+        def render(top_k):
+            return ''.join([
+                "You are an election analyst. Provide a brief, professional summary of "
+                f"{'this race' if single else 'each of these races'}.\n",
+                "\nPosition Results (shares, confidence intervals, margins and race classes are precomputed):\n",
+                *(describe_race(fold_candidates(pos, top_k) if top_k else pos, voting_data['confidence']) for pos in group),
+                f"""
+Task: In 1-2 sentences{'' if single else ' per position, each starting with its name'}, say who leads and by how much,
+whether the lead is statistically clear, and how competitive the race is.
 
+Use only the figures and classifications given above; do not recalculate them.
 Keep it concise, factual, and suitable for an academic project dashboard.
-"""
+""",
+            ])
+        return fit_prompt(render)
     
-    return prompt
+    groups, prompts = fit_groups(group_races(voting_data['positions']), prompt_for)
+    return FragmentedPrompt(
+        'summary', heading, [group_title(group) for group in groups], prompts,
+        [group_template(group, race_template) for group in groups]
+    )
 
 
-def generate_prediction_prompt(voting_data: Dict[str, Any]) -> str:
+def generate_prediction_prompt(
+    voting_data: Dict[str, Any], forecast: Optional[Dict[str, Any]] = None
+) -> FragmentedPrompt:
     """
-    Create a prompt for AI to explain winner likelihood and competitiveness
+    Create per-position prompts for AI to explain winner likelihood and competitiveness
+    The classification comes from the analytics module and the win
+    probabilities from the forecast; the model narrates them
     """
-    positions = voting_data['positions']
+    forecast = forecast or get_forecast()
+    outlooks = {outlook['position_name']: outlook for outlook in forecast['positions']}
     
-    prompt = f"""You are an election analyst. Analyze the competitiveness and winner likelihood for each position.
+    def prompt_for(group):
+        single = len(group) == 1
 
-Voting Data:
-"""
-    
-    for pos in positions:
-        prompt += f"\n{pos['position']}:\n"
-        for candidate in pos['candidates']:
-            prompt += f"  - {candidate['name']}: {candidate['votes']} votes ({candidate['percentage']}%)\n"
-    
-    prompt += """
-Task: For each position, provide:
-1. Winner likelihood explanation (clear winner vs. close race)
-2. Competitiveness level (landslide, competitive, very close)
+        def render(top_k):
+            races = []
+            for pos in group:
+                races.append(describe_race(fold_candidates(pos, top_k) if top_k else pos, voting_data['confidence']))
+                races.append(describe_forecast(outlooks.get(pos['position']), forecast['simulations'], top_k))
+            return ''.join([
+                "You are an election analyst. Explain the competitiveness and winner likelihood for "
+                f"{'this position' if single else 'each of these positions'}.\n",
+                "\nVoting Data (shares, confidence intervals, margins, race classes and win probabilities are precomputed):\n",
+                *races,
+                f"""
+Task: Provide{'' if single else ', for each position and starting with its name'}:
+1. Winner likelihood explanation based on the forecast win probabilities, the lead and whether it is statistically clear
+2. What the given competitiveness class (landslide, competitive, very close, uncontested, no votes) means for this race
 3. Brief interpretation of vote distribution
 
-Format your response as a clear, structured analysis suitable for students. Keep it concise (3-4 sentences per position).
-"""
+Use only the figures and classifications given above; do not recalculate them.
+
+Format your response as a clear analysis suitable for students. Keep it concise (3-4 sentences{'' if single else ' per position'}).
+""",
+            ])
+        return fit_prompt(render)
     
-    return prompt
+    groups, prompts = fit_groups(group_races(voting_data['positions']), prompt_for)
+    return FragmentedPrompt(
+        'prediction', '', [group_title(group) for group in groups], prompts,
+        [group_template(group, lambda pos: forecast_template(pos, outlooks.get(pos['position']))) for group in groups]
+    )
 
 
-def call_groq_api(prompt: str, model: str = None) -> str:
+def request_completion(prompt: str, model: str = None, on_text: Optional[Callable[[str], None]] = None) -> str:
     """
-    Call Groq LLM API with the given prompt
-    Returns AI-generated text or error message
+    Ask the Groq LLM for a completion
+    With on_text the completion is streamed and each piece of text is passed
+    to it as it arrives; a client that answers in one piece (streaming
+    unavailable) passes the whole text at once
+    Raises LLMUnavailable without an API key and the client's error on failure
     """
     client = get_groq_client()
     
     if client is None:
-        return "AI analysis unavailable: Groq API key not configured. Please set GROQ_API_KEY in your .env file."
+        raise LLMUnavailable()
     
+    model_name = model or settings.GROQ_MODEL
+    options = {'stream': True} if on_text else {}
     try:
-        model_name = model or settings.GROQ_MODEL
-        
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional election analyst providing clear, concise, and factual voting analysis for an academic project."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3,  # Lower temperature for more factual responses
-            max_tokens=500,   # Keep responses concise
-        )
-        
-        return response.choices[0].message.content.strip()
+        with timed('llm'), metrics.observe_duration('voting_llm_request_duration_seconds', model_name):
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a professional election analyst providing clear, concise, and factual voting analysis for an academic project."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.3,  # Lower temperature for more factual responses
+                max_tokens=500,   # Keep responses concise
+                **options
+            )
+            if on_text and not hasattr(response, 'choices'):
+                return relay_stream(response, on_text)
+    except Exception:
+        metrics.inc('voting_llm_errors_total', model_name)
+        raise
     
+    text = response.choices[0].message.content.strip()
+    if on_text:
+        on_text(text)
+    return text
+
+
+def relay_stream(chunks, on_text: Callable[[str], None]) -> str:
+    """Pass each piece of a streamed completion to on_text; returns the whole text"""
+    pieces = []
+    for chunk in chunks:
+        for choice in chunk.choices:
+            delta = getattr(choice.delta, 'content', None)
+            if delta:
+                # Leading whitespace is dropped, as in the buffered answer
+                delta = delta if pieces else delta.lstrip()
+                if delta:
+                    pieces.append(delta)
+                    on_text(delta)
+    return ''.join(pieces).rstrip()
+
+
+def call_groq_api(prompt: str, model: str = None) -> str:
+    """
+    Call Groq LLM API with the given prompt
+    Returns AI-generated text or error message
+    """
+    try:
+        return request_completion(prompt, model)
+    except LLMUnavailable:
+        return UNAVAILABLE_MESSAGE
     except Exception as e:
         return f"AI analysis error: {str(e)}"
 
 
-def generate_voting_summary() -> Dict[str, Any]:
+def cached_analysis(
+    kind: str, inputs: Any, prompt: Union[str, FragmentedPrompt], cached_only: bool = False, raise_errors: bool = False,
+    on_text: Optional[Callable[[str], None]] = None, template: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    AI text for a prompt, served from the analysis cache when the same inputs,
+    routed model and prompt version were analysed recently
+    The model comes from the kind's route (see model_router). A FragmentedPrompt
+    asks only about the races it has no answer for. When no model answers
+    within the route's latency budget the template (a FragmentedPrompt's own)
+    is returned with model 'template'. When the model fails (or its circuit
+    breaker is open) the last good analysis of this kind is served with
+    stale=True; without one the failure is returned as text (or raised with
+    raise_errors). With cached_only a miss returns None instead of calling the
+    model. on_text streams the text of a new analysis as the model writes it
+    (see request_completion())
+    Returns {text, model, latency_ms, cached, cache_age_seconds, stale}; model and
+    latency_ms are those of the call that wrote the text
+    """
+    model = model_router.get_route(kind)['model']
+    key = llm_cache.fingerprint(kind, PROMPT_VERSION, model, inputs)
+    cached = llm_cache.analyses.get(key)
+    metrics.cache_lookup('llm_analysis', cached is not None)
+    if cached is not None:
+        answer, age = cached
+        return {**answer, 'cached': True, 'cache_age_seconds': round(age, 1), 'stale': False}
+    if cached_only:
+        return None
+    
+    def remember(text: str, answer_model: str, latency_ms: float):
+        answer = {'text': text, 'model': answer_model, 'latency_ms': round(latency_ms, 1)}
+        # A fallback's answer never replaces the routed model's
+        if answer_model == model or llm_cache.analyses.get(key) is None:
+            llm_cache.analyses.set(key, answer)
+        llm_cache.last_good.set(f'{kind}:{model}', answer)
+    
+    if isinstance(prompt, FragmentedPrompt):
+        run, template = prompt.complete, prompt.template()
+    else:
+        def run(answer_model: str, relay: Optional[Callable[[str], None]]) -> str:
+            return request_completion(prompt, answer_model, relay)
+    started = time.monotonic()
+    try:
+        if get_groq_client() is None:
+            raise LLMUnavailable()
+        text, answer_model, latency_ms = model_router.routed_completion(kind, run, on_text, remember)
+    except LLMUnavailable:
+        text, answer_model, latency_ms = UNAVAILABLE_MESSAGE, None, 0.0
+    except Exception as e:
+        latency_ms = round((time.monotonic() - started) * 1000, 1)
+        if isinstance(e, model_router.ModelsTooSlow) and template is not None:
+            if on_text:
+                on_text(template)
+            return {
+                'text': template, 'model': 'template', 'latency_ms': latency_ms,
+                'cached': False, 'cache_age_seconds': 0.0, 'stale': False
+            }
+        last_good = llm_cache.last_good.get(f'{kind}:{model}')
+        if last_good is not None:
+            answer, age = last_good
+            return {**answer, 'cached': True, 'cache_age_seconds': round(age, 1), 'stale': True}
+        if raise_errors:
+            raise
+        text, answer_model = f"AI analysis error: {str(e)}", model
+    return {
+        'text': text, 'model': answer_model, 'latency_ms': latency_ms,
+        'cached': False, 'cache_age_seconds': 0.0, 'stale': False
+    }
+
+
+def generate_voting_summary(
+    cached_only: bool = False, voting_data: Optional[Dict[str, Any]] = None, raise_errors: bool = False,
+    on_text: Optional[Callable[[str], None]] = None
+) -> Optional[Dict[str, Any]]:
     """
     Generate AI-powered voting summary
     Main function for /api/ai/summary/ endpoint
+    With cached_only, returns None unless the analysis is already cached;
+    voting_data reuses a snapshot the caller already prepared;
+    on_text receives newly generated text as it streams in
     """
     # Prepare data
-    voting_data = prepare_voting_data_for_ai()
+    voting_data = voting_data or get_voting_data()
     
     # Generate prompt
     prompt = generate_voting_summary_prompt(voting_data)
     
     # Get AI analysis
-    ai_summary = call_groq_api(prompt)
+    analysis = cached_analysis('summary', voting_data, prompt, cached_only, raise_errors, on_text)
+    if analysis is None:
+        return None
     
     return {
-        'summary': ai_summary,
+        'summary': analysis['text'],
         'data': voting_data,
-        'model': settings.GROQ_MODEL
+        'model': analysis['model'],
+        'latency_ms': analysis['latency_ms'],
+        'cached': analysis['cached'],
+        'cache_age_seconds': analysis['cache_age_seconds'],
+        'stale': analysis['stale']
     }
 
 
-def generate_winner_prediction() -> Dict[str, Any]:
+def generate_winner_prediction(
+    cached_only: bool = False, voting_data: Optional[Dict[str, Any]] = None, raise_errors: bool = False,
+    forecast: Optional[Dict[str, Any]] = None, on_text: Optional[Callable[[str], None]] = None
+) -> Optional[Dict[str, Any]]:
     """
     Generate AI-powered winner prediction and competitiveness analysis
     Main function for /api/ai/prediction/ endpoint
+    With cached_only, returns None unless the analysis is already cached;
+    voting_data and forecast reuse what the caller already prepared;
+    on_text receives newly generated text as it streams in
     """
     # Prepare data
-    voting_data = prepare_voting_data_for_ai()
+    voting_data = voting_data or get_voting_data()
+    forecast = forecast or get_forecast()
+    # The races as the forecast saw them: it is reused for FORECAST_REFRESH_SECONDS
+    # after a vote, so the latest tallies could contradict its win probabilities
+    voting_data = {**voting_data, **prepare_races_for_ai(forecast_tallies(forecast))}
     
     # Generate prompt
-    prompt = generate_prediction_prompt(voting_data)
+    prompt = generate_prediction_prompt(voting_data, forecast)
     
     # Get AI analysis
-    ai_prediction = call_groq_api(prompt)
+    inputs = {'positions': voting_data['positions'], 'forecast': forecast}
+    analysis = cached_analysis('prediction', inputs, prompt, cached_only, raise_errors, on_text)
+    if analysis is None:
+        return None
     
     return {
-        'prediction': ai_prediction,
+        'prediction': analysis['text'],
         'data': voting_data,
-        'model': settings.GROQ_MODEL
+        'forecast': forecast,
+        'model': analysis['model'],
+        'latency_ms': analysis['latency_ms'],
+        'cached': analysis['cached'],
+        'cache_age_seconds': analysis['cache_age_seconds'],
+        'stale': analysis['stale']
     }
 
 
-def generate_turnout_analysis() -> Dict[str, Any]:
+def generate_turnout_analysis(
+    cached_only: bool = False, voting_data: Optional[Dict[str, Any]] = None, raise_errors: bool = False,
+    on_text: Optional[Callable[[str], None]] = None
+) -> Optional[Dict[str, Any]]:
     """
     Generate AI analysis of voter turnout and participation
+    With cached_only, returns None unless the analysis is already cached;
+    voting_data reuses a snapshot the caller already prepared;
+    on_text receives newly generated text as it streams in
     """
-    voting_data = prepare_voting_data_for_ai()
+    voting_data = voting_data or get_voting_data()
     overall = voting_data['overall_stats']
     
     prompt = f"""Analyze voter turnout for this election:
@@ -239,11 +646,95 @@ Provide a brief (2-3 sentence) interpretation:
 Keep it professional and suitable for an academic dashboard.
 """
     
-    ai_analysis = call_groq_api(prompt)
+    template = (
+        f"{overall['total_voters']} of {overall['total_registered']} registered users have voted, "
+        f"a turnout of {overall['turnout_percentage']}%."
+    )
+    analysis = cached_analysis('turnout', overall, prompt, cached_only, raise_errors, on_text, template)
+    if analysis is None:
+        return None
     
     return {
-        'turnout_analysis': ai_analysis,
+        'turnout_analysis': analysis['text'],
         'turnout_rate': overall['turnout_percentage'],
         'voters': overall['total_voters'],
-        'registered': overall['total_registered']
+        'registered': overall['total_registered'],
+        'model': analysis['model'],
+        'latency_ms': analysis['latency_ms'],
+        'cached': analysis['cached'],
+        'cache_age_seconds': analysis['cache_age_seconds'],
+        'stale': analysis['stale']
     }
+
+
+INSIGHT_GENERATORS = {
+    'summary': generate_voting_summary,
+    'prediction': generate_winner_prediction,
+    'turnout': generate_turnout_analysis,
+}
+
+
+def generate_insights(
+    cached_only: bool = False, voting_data: Optional[Dict[str, Any]] = None,
+    forecast: Optional[Dict[str, Any]] = None, on_text: Optional[Callable[[str, str], None]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Summary, prediction and turnout analysis from one voting snapshot
+    The three LLM calls run concurrently, each bounded by AI_INSIGHTS_TIMEOUT_SECONDS;
+    a section that fails or times out is None and its reason is in `errors`
+    Main function for /api/ai/insights/ endpoint
+    voting_data and forecast reuse what the caller already prepared;
+    on_text(text, section) receives newly generated text as it streams in
+    """
+    voting_data = voting_data or get_voting_data()
+    # Prepared up front so the worker threads make no database queries
+    extra_inputs = {'prediction': {'forecast': forecast or get_forecast()}}
+    if cached_only:
+        sections = {}
+        for kind, generate in INSIGHT_GENERATORS.items():
+            sections[kind] = generate(cached_only=True, voting_data=voting_data, **extra_inputs.get(kind, {}))
+            if sections[kind] is None:
+                return None
+        return insights_response(voting_data, sections, {})
+
+    timeout = getattr(settings, 'AI_INSIGHTS_TIMEOUT_SECONDS', 30)
+    # A timed-out call keeps running in its thread; its answer still lands in the cache
+    executor = ThreadPoolExecutor(max_workers=len(INSIGHT_GENERATORS), thread_name_prefix='ai-insights')
+    try:
+        futures = {
+            # Each in the caller's context, so their LLM time is counted in its request
+            kind: executor.submit(
+                contextvars.copy_context().run, generate, voting_data=voting_data, raise_errors=True,
+                on_text=(lambda text, kind=kind: on_text(text, kind)) if on_text else None,
+                **extra_inputs.get(kind, {})
+            )
+            for kind, generate in INSIGHT_GENERATORS.items()
+        }
+        deadline = time.monotonic() + timeout
+        sections, errors = {}, {}
+        for kind, future in futures.items():
+            try:
+                sections[kind] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FuturesTimeout:
+                sections[kind] = None
+                errors[kind] = f'Timed out after {timeout:g}s'
+            except Exception as e:
+                sections[kind] = None
+                errors[kind] = f'AI analysis error: {str(e)}'
+    finally:
+        executor.shutdown(wait=False)
+    return insights_response(voting_data, sections, errors)
+
+
+def insights_response(voting_data: Dict[str, Any], sections: Dict[str, Any], errors: Dict[str, str]) -> Dict[str, Any]:
+    """Combine section results, keeping the shared voting data once"""
+    result = {
+        kind: {key: value for key, value in section.items() if key != 'data'} if section else None
+        for kind, section in sections.items()
+    }
+    result.update({
+        'data': voting_data,
+        'errors': errors,
+        'cached': all(section and section['cached'] for section in sections.values())
+    })
+    return result
@@ -0,0 +1,131 @@
+"""
+Background AI analysis jobs
+A Groq round trip takes seconds, so AI endpoints hand generation to a small
+per-process thread pool and answer 202 with a job id instead of holding a
+request worker. Jobs live in the database so any worker can answer the poll,
+and identical requests (same analysis, model, prompt version and election
+state) share one in-flight job, or reuse the result of one that succeeded:
+the LLM caches are per process, so another worker would otherwise ask Groq
+again for an analysis that was just generated.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.utils import timezone
+from . import ai_analysis
+from .ai_analysis import (
+    generate_voting_summary, generate_winner_prediction, generate_turnout_analysis, generate_insights
+)
+from .model_router import get_route
+from .models import AIJob
+from .results import get_results_version
+
+logger = logging.getLogger(__name__)
+
+GENERATORS: Dict[str, Callable[..., Optional[Dict[str, Any]]]] = {
+    'summary': generate_voting_summary,
+    'prediction': generate_winner_prediction,
+    'turnout': generate_turnout_analysis,
+    'insights': generate_insights,
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """This process's AI worker pool, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'AI_JOB_WORKERS', 4),
+                thread_name_prefix='ai-job'
+            )
+        return _executor
+
+
+def runs_in_background() -> bool:
+    """Without a Groq client the answer is immediate, so no job is needed"""
+    return getattr(settings, 'AI_JOBS_ENABLED', True) and ai_analysis.get_groq_client() is not None
+
+
+def request_key(kind: str) -> str:
+    """Identifies requests that would produce the same analysis"""
+    return f'{kind}:{get_route(kind)["model"]}:{ai_analysis.PROMPT_VERSION}:{get_results_version()}'
+
+
+def expire_jobs() -> None:
+    """Fail in-flight jobs whose process died and delete finished jobs past their retention"""
+    now = timezone.now()
+    # A job whose process died never finishes; let a new one take its place
+    lost = now - timedelta(seconds=getattr(settings, 'AI_JOB_TIMEOUT_SECONDS', 120))
+    AIJob.objects.filter(active_key__isnull=False, created_at__lt=lost).update(
+        status=AIJob.FAILED, error='Timed out', active_key=None, finished_at=now
+    )
+    retired = now - timedelta(seconds=getattr(settings, 'AI_JOB_RETENTION_SECONDS', 3600))
+    AIJob.objects.filter(active_key__isnull=True, finished_at__lt=retired).delete()
+
+
+def submit(kind: str) -> AIJob:
+    """
+    The in-flight job for this analysis, else the latest one that succeeded
+    (within AI_JOB_RETENTION_SECONDS), else a new one queued on the pool
+    """
+    key = request_key(kind)
+    expire_jobs()
+    while True:
+        job = AIJob.objects.filter(active_key=key).first()
+        if job is not None:
+            return job
+        # expire_jobs() has just deleted the ones past their retention
+        job = AIJob.objects.filter(request_key=key, status=AIJob.SUCCEEDED).order_by('-finished_at').first()
+        if job is not None:
+            return job
+        try:
+            with transaction.atomic():
+                job = AIJob.objects.create(kind=kind, request_key=key, active_key=key)
+        except IntegrityError:
+            # Another worker queued the same analysis a moment ago (and it may
+            # already have finished): look again
+            continue
+        job_id = job.pk
+        transaction.on_commit(lambda: get_executor().submit(run_job, job_id))
+        return job
+
+
+def run_job(job_id) -> None:
+    """Generate the analysis for a job and store the outcome"""
+    close_old_connections()
+    try:
+        job = AIJob.objects.get(pk=job_id)
+        AIJob.objects.filter(pk=job_id).update(status=AIJob.RUNNING, started_at=timezone.now())
+        result = GENERATORS[job.kind]()
+    except Exception as e:
+        logger.exception('AI job %s failed', job_id)
+        AIJob.objects.filter(pk=job_id).update(
+            status=AIJob.FAILED, error=str(e), active_key=None, finished_at=timezone.now()
+        )
+    else:
+        AIJob.objects.filter(pk=job_id).update(
+            status=AIJob.SUCCEEDED, result=result, active_key=None, finished_at=timezone.now()
+        )
+    finally:
+        connections.close_all()
+
+
+def job_payload(job: AIJob) -> Dict[str, Any]:
+    """Poll response for a job"""
+    return {
+        'job_id': str(job.pk),
+        'kind': job.kind,
+        'status': job.status,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
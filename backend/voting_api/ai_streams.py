@@ -0,0 +1,106 @@
+"""
+Server-Sent Events for AI analyses
+Relays the model's text to the client as it is generated, so the first words
+appear as soon as Groq sends its first token instead of after the whole
+completion. A stream carries `token` events ({"text"}, plus "section" for
+insights) and ends with `done` holding the endpoint's usual JSON body (or
+`error`); a cached analysis is a single `done` event. Under WSGI, or with
+AI_STREAMING_ENABLED off, the stream URLs answer like the buffered endpoints
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from . import ai_jobs
+from .ai_analysis import get_voting_data
+from .ai_views import ERROR_MESSAGES, ai_summary_view, ai_prediction_view, ai_turnout_view, ai_insights_view
+from .forecast import get_forecast
+from .streams import authenticate_stream_request
+
+logger = logging.getLogger(__name__)
+
+BUFFERED_VIEWS = {
+    'summary': ai_summary_view,
+    'prediction': ai_prediction_view,
+    'turnout': ai_turnout_view,
+    'insights': ai_insights_view,
+}
+
+
+def prepare_inputs(kind: str) -> Dict[str, Any]:
+    """Everything the generator reads from the database, so the model call can run on any thread"""
+    inputs = {'voting_data': get_voting_data()}
+    if kind in ('prediction', 'insights'):
+        inputs['forecast'] = get_forecast()
+    return inputs
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """Encode one SSE message"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))}\n\n"
+
+
+async def analysis_event_stream(kind: str, inputs: Dict[str, Any]):
+    """`token` events while the analysis is generated, then `done` (or `error`)"""
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_text(text: str, section: Optional[str] = None):
+        data = {'text': text} if section is None else {'section': section, 'text': text}
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, format_event('token', data))
+        except RuntimeError:
+            pass  # The client left and its loop closed; the analysis still lands in the cache
+
+    # The model call blocks for seconds, so it stays off the shared thread-sensitive executor
+    generate = sync_to_async(ai_jobs.GENERATORS[kind], thread_sensitive=False)
+    generation = asyncio.ensure_future(generate(on_text=on_text, **inputs))
+    generation.add_done_callback(lambda _: events.put_nowait(None))
+
+    while True:
+        event = await events.get()
+        if event is None:
+            break
+        yield event
+    try:
+        result = generation.result()
+    except Exception as e:
+        logger.exception('AI %s stream failed', kind)
+        yield format_event('error', {'error': ERROR_MESSAGES[kind], 'detail': str(e)})
+    else:
+        yield format_event('done', result)
+
+
+def analysis_stream_view(kind: str):
+    """Async view streaming one analysis (see the module docstring)"""
+
+    async def view(request):
+        if request.method != 'GET':
+            return JsonResponse({'error': 'Method not allowed'}, status=405)
+        if not isinstance(request, ASGIRequest) or not getattr(settings, 'AI_STREAMING_ENABLED', True):
+            # Nothing to stream over: the buffered response (200, or 202 with a job to poll)
+            return await sync_to_async(BUFFERED_VIEWS[kind])(request)
+
+        user = await sync_to_async(authenticate_stream_request)(request)
+        if user is None or not user.is_active:
+            return JsonResponse({'error': 'Authentication credentials were not provided or are invalid'}, status=401)
+
+        inputs = await sync_to_async(prepare_inputs)(kind)
+        response = StreamingHttpResponse(analysis_event_stream(kind, inputs), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    view.__name__ = view.__qualname__ = f'ai_{kind}_stream_view'
+    return view
+
+
+ai_summary_stream_view = analysis_stream_view('summary')
+ai_prediction_stream_view = analysis_stream_view('prediction')
+ai_turnout_stream_view = analysis_stream_view('turnout')
+ai_insights_stream_view = analysis_stream_view('insights')
@@ -1,35 +1,66 @@
 """
 AI Analysis API Views
 Lightweight AI insights using Groq LLM
+Analyses that are not cached yet are generated by a background job: the
+endpoint answers 202 with a job id and the client polls the job endpoint
 """
+from django.urls import reverse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .ai_analysis import (
-    generate_voting_summary,
-    generate_winner_prediction,
-    generate_turnout_analysis
-)
+from . import ai_jobs
+from .models import AIJob
 
+ERROR_MESSAGES = {
+    'summary': 'Failed to generate AI summary',
+    'prediction': 'Failed to generate AI prediction',
+    'turnout': 'Failed to generate turnout analysis',
+    'insights': 'Failed to generate AI insights',
+}
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def ai_summary_view(request):
+
+def analysis_response(kind: str) -> Response:
     """
-    Generate AI-powered voting summary
-    Returns concise insights about overall election status
+    The analysis when it is cached, needs no model call or a job already
+    generated it, otherwise 202 Accepted with the job that generates it
     """
+    generate = ai_jobs.GENERATORS[kind]
     try:
-        result = generate_voting_summary()
-        return Response(result, status=status.HTTP_200_OK)
+        if not ai_jobs.runs_in_background():
+            return Response(generate(), status=status.HTTP_200_OK)
+
+        result = generate(cached_only=True)
+        if result is not None:
+            return Response(result, status=status.HTTP_200_OK)
+
+        job = ai_jobs.submit(kind)
+        if job.status == AIJob.SUCCEEDED:
+            # Generated by another worker for the same election state
+            return Response(job.result, status=status.HTTP_200_OK)
+        status_url = reverse('voting_api:ai_job', kwargs={'job_id': job.pk})
+        return Response({
+            'job_id': str(job.pk),
+            'status': job.status,
+            'status_url': status_url
+        }, status=status.HTTP_202_ACCEPTED, headers={'Location': status_url, 'Retry-After': '1'})
     except Exception as e:
         return Response({
-            'error': 'Failed to generate AI summary',
+            'error': ERROR_MESSAGES[kind],
             'detail': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ai_summary_view(request):
+    """
+    Generate AI-powered voting summary
+    Returns concise insights about overall election status
+    """
+    return analysis_response('summary')
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def ai_prediction_view(request):
@@ -37,14 +68,7 @@ def ai_prediction_view(request):
     Generate AI-powered winner prediction and competitiveness analysis
     Returns detailed analysis of each position's race
     """
-    try:
-        result = generate_winner_prediction()
-        return Response(result, status=status.HTTP_200_OK)
-    except Exception as e:
-        return Response({
-            'error': 'Failed to generate AI prediction',
-            'detail': str(e)
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return analysis_response('prediction')
 
 
 @api_view(['GET'])
@@ -54,11 +78,32 @@ def ai_turnout_view(request):
     Generate AI analysis of voter turnout
     Returns insights about participation and engagement
     """
-    try:
-        result = generate_turnout_analysis()
-        return Response(result, status=status.HTTP_200_OK)
-    except Exception as e:
-        return Response({
-            'error': 'Failed to generate turnout analysis',
-            'detail': str(e)
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return analysis_response('turnout')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ai_insights_view(request):
+    """
+    Summary, prediction and turnout analysis in one response
+    The three model calls run concurrently; failed sections are null with
+    their reason in `errors`
+    """
+    return analysis_response('insights')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ai_job_view(request, job_id):
+    """
+    Status of a background AI analysis
+    `result` holds the endpoint's usual response once `status` is succeeded
+    """
+    job = AIJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return Response({'error': 'AI job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    headers = {}
+    if job.status in (AIJob.PENDING, AIJob.RUNNING):
+        headers['Retry-After'] = '1'
+    return Response(ai_jobs.job_payload(job), status=status.HTTP_200_OK, headers=headers)
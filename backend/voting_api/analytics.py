@@ -0,0 +1,126 @@
+"""
+Race analytics
+Vote shares, margins, Wilson score intervals and a competitiveness class
+for every position, computed together as NumPy arrays (one row per
+position, one column per candidate). Deterministic, so the AI prompts
+only ask the model to narrate these figures instead of working them out
+"""
+from statistics import NormalDist
+from typing import Any, Dict, List
+import numpy as np
+
+DEFAULT_CONFIDENCE = 0.95
+
+# Lead over the runner-up, in percentage points
+VERY_CLOSE_MARGIN = 5.0
+LANDSLIDE_MARGIN = 20.0
+
+
+def z_score(confidence: float) -> float:
+    """Two-sided normal critical value, e.g. 1.96 for 0.95"""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def vote_matrix(position_results: List[Dict[str, Any]]) -> np.ndarray:
+    """Votes per position (rows) and candidate (columns, best first), zero-padded"""
+    width = max((len(result['candidates']) for result in position_results), default=0)
+    counts = np.zeros((len(position_results), max(width, 2)), dtype=np.int64)
+    for row, result in enumerate(position_results):
+        votes = [candidate['vote_count'] for candidate in result['candidates']]
+        counts[row, :len(votes)] = votes
+    # compute_position_results already sorts candidates; sort again so any input works
+    return -np.sort(-counts, axis=1)
+
+
+def wilson_interval(counts: np.ndarray, totals: np.ndarray, z: float):
+    """Wilson score interval for counts/totals, elementwise; (0, 0) where totals is 0"""
+    totals = np.broadcast_to(totals, counts.shape).astype(float)
+    safe = np.where(totals > 0, totals, 1.0)
+    share = counts / safe
+    denominator = 1 + z ** 2 / safe
+    centre = (share + z ** 2 / (2 * safe)) / denominator
+    spread = z * np.sqrt(share * (1 - share) / safe + z ** 2 / (4 * safe ** 2)) / denominator
+    empty = totals == 0
+    low = np.where(empty, 0.0, np.clip(centre - spread, 0, 1))
+    high = np.where(empty, 0.0, np.clip(centre + spread, 0, 1))
+    return low, high
+
+
+def analyze_races(position_results: List[Dict[str, Any]], confidence: float = DEFAULT_CONFIDENCE) -> Dict[str, Any]:
+    """
+    Analytics for every position in `position_results` (compute_position_results() output)
+    Shares and intervals are percentages; the margin interval is for the
+    leader's lead over the runner-up (difference of two multinomial shares),
+    and the lead is significant when that interval excludes zero
+    """
+    z = z_score(confidence)
+    counts = vote_matrix(position_results)
+    totals = counts.sum(axis=1)
+    safe_totals = np.where(totals > 0, totals, 1)
+    shares = counts / safe_totals[:, None]
+    low, high = wilson_interval(counts, totals[:, None], z)
+
+    margin_points = (shares[:, 0] - shares[:, 1]) * 100
+    # Agresti-Caffo style: one pseudo-vote for each of the top two keeps the
+    # interval honest for small or lopsided races where the plain Wald one collapses
+    adjusted_totals = totals + 2
+    leader = (counts[:, 0] + 1) / adjusted_totals
+    runner_up = (counts[:, 1] + 1) / adjusted_totals
+    margin = leader - runner_up
+    margin_spread = z * np.sqrt(np.maximum(leader + runner_up - margin ** 2, 0) / adjusted_totals)
+    margin_low, margin_high = margin - margin_spread, margin + margin_spread
+
+    candidate_counts = np.array([len(result['candidates']) for result in position_results], dtype=np.int64)
+    classes = np.select(
+        [
+            totals == 0,
+            candidate_counts < 2,
+            (margin_points < VERY_CLOSE_MARGIN) | (margin_low <= 0),
+            margin_points < LANDSLIDE_MARGIN,
+        ],
+        ['no_votes', 'uncontested', 'very_close', 'competitive'],
+        default='landslide'
+    )
+
+    positions = []
+    for row, result in enumerate(position_results):
+        ranked = sorted(result['candidates'], key=lambda candidate: candidate['vote_count'], reverse=True)
+        contested = len(ranked) >= 2
+        has_votes = bool(totals[row])
+        positions.append({
+            'position_id': result['position_id'],
+            'position_name': result['position_name'],
+            'total_votes': int(totals[row]),
+            'competitiveness': str(classes[row]),
+            'leader': ranked[0]['name'] if ranked and has_votes else None,
+            'runner_up': ranked[1]['name'] if contested and has_votes else None,
+            'margin_votes': int(counts[row, 0] - counts[row, 1]) if contested else None,
+            'margin_points': round(float(margin_points[row]), 2) if contested and has_votes else None,
+            'margin_interval': [
+                round(float(margin_low[row]) * 100, 2), round(float(margin_high[row]) * 100, 2)
+            ] if contested and has_votes else None,
+            'lead_is_significant': bool(margin_low[row] > 0) if contested and has_votes else False,
+            'candidates': [
+                {
+                    'id': candidate['id'],
+                    'name': candidate['name'],
+                    'votes': int(counts[row, column]),
+                    'share': round(float(shares[row, column]) * 100, 2),
+                    'interval': [round(float(low[row, column]) * 100, 2), round(float(high[row, column]) * 100, 2)],
+                }
+                for column, candidate in enumerate(ranked)
+            ],
+        })
+
+    contested_rows = [
+        row for row, entry in enumerate(positions) if entry['margin_points'] is not None
+    ]
+    most_competitive = None
+    if contested_rows:
+        most_competitive = positions[min(contested_rows, key=lambda row: margin_points[row])]['position_name']
+
+    return {
+        'confidence': confidence,
+        'most_competitive': most_competitive,
+        'positions': positions,
+    }
@@ -0,0 +1,115 @@
+"""
+Per-user ballot status cache
+Each voter's voted positions are kept as a bitmask (bit N = the Nth active
+position in ballot order, from the catalog) next to their rendered voting
+history, so the dashboard's status and my-votes requests are answered from
+the cache instead of joining tables. Entries are keyed by the voter's own
+status version kept in the database (Profile.ballot_status_version), so
+their vote handled by any worker retires them everywhere, even with a
+per-process cache backend, while other voters' votes leave them warm.
+Ballot edits retire them through the catalog generation stored in each entry
+"""
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from . import catalog, metrics
+from .models import Profile, Vote
+
+
+def user_key(user_id: int, version: int) -> str:
+    return f'voting:ballot-status:{user_id}:{version}'
+
+
+def cache_timeout() -> int:
+    return getattr(settings, 'BALLOT_STATUS_CACHE_SECONDS', 300)
+
+
+def bump_user_versions(user_ids) -> None:
+    """
+    Retire the cached status of voters whose votes or nickname changed
+    Call inside the transaction that makes the change, so the new version
+    becomes visible together with it
+    """
+    Profile.objects.filter(user_id__in=set(user_ids)).update(ballot_status_version=F('ballot_status_version') + 1)
+
+
+def get_user_version(user) -> Optional[int]:
+    """The voter's status version (one primary-key lookup), or None without a profile"""
+    return Profile.objects.filter(user_id=user.id).values_list('ballot_status_version', flat=True).first()
+
+
+def positions_to_mask(position_ids, bits: Dict[int, int]) -> int:
+    """Bitmask of the positions in `bits` (position id -> bit index); others are ignored"""
+    mask = 0
+    for position_id in position_ids:
+        if position_id in bits:
+            mask |= 1 << bits[position_id]
+    return mask
+
+
+def has_voted(mask: int, bit: int) -> bool:
+    return bool(mask >> bit & 1)
+
+
+def position_bits(ballot: Dict[str, Any]) -> Dict[int, int]:
+    """Position id -> bit index, in ballot order"""
+    return {position['id']: bit for bit, position in enumerate(ballot['positions'])}
+
+
+def build_user_entry(user, ballot: Dict[str, Any]) -> Dict[str, Any]:
+    """Load a voter's votes (one query) into a cacheable entry for the given catalog"""
+    from .ingestion import journal_enabled, get_journal
+    from .serializers import VoteSerializer
+
+    votes = Vote.objects.filter(user=user).select_related('candidate', 'position', 'user__profile')
+    history = [dict(item) for item in VoteSerializer(votes, many=True).data]
+    position_ids = {item['position'] for item in history}
+    if journal_enabled():
+        # Accepted votes still waiting in the journal count as cast
+        position_ids |= get_journal().journaled_positions(user.id)
+    return {'mask': positions_to_mask(position_ids, position_bits(ballot)), 'votes': history}
+
+
+def get_user_entry(user, ballot: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cached {'mask', 'votes'} for a voter, rebuilt on a miss
+    Costs one version lookup; the mask is valid for the catalog it was built against.
+    A user without a profile cannot be retired, so theirs is never cached
+    """
+    version = get_user_version(user)
+    if version is None:
+        return {'ballot': ballot['generation'], **build_user_entry(user, ballot)}
+    key = user_key(user.id, version)
+    entry = cache.get(key)
+    hit = entry is not None and entry['ballot'] == ballot['generation']
+    metrics.cache_lookup('ballot_status', hit)
+    if not hit:
+        entry = {'ballot': ballot['generation'], **build_user_entry(user, ballot)}
+        cache.set(key, entry, cache_timeout())
+    return entry
+
+
+def get_voting_status(user) -> Dict[str, Any]:
+    """Payload for the voting status endpoint"""
+    ballot = catalog.get_catalog()
+    mask = get_user_entry(user, ballot)['mask']
+    positions = ballot['positions']
+    status_data = [
+        {
+            'position_id': position['id'],
+            'position_name': position['name'],
+            'has_voted': has_voted(mask, bit)
+        }
+        for bit, position in enumerate(positions)
+    ]
+    return {
+        'voting_status': status_data,
+        'total_positions': len(positions),
+        'voted_count': bin(mask).count('1')
+    }
+
+
+def get_user_votes(user) -> List[Dict[str, Any]]:
+    """Payload for the my-votes endpoint"""
+    return get_user_entry(user, catalog.get_catalog())['votes']
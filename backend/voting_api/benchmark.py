@@ -0,0 +1,181 @@
+"""
+In-process API benchmark
+Drives the voting_api endpoints through the Django test client from a pool
+of threads and reports throughput, latency percentiles and SQL cost per
+endpoint as JSON that can be diffed between runs
+"""
+import itertools
+import math
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from .generator import SYNTHETIC_EMAIL_DOMAIN, create_students, next_synthetic_number
+from .models import Position
+
+# The SSE stream never completes a request and ai_job polls a job created by
+# another request, so neither is benchmarked here
+READ_ENDPOINTS = [
+    'health_check', 'profile', 'positions_list', 'candidates_list', 'my_votes',
+    'voting_status', 'results', 'position_result', 'stats', 'race_analytics', 'win_forecast', 'token_refresh',
+    'ai_summary', 'ai_prediction', 'ai_turnout', 'ai_insights',
+]
+WRITE_ENDPOINTS = ['register', 'login', 'cast_vote', 'cast_ballot']
+
+# (method, url name, url kwargs, payload, user to authenticate as or None)
+Request = Tuple[str, str, Dict[str, Any], Optional[Dict[str, Any]], Optional[User]]
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class RequestPlan:
+    """
+    Builds the request for the n-th call to an endpoint
+    Readers rotate over existing voters; write endpoints get fresh accounts
+    so every cast is a first vote and every registration is new
+    """
+
+    def __init__(self, readers: List[User], password: str, fresh_voters: List[User]):
+        self.readers = readers
+        self.password = password
+        self.fresh_voters = fresh_voters
+        self.positions = list(Position.objects.filter(is_active=True).prefetch_related('candidates'))
+        self.ballot = [
+            {'position': position.id, 'candidate': position.candidates.all()[0].id}
+            for position in self.positions if position.candidates.all()
+        ]
+        self.registrations = itertools.count(8000000)
+        self.lock = threading.Lock()
+
+    def next_registration(self) -> str:
+        with self.lock:
+            return f'{next(self.registrations):07d}'
+
+    def build(self, name: str, index: int) -> Request:
+        reader = self.readers[index % len(self.readers)]
+        if name == 'position_result':
+            return 'get', name, {'position_id': self.positions[index % len(self.positions)].id}, None, reader
+        if name == 'token_refresh':
+            return 'post', name, {}, {'refresh': str(RefreshToken.for_user(reader))}, None
+        if name == 'register':
+            student_id = self.next_registration()
+            return 'post', name, {}, {
+                'student_id': student_id, 'email': f'{student_id}@benchmark.local', 'nickname': 'Benchmark',
+                'password': 'Ballot-Box-2024!', 'password_confirm': 'Ballot-Box-2024!'
+            }, None
+        if name == 'login':
+            return 'post', name, {}, {'student_id': reader.username, 'password': self.password}, None
+        if name == 'cast_vote':
+            selection = self.ballot[index % len(self.ballot)]
+            return 'post', name, {}, selection, self.fresh_voters[index]
+        if name == 'cast_ballot':
+            return 'post', name, {}, {'votes': self.ballot}, self.fresh_voters[len(self.fresh_voters) // 2 + index]
+        return 'get', name, {}, None, reader
+
+
+def run_endpoint(plan: RequestPlan, name: str, requests: int, concurrency: int, host: str) -> Dict[str, Any]:
+    """Fire `requests` calls at one endpoint from `concurrency` threads"""
+    calls = queue.Queue()
+    for index in range(requests):
+        calls.put(plan.build(name, index))
+    lock = threading.Lock()
+    latencies, query_counts, query_ms, statuses = [], [], [], {}
+
+    def worker():
+        client = APIClient(SERVER_NAME=host)
+        try:
+            while True:
+                try:
+                    method, url_name, kwargs, payload, user = calls.get_nowait()
+                except queue.Empty:
+                    return
+                if user is None:
+                    client.credentials()
+                else:
+                    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+                path = reverse(f'voting_api:{url_name}', kwargs=kwargs)
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    if method == 'get':
+                        response = client.get(path)
+                    else:
+                        response = client.post(path, payload, format='json')
+                    elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    query_counts.append(len(context))
+                    query_ms.append(sum(float(query['time']) for query in context.captured_queries) * 1000)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        finally:
+            for conn in connections.all(initialized_only=True):
+                conn.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        'requests': completed,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'requests_per_second': round(completed / wall, 1) if wall else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+            'max': round(latencies[-1], 2) if latencies else 0.0,
+        },
+        'sql_queries': {
+            'mean': round(sum(query_counts) / completed, 2) if completed else 0.0,
+            'max': max(query_counts, default=0),
+        },
+        'sql_ms_mean': round(sum(query_ms) / completed, 3) if completed else 0.0,
+    }
+
+
+def run_benchmark(
+    endpoints: List[str],
+    requests: int = 200,
+    concurrency: int = 8,
+    password: str = 'test123',
+    log: Callable[[str], None] = lambda message: None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmark each endpoint against the current database
+    Readers are the generated students; write endpoints create their own accounts
+    """
+    readers = list(User.objects.filter(profile__email__endswith=f'@{SYNTHETIC_EMAIL_DOMAIN}').order_by('id')[:500])
+    if not readers:
+        raise ValueError('No generated students to read as; generate a dataset first')
+    fresh_voters = []
+    if {'cast_vote', 'cast_ballot'} & set(endpoints):
+        user_ids = create_students(requests * 2, next_synthetic_number(), password, chunk_size=5000)
+        fresh_voters = list(User.objects.filter(pk__in=user_ids).order_by('username'))
+
+    plan = RequestPlan(readers, password, fresh_voters)
+    host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host), 'testserver')
+    report = {}
+    # AI endpoints are measured without calling the model: only data preparation runs
+    with override_settings(GROQ_API_KEY=''):
+        for name in endpoints:
+            log(f'  {name}...')
+            report[name] = run_endpoint(plan, name, requests, concurrency, host)
+    return report
@@ -0,0 +1,73 @@
+"""
+Ballot catalog cache
+The serialized positions and candidates only change when an admin edits them,
+so each process keeps one prebuilt copy and serves /positions/ and
+/candidates/ from memory. Model signals drop it locally; other processes
+notice through the ballot version in the database, which they read at most
+every BALLOT_CATALOG_CHECK_SECONDS.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from . import metrics
+from .models import Position, Candidate
+from .results import get_ballot_version
+
+_catalog: Optional[Dict[str, Any]] = None
+_lock = threading.Lock()
+
+
+def build_catalog(generation: int) -> Dict[str, Any]:
+    """Serialize the ballot (two queries)"""
+    from .serializers import PositionSerializer, CandidateSerializer
+
+    positions = Position.objects.filter(is_active=True).prefetch_related('candidates')
+    candidates = Candidate.objects.filter(is_active=True).select_related('position')
+    return {
+        'generation': generation,
+        'checked_at': time.monotonic(),
+        'positions': PositionSerializer(positions, many=True).data,
+        'candidates': CandidateSerializer(candidates, many=True).data
+    }
+
+
+def get_catalog() -> Dict[str, Any]:
+    """This process's catalog, rebuilt when missing or superseded"""
+    global _catalog
+    catalog = _catalog
+    check_seconds = getattr(settings, 'BALLOT_CATALOG_CHECK_SECONDS', 5)
+    if catalog is not None and time.monotonic() - catalog['checked_at'] < check_seconds:
+        metrics.cache_lookup('catalog', True)
+        return catalog
+
+    with _lock:
+        generation = get_ballot_version()
+        catalog = _catalog
+        hit = catalog is not None and catalog['generation'] == generation
+        metrics.cache_lookup('catalog', hit)
+        if hit:
+            catalog['checked_at'] = time.monotonic()
+            return catalog
+        _catalog = build_catalog(generation)
+        return _catalog
+
+
+def invalidate() -> None:
+    """Drop this process's catalog (signals call this when the ballot changes)"""
+    global _catalog
+    with _lock:
+        _catalog = None
+
+
+def get_positions() -> List[Dict[str, Any]]:
+    """Active positions with their candidates"""
+    return get_catalog()['positions']
+
+
+def get_candidates(position_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Active candidates, optionally for one position"""
+    candidates = get_catalog()['candidates']
+    if position_id is None:
+        return candidates
+    return [candidate for candidate in candidates if str(candidate['position']) == position_id]
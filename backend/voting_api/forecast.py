@@ -0,0 +1,227 @@
+"""
+Win-probability forecast
+Monte Carlo simulation of the votes still outstanding, for every position
+at once. Each run draws how many of the registered users who have not voted
+for a position yet will do so (a beta draw around the turnout so far) and
+how they split (Dirichlet-multinomial on the current tallies), then records
+who finishes first. Races with no votes outstanding are settled exactly.
+Open races are simulated together in one vectorized pass; each race's
+result is then kept under its own tally, so a vote elsewhere on the ballot
+leaves its figures (and the AI analysis written from them) unchanged and
+only the races whose tallies moved are simulated again.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth.models import User
+import numpy as np
+from . import llm_cache
+from .analytics import vote_matrix
+from .models import Position
+from .results import compute_position_results, get_results_version
+
+# Sized for well under 100 ms per forecast: a cell costs roughly 50 ns, so the
+# demo ballot (6 x 4) runs all 20,000 simulations in about 30 ms and larger
+# ballots get fewer runs. At 20,000 runs a win probability is within about
+# +/-0.7 points (95%)
+DEFAULT_SIMULATIONS = 20_000
+DEFAULT_MAX_CELLS = 500_000
+DEFAULT_REFRESH_SECONDS = 5
+
+# Cells (runs x positions x candidates) drawn per batch; keeps the arrays small enough to reuse
+BATCH_CELLS = 100_000
+
+
+def settled_outcome(counts: np.ndarray, present: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(win probability, expected votes) when no more votes can come in; ties are shared"""
+    leaders = (counts == np.where(present, counts, -1).max(axis=1, keepdims=True)) & present
+    wins = leaders / np.maximum(leaders.sum(axis=1, keepdims=True), 1)
+    return wins, counts.astype(float)
+
+
+def run_simulations(
+    counts: np.ndarray, present: np.ndarray, remaining: np.ndarray, simulations: int, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(win probability, expected final votes) per position and candidate over `simulations` runs"""
+    rows, width = counts.shape
+    totals = counts.sum(axis=1)
+    # Uniform prior over each race's split; absent (padding) candidates get no share
+    alpha = np.where(present, counts + 1.0, 0.0)
+    concentration = alpha.sum(axis=1)
+    expected_split = alpha / np.maximum(concentration, 1.0)[:, None]
+    # Candidates on the first axis: per-run reductions become elementwise ops between
+    # contiguous (runs x positions) slabs instead of strided reductions over a short axis
+    counts_by_candidate = counts.T[:, None, :].astype(float)
+    split_by_candidate = np.ascontiguousarray(expected_split.T[:, None, :])
+    # Absent candidates draw zero votes (gamma with shape 0) and start below everyone
+    absent_offset = np.where(present, 0.0, -1.0).T[:, None, :]
+    wins = np.zeros((width, rows))
+    vote_sums = np.zeros((width, rows))
+
+    batch = max(1, BATCH_CELLS // max(rows * width, 1))
+    for start in range(0, simulations, batch):
+        runs = min(batch, simulations - start)
+        turnout = rng.beta(1.0 + totals, 1.0 + remaining, size=(runs, rows))
+        outstanding = np.rint(turnout * remaining)
+
+        # Dirichlet-multinomial split of the outstanding ballots, drawn as
+        # outstanding x Dirichlet(kappa * expected split) with kappa chosen so the
+        # mean and covariance match DM(outstanding, alpha): one gamma draw per
+        # cell instead of a multinomial per run
+        kappa = np.maximum(outstanding * (concentration + 1) / (outstanding + concentration + 1e-12) - 1, 1.0)
+        final = rng.standard_gamma(kappa * split_by_candidate)
+        drawn = final.sum(axis=0)
+        final *= outstanding / np.where(drawn > 0, drawn, 1.0)
+        final += counts_by_candidate
+        vote_sums += final.sum(axis=1)
+
+        final += absent_offset
+        leaders = final == final.max(axis=0)
+        ties = leaders.sum(axis=0)
+        if (ties > 1).any():
+            wins += (leaders / np.maximum(ties, 1)).sum(axis=1)
+        else:
+            wins += leaders.sum(axis=1)
+
+    return wins.T * present / simulations, vote_sums.T / simulations
+
+
+def simulate_races(
+    position_results: List[Dict[str, Any]], registered: int, simulations: int = DEFAULT_SIMULATIONS,
+    max_cells: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Forecast for every position in `position_results` (compute_position_results() output)
+    given `registered` users, each of whom can vote once per position
+    Shares and win probabilities are percentages. `max_cells` caps
+    runs x candidates in open races, so large ballots get fewer runs; the
+    payload reports the runs used (`simulations`) next to `simulations_requested`
+    """
+    requested = simulations
+    counts = vote_matrix(position_results)
+    width = counts.shape[1]
+    present = np.arange(width) < np.array([len(result['candidates']) for result in position_results], dtype=int)[:, None]
+    totals = counts.sum(axis=1)
+    remaining = np.maximum(registered - totals, 0)
+
+    win_probability, expected_votes = settled_outcome(counts, present)
+    sizes = present.sum(axis=1)
+    open_races = (remaining > 0) & (sizes > 0)
+    if open_races.any():
+        if max_cells is not None:
+            simulations = max(1, min(simulations, max_cells // int(sizes[open_races].sum())))
+        keys = {
+            row: f'{registered}:{simulations}:' + ','.join(map(str, counts[row, :sizes[row]].tolist()))
+            for row in np.flatnonzero(open_races)
+        }
+        # Races with the same tally share one result
+        outcomes = {}
+        missing = {}
+        for row, key in keys.items():
+            if key in outcomes or key in missing:
+                continue
+            cached = llm_cache.race_forecasts.get(key)
+            if cached is None:
+                missing[key] = row
+            else:
+                outcomes[key] = cached[0]
+        if missing:
+            rows = list(missing.values())
+            width = int(sizes[rows].max())
+            rng = np.random.default_rng([registered, simulations, *counts[rows, :width].ravel().tolist()])
+            wins, votes = run_simulations(counts[rows, :width], present[rows, :width], remaining[rows], simulations, rng)
+            for index, (key, row) in enumerate(missing.items()):
+                outcomes[key] = wins[index, :sizes[row]], votes[index, :sizes[row]]
+                llm_cache.race_forecasts.set(key, outcomes[key])
+        for row, key in keys.items():
+            win_probability[row, :sizes[row]], expected_votes[row, :sizes[row]] = outcomes[key]
+    else:
+        simulations = 0
+
+    expected_totals = expected_votes.sum(axis=1)
+    expected_share = expected_votes / np.where(expected_totals > 0, expected_totals, 1.0)[:, None] * 100
+    win_probability = win_probability * 100
+    positions = []
+    for row, result in enumerate(position_results):
+        ranked = sorted(result['candidates'], key=lambda candidate: candidate['vote_count'], reverse=True)
+        total = int(totals[row])
+        positions.append({
+            'position_id': result['position_id'],
+            'position_name': result['position_name'],
+            'total_votes': total,
+            'remaining_voters': int(remaining[row]),
+            'expected_total_votes': round(float(expected_totals[row]), 1),
+            'favourite': ranked[int(np.argmax(win_probability[row, :len(ranked)]))]['name'] if ranked else None,
+            'candidates': [
+                {
+                    'id': candidate['id'],
+                    'name': candidate['name'],
+                    'votes': int(counts[row, column]),
+                    'share': round(float(counts[row, column]) / total * 100, 2) if total else 0.0,
+                    'expected_share': round(float(expected_share[row, column]), 2),
+                    'win_probability': round(float(win_probability[row, column]), 2),
+                }
+                for column, candidate in enumerate(ranked)
+            ],
+        })
+
+    return {
+        'simulations': simulations,
+        'simulations_requested': requested,
+        'registered': registered,
+        'positions': positions,
+    }
+
+
+def get_forecast_entry() -> Tuple[int, Dict[str, Any]]:
+    """
+    (election-state version it was computed at, forecast) for the active
+    positions with the FORECAST_* settings
+    Reused while the election-state version is unchanged, and for up to
+    FORECAST_REFRESH_SECONDS after it changes, so a stream of votes costs one
+    simulation every few seconds rather than one per vote. The version is the
+    one to describe the forecast by (ETag), which may be older than the current one
+    """
+    version = get_results_version()
+    cached = llm_cache.forecasts.get('latest')
+    if cached is not None:
+        (cached_version, forecast), age = cached
+        if cached_version == version or age < getattr(settings, 'FORECAST_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS):
+            return cached_version, forecast
+    forecast = simulate_races(
+        compute_position_results(Position.objects.filter(is_active=True)),
+        User.objects.count(),
+        getattr(settings, 'FORECAST_SIMULATIONS', DEFAULT_SIMULATIONS),
+        getattr(settings, 'FORECAST_MAX_CELLS', DEFAULT_MAX_CELLS)
+    )
+    llm_cache.forecasts.set('latest', (version, forecast))
+    return version, forecast
+
+
+def get_forecast() -> Dict[str, Any]:
+    """The forecast of get_forecast_entry()"""
+    return get_forecast_entry()[1]
+
+
+def forecast_tallies(forecast: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    The tallies a forecast was computed from, as compute_position_results()
+    entries (without winners), so analysis next to the forecast describes
+    the same votes even when the forecast predates the latest ones
+    """
+    return [
+        {
+            'position_id': position['position_id'],
+            'position_name': position['position_name'],
+            'total_votes': position['total_votes'],
+            'candidates': [
+                {
+                    'id': candidate['id'],
+                    'name': candidate['name'],
+                    'vote_count': candidate['votes'],
+                    'percentage': candidate['share'],
+                }
+                for candidate in position['candidates']
+            ],
+        }
+        for position in forecast['positions']
+    ]
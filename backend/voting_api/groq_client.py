@@ -0,0 +1,164 @@
+"""
+Process-wide Groq client
+One groq.Groq client per process: the SDK keeps its HTTP connections alive,
+applies separate connect and read timeouts and retries timeouts, connection
+errors, 429 and 5xx with backoff. Around it sits only a circuit breaker that
+fails fast while the provider is down, so requests stop waiting out retries
+against an outage.
+"""
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Iterator, Optional, Tuple
+import groq
+import httpx
+from django.conf import settings
+
+# Statuses that mean the provider is in trouble (anything else is our request being refused)
+FAILURE_STATUSES = {408, 429}
+
+
+class CircuitOpen(groq.GroqError):
+    """Recent calls failed; not calling Groq until the breaker resets"""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `reset_seconds`; then lets one trial call through (half-open) and closes
+    again if it succeeds
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return 'open'
+            return 'half-open'
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may go out now"""
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_seconds or self.trial_running:
+                raise CircuitOpen('Groq circuit breaker is open')
+            self.trial_running = True
+
+    def after_call(self) -> None:
+        """End a half-open trial however the call went, so the next one may go out"""
+        with self.lock:
+            self.trial_running = False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """Whether a Groq error counts against the breaker"""
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code >= 500 or error.status_code in FAILURE_STATUSES
+    return isinstance(error, groq.APIError)  # Timeouts and connection errors
+
+
+class GuardedGroqClient:
+    """
+    A groq.Groq client behind the circuit breaker, with the SDK's
+    `client.chat.completions.create(...)` call shape
+    """
+
+    def __init__(self, client: groq.Groq, breaker: CircuitBreaker):
+        self.client = client
+        self.breaker = breaker
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create_chat_completion))
+
+    def create_chat_completion(self, **options) -> Any:
+        """chat.completions.create guarded by the breaker; the SDK does the retrying"""
+        self.breaker.before_call()
+        try:
+            response = self.client.chat.completions.create(**options)
+        except groq.GroqError as e:
+            if is_provider_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()  # Provider reachable; the request was refused
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self.breaker.after_call()
+        return self.guard_stream(response) if options.get('stream') else response
+
+    def guard_stream(self, chunks) -> Iterator[Any]:
+        """Completion chunks; a stream that breaks off counts as a failure (it cannot be retried)"""
+        try:
+            yield from chunks
+        except groq.APIError:
+            self.breaker.record_failure()
+            raise
+
+    def close(self) -> None:
+        self.client.close()
+
+
+_client: Optional[GuardedGroqClient] = None
+_client_config: Optional[Tuple] = None
+_client_lock = threading.Lock()
+
+
+def client_config() -> Tuple:
+    return (
+        settings.GROQ_API_KEY,
+        getattr(settings, 'GROQ_BASE_URL', 'https://api.groq.com'),
+        getattr(settings, 'GROQ_CONNECT_TIMEOUT', 5.0),
+        getattr(settings, 'GROQ_READ_TIMEOUT', 30.0),
+        getattr(settings, 'GROQ_MAX_RETRIES', 2),
+        getattr(settings, 'GROQ_BREAKER_FAILURE_THRESHOLD', 5),
+        getattr(settings, 'GROQ_BREAKER_RESET_SECONDS', 30.0),
+    )
+
+
+def build_client(
+    api_key: str, base_url: str, connect_timeout: float, read_timeout: float, max_retries: int,
+    breaker_threshold: int, breaker_reset_seconds: float
+) -> GuardedGroqClient:
+    client = groq.Groq(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        max_retries=max_retries,
+    )
+    return GuardedGroqClient(client, CircuitBreaker(breaker_threshold, breaker_reset_seconds))
+
+
+def get_client() -> Optional[GuardedGroqClient]:
+    """The process-wide client (rebuilt when its settings change), or None without an API key"""
+    global _client, _client_config
+    config = client_config()
+    if not config[0]:
+        return None
+    with _client_lock:
+        if _client is None or _client_config != config:
+            if _client is not None:
+                _client.close()
+            _client = build_client(*config)
+            _client_config = config
+        return _client
@@ -0,0 +1,354 @@
+"""
+Write-behind vote ingestion
+Accepted votes are appended to a durable local journal and acknowledged
+immediately; a flusher thread moves them into the Vote table in batches.
+Enable with VOTE_INGESTION_MODE = 'journal'.
+"""
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, close_old_connections, transaction
+from .models import Candidate, Vote
+from .signals import votes_cast
+from .ballot_status import bump_user_versions
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateVote(Exception):
+    """The journal already holds a vote for this (user, position)"""
+
+    def __init__(self, position_ids):
+        self.position_ids = set(position_ids)
+        super().__init__(f"Duplicate vote for positions {sorted(self.position_ids)}")
+
+
+def journal_enabled() -> bool:
+    """Whether vote casts go through the write-behind journal"""
+    return getattr(settings, 'VOTE_INGESTION_MODE', 'direct') == 'journal'
+
+
+class VoteJournal:
+    """
+    Append-only journal in a separate SQLite database (WAL mode)
+    UNIQUE(user_id, position_id) makes the journal the duplicate arbiter at
+    accept time across every worker process. Flushed rows are kept for
+    VOTE_JOURNAL_RETENTION_SECONDS, so repeats racing a flush are still
+    rejected, then pruned: from there the Vote table is the arbiter, and a
+    vote an admin deletes can be cast again. Entries that can no longer be
+    inserted (their user, position or candidate was deleted) move to
+    vote_journal_rejected instead of blocking every later batch
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS vote_journal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            position_id INTEGER NOT NULL,
+            candidate_id INTEGER NOT NULL,
+            accepted_at TEXT NOT NULL,
+            claimed_by TEXT,
+            claimed_at REAL,
+            flushed_at TEXT,
+            UNIQUE (user_id, position_id)
+        );
+        CREATE INDEX IF NOT EXISTS vote_journal_pending
+            ON vote_journal (flushed_at, claimed_at);
+        CREATE TABLE IF NOT EXISTS vote_journal_rejected (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            position_id INTEGER NOT NULL,
+            candidate_id INTEGER NOT NULL,
+            accepted_at TEXT NOT NULL,
+            rejected_at TEXT NOT NULL,
+            reason TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def connect(self) -> sqlite3.Connection:
+        """Per-thread connection; synchronous=FULL so an acknowledged vote survives a crash"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.executescript(self.SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def append(self, entries: Iterable[Tuple[int, int, int]]) -> str:
+        """
+        Durably record (user_id, position_id, candidate_id) entries, all or nothing
+        Raises DuplicateVote naming the positions that were already journaled
+        """
+        entries = list(entries)
+        accepted_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO vote_journal (user_id, position_id, candidate_id, accepted_at) VALUES (?, ?, ?, ?)',
+                [(user_id, position_id, candidate_id, accepted_at) for user_id, position_id, candidate_id in entries]
+            )
+        except sqlite3.IntegrityError:
+            conn.execute('ROLLBACK')
+            raise DuplicateVote(self.journaled_positions(entries[0][0], [entry[1] for entry in entries]))
+        conn.execute('COMMIT')
+        return accepted_at
+
+    def journaled_positions(self, user_id: int, position_ids: Optional[List[int]] = None) -> set:
+        """Positions the user has a journaled (pending or flushed) vote for"""
+        query = 'SELECT position_id FROM vote_journal WHERE user_id = ?'
+        params = [user_id]
+        if position_ids is not None:
+            query += f" AND position_id IN ({','.join('?' * len(position_ids))})"
+            params += list(position_ids)
+        return {row[0] for row in self.connect().execute(query, params)}
+
+    def claim(self, limit: int, lease_seconds: float) -> List[Dict]:
+        """
+        Lease up to `limit` unflushed entries to this flusher
+        Entries whose lease expired (flusher crashed mid-flush) are reclaimed
+        """
+        now = time.time()
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(
+            """UPDATE vote_journal SET claimed_by = ?, claimed_at = ?
+               WHERE id IN (
+                   SELECT id FROM vote_journal
+                   WHERE flushed_at IS NULL AND (claimed_at IS NULL OR claimed_at < ? OR claimed_by = ?)
+                   ORDER BY id LIMIT ?
+               )""",
+            (self.owner, now, now - lease_seconds, self.owner, limit)
+        )
+        rows = conn.execute(
+            """SELECT id, user_id, position_id, candidate_id, accepted_at FROM vote_journal
+               WHERE flushed_at IS NULL AND claimed_by = ? ORDER BY id LIMIT ?""",
+            (self.owner, limit)
+        ).fetchall()
+        conn.execute('COMMIT')
+        keys = ('id', 'user_id', 'position_id', 'candidate_id', 'accepted_at')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def mark_flushed(self, entry_ids: List[int]):
+        """Record that entries are in the Vote table"""
+        if not entry_ids:
+            return
+        flushed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany(
+            'UPDATE vote_journal SET flushed_at = ?, claimed_by = NULL, claimed_at = NULL WHERE id = ?',
+            [(flushed_at, entry_id) for entry_id in entry_ids]
+        )
+        conn.execute('COMMIT')
+
+    def reject(self, entries: List[Dict], reasons: Dict[int, str]):
+        """Move entries (claim() rows) to vote_journal_rejected with the reason for each id"""
+        if not entries:
+            return
+        rejected_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany(
+            """INSERT OR REPLACE INTO vote_journal_rejected
+               (id, user_id, position_id, candidate_id, accepted_at, rejected_at, reason)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (entry['id'], entry['user_id'], entry['position_id'], entry['candidate_id'],
+                 entry['accepted_at'], rejected_at, reasons[entry['id']])
+                for entry in entries
+            ]
+        )
+        conn.executemany('DELETE FROM vote_journal WHERE id = ?', [(entry['id'],) for entry in entries])
+        conn.execute('COMMIT')
+
+    def prune(self, retention_seconds: float) -> int:
+        """Delete entries flushed more than `retention_seconds` ago; returns how many"""
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=retention_seconds)
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        deleted = conn.execute(
+            'DELETE FROM vote_journal WHERE flushed_at IS NOT NULL AND flushed_at < ?', (cutoff.isoformat(),)
+        ).rowcount
+        conn.execute('COMMIT')
+        return deleted
+
+    def pending_count(self) -> int:
+        """Entries not yet in the Vote table"""
+        return self.connect().execute('SELECT COUNT(*) FROM vote_journal WHERE flushed_at IS NULL').fetchone()[0]
+
+    def rejected_count(self) -> int:
+        """Entries that could not be inserted"""
+        return self.connect().execute('SELECT COUNT(*) FROM vote_journal_rejected').fetchone()[0]
+
+
+def invalid_entries(entries: List[Dict]) -> Dict[int, str]:
+    """
+    Entry id -> reason for entries whose user or candidate has been deleted,
+    or whose candidate no longer stands for the position; inserting them
+    would fail the whole batch on a foreign key
+    """
+    users = set(User.objects.filter(id__in={entry['user_id'] for entry in entries}).values_list('id', flat=True))
+    candidates = dict(
+        Candidate.objects.filter(id__in={entry['candidate_id'] for entry in entries}).values_list('id', 'position_id')
+    )
+    reasons = {}
+    for entry in entries:
+        if entry['user_id'] not in users:
+            reasons[entry['id']] = 'user deleted'
+        elif entry['candidate_id'] not in candidates:
+            reasons[entry['id']] = 'candidate deleted'
+        elif candidates[entry['candidate_id']] != entry['position_id']:
+            reasons[entry['id']] = 'candidate not standing for this position'
+    return reasons
+
+
+def flush_batch(journal: VoteJournal, batch_size: int, lease_seconds: float) -> int:
+    """
+    Move one batch of journaled votes into the Vote table
+    Entries whose (user, position) already has a Vote (e.g. a crash after the
+    insert committed but before the journal was marked) are skipped, so
+    replaying a batch is idempotent. Entries that can no longer be inserted
+    are rejected (see invalid_entries()). Returns the number of entries processed.
+    """
+    claimed = journal.claim(batch_size, lease_seconds)
+    if not claimed:
+        return 0
+
+    reasons = invalid_entries(claimed)
+    if reasons:
+        journal.reject([entry for entry in claimed if entry['id'] in reasons], reasons)
+        logger.warning('Vote journal rejected %d entries: %s', len(reasons), sorted(set(reasons.values())))
+    entries = [entry for entry in claimed if entry['id'] not in reasons]
+
+    with transaction.atomic():
+        existing = set(Vote.objects.filter(
+            user_id__in={entry['user_id'] for entry in entries},
+            position_id__in={entry['position_id'] for entry in entries}
+        ).values_list('user_id', 'position_id'))
+
+        votes = [
+            Vote(
+                user_id=entry['user_id'],
+                position_id=entry['position_id'],
+                candidate_id=entry['candidate_id'],
+                timestamp=datetime.datetime.fromisoformat(entry['accepted_at'])
+            )
+            for entry in entries
+            if (entry['user_id'], entry['position_id']) not in existing
+        ]
+        if votes:
+            Vote.objects.bulk_create(votes)
+            votes_cast(votes)
+
+    journal.mark_flushed([entry['id'] for entry in entries])
+    return len(claimed)
+
+
+def flush_journal(journal: VoteJournal, batch_size: int = None, lease_seconds: float = None) -> int:
+    """
+    Flush until the journal has nothing claimable, then prune entries flushed
+    more than VOTE_JOURNAL_RETENTION_SECONDS ago; returns entries processed
+    """
+    batch_size = batch_size or getattr(settings, 'VOTE_JOURNAL_BATCH_SIZE', 500)
+    if lease_seconds is None:
+        lease_seconds = getattr(settings, 'VOTE_JOURNAL_LEASE_SECONDS', 30)
+    total = 0
+    while True:
+        flushed = flush_batch(journal, batch_size, lease_seconds)
+        if not flushed:
+            break
+        total += flushed
+    journal.prune(getattr(settings, 'VOTE_JOURNAL_RETENTION_SECONDS', 300))
+    return total
+
+
+class VoteFlusher(threading.Thread):
+    """
+    Background thread that drains the journal every flush interval
+    """
+
+    def __init__(self, journal: VoteJournal):
+        super().__init__(name='vote-journal-flusher', daemon=True)
+        self.journal = journal
+        self.wakeup = threading.Event()
+        self.interval = getattr(settings, 'VOTE_JOURNAL_FLUSH_INTERVAL', 0.5)
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                flush_journal(self.journal)
+            except IntegrityError:
+                # A direct insert raced this batch; the next pass skips it
+                logger.warning('Vote journal batch conflicted with an existing vote; retrying')
+            except Exception:
+                logger.exception('Vote journal flush failed; entries stay pending')
+            finally:
+                close_old_connections()
+
+
+_journal: Optional[VoteJournal] = None
+_flusher: Optional[VoteFlusher] = None
+_lock = threading.Lock()
+
+
+def get_journal() -> VoteJournal:
+    """Process-wide journal at VOTE_JOURNAL_PATH"""
+    global _journal
+    with _lock:
+        if _journal is None or _journal.path != str(settings.VOTE_JOURNAL_PATH):
+            _journal = VoteJournal(settings.VOTE_JOURNAL_PATH)
+        return _journal
+
+
+def ensure_flusher() -> None:
+    """Start this process's flusher thread on first use"""
+    global _flusher
+    if not getattr(settings, 'VOTE_JOURNAL_BACKGROUND_FLUSH', True):
+        return
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = VoteFlusher(get_journal())
+            _flusher.start()
+
+
+def accept_votes(user, votes: List[Vote]) -> None:
+    """
+    Journal already-validated (unsaved) votes for later insertion
+    Rejects positions with a vote in the Vote table (cast before the journal
+    was enabled) or in the journal; sets each vote's timestamp to accept time
+    """
+    journal = get_journal()
+    position_ids = [vote.position_id for vote in votes]
+    recorded = set(Vote.objects.filter(user=user, position_id__in=position_ids).values_list('position_id', flat=True))
+    if recorded:
+        raise DuplicateVote(recorded)
+
+    accepted_at = journal.append((user.id, vote.position_id, vote.candidate_id) for vote in votes)
+    for vote in votes:
+        vote.timestamp = datetime.datetime.fromisoformat(accepted_at)
+    bump_user_versions([user.id])
+    ensure_flusher()
@@ -0,0 +1,191 @@
+"""
+Per-request timing instrumentation
+Opt-in middleware (REQUEST_TIMING_ENABLED) that measures SQL, authentication,
+view, render and LLM time for every request, reports them in a Server-Timing
+header and logs requests slower than REQUEST_TIMING_SLOW_MS together with
+their most repeated SQL statements (the signature of an N+1 query)
+"""
+import contextvars
+import json
+import logging
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, List, Optional
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger('voting_api.slow_requests')
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Timings collected for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = defaultdict(float)  # seconds
+        self.queries: Dict[str, List[float]] = defaultdict(list)  # sql -> durations
+        self.view_started: Optional[float] = None
+        self.render_started: Optional[float] = None
+        self.render_finished: Optional[float] = None
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] += seconds
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries[sql].append(time.perf_counter() - started)
+
+    @property
+    def query_count(self) -> int:
+        return sum(len(durations) for durations in self.queries.values())
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(sum(durations) for durations in self.queries.values())
+
+    def repeated_queries(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Statements run more than once, most frequent first"""
+        repeated = [
+            {'sql': sql, 'count': len(durations), 'total_ms': round(sum(durations) * 1000, 2)}
+            for sql, durations in self.queries.items() if len(durations) > 1
+        ]
+        repeated.sort(key=lambda entry: (-entry['count'], -entry['total_ms']))
+        return repeated[:limit]
+
+    def summary(self, finished: float) -> Dict[str, float]:
+        """Milliseconds per phase; view time excludes rendering"""
+        view_finished = self.render_started or finished
+        result = {
+            'total': finished - self.started,
+            'db': self.db_seconds,
+            'view': view_finished - self.view_started if self.view_started else 0.0,
+            'render': (self.render_finished or finished) - self.render_started if self.render_started else 0.0,
+        }
+        result.update(self.phases)
+        return {phase: round(seconds * 1000, 2) for phase, seconds in result.items()}
+
+
+@contextmanager
+def timed(phase: str):
+    """Add the enclosed block's duration to a phase of the current request (no-op when disabled)"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - started)
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """JWT authentication reported as the `auth` phase"""
+
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+
+def server_timing_header(summary: Dict[str, float], query_count: int) -> str:
+    """Format phases as a Server-Timing header value"""
+    entries = []
+    for phase, duration in summary.items():
+        entry = f'{phase};dur={duration}'
+        if phase == 'db':
+            entry += f';desc="{query_count} queries"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+class RequestTimingMiddleware:
+    """
+    Measure each request and expose the result as a Server-Timing header
+    Place first in MIDDLEWARE so `total` covers the whole stack. Natively sync
+    or async, like the handler, so ASGI streams get no extra thread hops
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'REQUEST_TIMING_SLOW_MS', 500)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            with self.recording_queries(timing):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)  # Copied into the threads that run sync code for this request
+        try:
+            # Connections are per thread: wrap the ones of the thread this request's
+            # sync code (views, ORM) runs on
+            recording = await sync_to_async(self.recording_queries)(timing)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(recording.close)()
+        finally:
+            _current.reset(token)
+        return self.report(request, response, timing)
+
+    def recording_queries(self, timing: RequestTiming) -> ExitStack:
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timing.record_query))
+        return stack
+
+    def report(self, request, response, timing: RequestTiming):
+        summary = timing.summary(time.perf_counter())
+        response['Server-Timing'] = server_timing_header(summary, timing.query_count)
+        if summary['total'] >= self.slow_ms:
+            self.log_slow_request(request, response, timing, summary)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = _current.get()
+        if timing is not None:
+            timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns
+        timing = _current.get()
+        if timing is not None:
+            timing.render_started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: setattr(timing, 'render_finished', time.perf_counter()))
+        return response
+
+    def log_slow_request(self, request, response, timing: RequestTiming, summary: Dict[str, float]):
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user_id': getattr(getattr(request, 'user', None), 'id', None),
+            'queries': timing.query_count,
+            'timings_ms': summary,
+            'repeated_sql': timing.repeated_queries(),
+        }))
@@ -0,0 +1,93 @@
+"""
+LLM analysis cache
+A Groq completion takes seconds and depends only on its prompt inputs, so
+each process keeps generated analyses under a fingerprint of the voting
+data, model and prompt template version, and the per-race fragments that
+summaries and predictions are stitched from under a fingerprint of the
+race's prompt. Entries expire after AI_CACHE_TTL_SECONDS, and the least
+recently used go first beyond AI_CACHE_MAX_ENTRIES
+(AI_FRAGMENT_CACHE_MAX_ENTRIES for fragments).
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from django.conf import settings
+
+
+class LRUCache:
+    """Thread-safe mapping bounded by age and size"""
+
+    def __init__(self, max_entries_setting: Optional[str], default_max_entries: int, ttl_setting: str, default_ttl: float):
+        self.max_entries_setting = max_entries_setting  # None: always default_max_entries
+        self.default_max_entries = default_max_entries
+        self.ttl_setting = ttl_setting
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[str, Tuple[Any, float]]' = OrderedDict()  # key -> (value, stored at)
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, age in seconds), or None when missing or expired"""
+        ttl = getattr(settings, self.ttl_setting, self.default_ttl)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            age = time.monotonic() - entry[1]
+            if age > ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0], age
+
+    def set(self, key: str, value: Any) -> None:
+        max_entries = self.default_max_entries
+        if self.max_entries_setting:
+            max_entries = getattr(settings, self.max_entries_setting, max_entries)
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+# fingerprint -> generated text
+analyses = LRUCache('AI_CACHE_MAX_ENTRIES', 128, 'AI_CACHE_TTL_SECONDS', 600)
+# fingerprint of one race's prompt -> generated text for that race
+fragments = LRUCache('AI_FRAGMENT_CACHE_MAX_ENTRIES', 1024, 'AI_CACHE_TTL_SECONDS', 600)
+# election-state version -> prepared voting data (only the latest is useful)
+snapshots = LRUCache(None, 1, 'AI_CACHE_TTL_SECONDS', 600)
+# "kind:model" -> newest successful analysis, served while the model is failing
+last_good = LRUCache(None, 64, 'AI_STALE_TTL_SECONDS', 86400)
+# 'latest' -> (election-state version, win-probability forecast)
+forecasts = LRUCache(None, 1, 'AI_CACHE_TTL_SECONDS', 600)
+# registered users, runs and one race's tally -> (win probabilities, expected votes)
+race_forecasts = LRUCache('FORECAST_RACE_CACHE_MAX_ENTRIES', 1024, 'AI_CACHE_TTL_SECONDS', 600)
+
+
+def fingerprint(kind: str, prompt_version: int, model: str, inputs: Any) -> str:
+    """Stable hash of everything a completion depends on"""
+    payload = json.dumps(
+        {'kind': kind, 'prompt_version': prompt_version, 'model': model, 'inputs': inputs},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def clear() -> None:
+    """Forget every cached analysis, fragment, snapshot, forecast and fallback in this process"""
+    analyses.clear()
+    fragments.clear()
+    snapshots.clear()
+    last_good.clear()
+    forecasts.clear()
+    race_forecasts.clear()
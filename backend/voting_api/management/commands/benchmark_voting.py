@@ -0,0 +1,88 @@
+"""
+Django Management Command to Benchmark the Voting API
+Generates an election in a throwaway database, drives every endpoint through
+the Django test client and prints a JSON report (diff it between runs)
+Usage: python manage.py benchmark_voting --students 20000 --requests 500 --concurrency 16 --output bench.json
+"""
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from voting_api.benchmark import READ_ENDPOINTS, WRITE_ENDPOINTS, run_benchmark
+from voting_api.generator import generate_election, synthetic_ballot
+
+
+class Command(BaseCommand):
+    help = 'Report requests/sec, p50/p95/p99 latency and SQL cost for each API endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000, help='Generated students (dataset size)')
+        parser.add_argument('--positions', type=int, default=6, help='Generated positions')
+        parser.add_argument('--candidates', type=int, default=4, help='Candidates per position')
+        parser.add_argument('--turnout', type=float, default=0.7, help='Share of students who vote')
+        parser.add_argument('--seed', type=int, default=42, help='Dataset random seed')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads')
+        parser.add_argument(
+            '--endpoints', nargs='+', choices=READ_ENDPOINTS + WRITE_ENDPOINTS,
+            help='Endpoints to run (default: all)'
+        )
+        parser.add_argument(
+            '--current-db', action='store_true',
+            help='Benchmark the configured database as-is (read endpoints only, no dataset generation)'
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'] or READ_ENDPOINTS + WRITE_ENDPOINTS
+        if options['current_db']:
+            writes = set(endpoints) & set(WRITE_ENDPOINTS)
+            if options['endpoints'] and writes:
+                raise CommandError(f'--current-db only runs read endpoints, not {", ".join(sorted(writes))}')
+            endpoints = [name for name in endpoints if name in READ_ENDPOINTS]
+
+        log = lambda message: self.stderr.write(message)
+        setup_test_environment()
+        old_name = None
+        try:
+            dataset = None
+            if not options['current_db']:
+                log('Creating benchmark database...')
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                started = time.monotonic()
+                dataset = generate_election(
+                    synthetic_ballot(options['positions'], options['candidates']),
+                    students=options['students'], turnout=options['turnout'], seed=options['seed'],
+                    log=lambda message: log(f'  {message}')
+                )
+                dataset['seconds'] = round(time.monotonic() - started, 1)
+
+            log(f'Benchmarking {len(endpoints)} endpoints...')
+            try:
+                results = run_benchmark(
+                    endpoints, requests=options['requests'], concurrency=options['concurrency'], log=log
+                )
+            except ValueError as error:
+                raise CommandError(str(error))
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'config': {
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'database': connection.vendor,
+            },
+            'dataset': dataset,
+            'endpoints': results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            log(f'Report written to {options["output"]}')
+        else:
+            self.stdout.write(output)
@@ -1,114 +1,159 @@
 """
-Django Management Command to Populate Database with Dummy Data
-Usage: python manage.py populate_data
+Django Management Command to Populate Database with Election Data
+Usage:
+    python manage.py populate_data                       # demo ballot and three test users
+    python manage.py populate_data --students 100000     # plus 100k students voting on it
+    python manage.py populate_data --positions 20 --candidates 5 --students 100000 \\
+        --turnout 0.8 --distribution close --seed 7
 """
-from django.core.management.base import BaseCommand
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from voting_api.generator import (
+    DISTRIBUTIONS, SYNTHETIC_STUDENT_LIMIT, clear_election, generate_election, synthetic_ballot,
+    synthetic_student_id
+)
 from voting_api.models import Position, Candidate, Profile
 
 
+DEMO_POSITIONS = [
+    {'name': 'President', 'description': 'Lead the student body and represent all students', 'order': 1},
+    {'name': 'Vice President', 'description': 'Assist the President and oversee committees', 'order': 2},
+    {'name': 'Secretary', 'description': 'Manage records and communications', 'order': 3},
+    {'name': 'Treasurer', 'description': 'Handle finances and budget planning', 'order': 4},
+    {'name': 'Public Relations Officer', 'description': 'Manage external communications and events', 'order': 5},
+    {'name': 'Sports Director', 'description': 'Organize sports activities and tournaments', 'order': 6},
+]
+
+
+DEMO_CANDIDATES = [
+    # President Candidates
+    {'position': 'President', 'name': 'John Anderson', 'bio': 'Senior with 3 years of leadership experience. Focused on student welfare and campus improvements.'},
+    {'position': 'President', 'name': 'Sarah Williams', 'bio': 'Passionate about environmental sustainability and student mental health initiatives.'},
+    {'position': 'President', 'name': 'Michael Chen', 'bio': 'Former VP with proven track record in organizing successful campus events.'},
+
+    # Vice President Candidates
+    {'position': 'Vice President', 'name': 'Emily Johnson', 'bio': 'Dedicated to improving student-faculty communication and academic support.'},
+    {'position': 'Vice President', 'name': 'David Martinez', 'bio': 'Experienced in coordinating large-scale student projects and initiatives.'},
+    {'position': 'Vice President', 'name': 'Lisa Thompson', 'bio': 'Advocate for diversity and inclusion programs on campus.'},
+
+    # Secretary Candidates
+    {'position': 'Secretary', 'name': 'Robert Brown', 'bio': 'Detail-oriented with excellent organizational and communication skills.'},
+    {'position': 'Secretary', 'name': 'Jennifer Davis', 'bio': 'Former newsletter editor with strong writing and documentation abilities.'},
+
+    # Treasurer Candidates
+    {'position': 'Treasurer', 'name': 'James Wilson', 'bio': 'Economics major with experience in budget management and financial planning.'},
+    {'position': 'Treasurer', 'name': 'Amanda Garcia', 'bio': 'Accounting background with transparent and efficient fund management approach.'},
+    {'position': 'Treasurer', 'name': 'Christopher Lee', 'bio': 'Business student committed to maximizing student organization funding.'},
+
+    # Public Relations Officer Candidates
+    {'position': 'Public Relations Officer', 'name': 'Sophia Rodriguez', 'bio': 'Social media expert with creative marketing and outreach strategies.'},
+    {'position': 'Public Relations Officer', 'name': 'Daniel White', 'bio': 'Communications major focused on building strong community partnerships.'},
+
+    # Sports Director Candidates
+    {'position': 'Sports Director', 'name': 'Ryan Taylor', 'bio': 'Varsity athlete dedicated to promoting sports and fitness for all students.'},
+    {'position': 'Sports Director', 'name': 'Michelle Adams', 'bio': 'Former team captain with experience organizing intramural tournaments.'},
+    {'position': 'Sports Director', 'name': 'Kevin Harris', 'bio': 'PE major committed to inclusive sports programs and wellness initiatives.'},
+]
+
+
+TEST_USERS = [
+    {'student_id': 'TEST001', 'email': 'alice@test.com', 'nickname': 'Alice'},
+    {'student_id': 'TEST002', 'email': 'bob@test.com', 'nickname': 'Bob'},
+    {'student_id': 'TEST003', 'email': 'charlie@test.com', 'nickname': 'Charlie'},
+]
+
+
+def demo_ballot():
+    """The demo ballot as a generator spec"""
+    return [
+        {**position, 'candidates': [
+            {'name': candidate['name'], 'bio': candidate['bio']}
+            for candidate in DEMO_CANDIDATES if candidate['position'] == position['name']
+        ]}
+        for position in DEMO_POSITIONS
+    ]
+
+
 class Command(BaseCommand):
-    help = 'Populate database with dummy voting data'
+    help = 'Populate database with the demo ballot or a synthetic election of any size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--positions', type=int, help='Generate this many synthetic positions instead of the demo ballot')
+        parser.add_argument('--candidates', type=int, default=3, help='Candidates per synthetic position')
+        parser.add_argument('--students', type=int, default=0, help='Synthetic students to create (they vote)')
+        parser.add_argument('--turnout', type=float, default=0.7, help='Share of students who vote')
+        parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='skewed', help='Shape of candidate support')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same election)')
+        parser.add_argument('--hours', type=float, default=8, help='Length of the voting window ending now')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk insert / transaction')
+        parser.add_argument('--password', default='test123', help='Password shared by every generated account')
 
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
+        if options['students'] and not 0 < options['turnout'] <= 1:
+            raise CommandError('--turnout must be between 0 and 1')
+        if options['students'] > SYNTHETIC_STUDENT_LIMIT:
+            raise CommandError(f'--students must be at most {SYNTHETIC_STUDENT_LIMIT}')
+        started = time.monotonic()
         self.stdout.write('Starting data population...')
-        
-        # Clear existing data (optional)
-        self.stdout.write('Clearing existing positions and candidates...')
-        Candidate.objects.all().delete()
-        Position.objects.all().delete()
-        
-        # Create Positions
-        positions_data = [
-            {'name': 'President', 'description': 'Lead the student body and represent all students', 'order': 1},
-            {'name': 'Vice President', 'description': 'Assist the President and oversee committees', 'order': 2},
-            {'name': 'Secretary', 'description': 'Manage records and communications', 'order': 3},
-            {'name': 'Treasurer', 'description': 'Handle finances and budget planning', 'order': 4},
-            {'name': 'Public Relations Officer', 'description': 'Manage external communications and events', 'order': 5},
-            {'name': 'Sports Director', 'description': 'Organize sports activities and tournaments', 'order': 6},
-        ]
-        
-        self.stdout.write('Creating positions...')
-        positions = {}
-        for pos_data in positions_data:
-            position = Position.objects.create(**pos_data)
-            positions[pos_data['name']] = position
-            self.stdout.write(f'  ✓ Created position: {pos_data["name"]}')
-        
-        # Create Candidates
-        candidates_data = [
-            # President Candidates
-            {'position': 'President', 'name': 'John Anderson', 'bio': 'Senior with 3 years of leadership experience. Focused on student welfare and campus improvements.'},
-            {'position': 'President', 'name': 'Sarah Williams', 'bio': 'Passionate about environmental sustainability and student mental health initiatives.'},
-            {'position': 'President', 'name': 'Michael Chen', 'bio': 'Former VP with proven track record in organizing successful campus events.'},
-            
-            # Vice President Candidates
-            {'position': 'Vice President', 'name': 'Emily Johnson', 'bio': 'Dedicated to improving student-faculty communication and academic support.'},
-            {'position': 'Vice President', 'name': 'David Martinez', 'bio': 'Experienced in coordinating large-scale student projects and initiatives.'},
-            {'position': 'Vice President', 'name': 'Lisa Thompson', 'bio': 'Advocate for diversity and inclusion programs on campus.'},
-            
-            # Secretary Candidates
-            {'position': 'Secretary', 'name': 'Robert Brown', 'bio': 'Detail-oriented with excellent organizational and communication skills.'},
-            {'position': 'Secretary', 'name': 'Jennifer Davis', 'bio': 'Former newsletter editor with strong writing and documentation abilities.'},
-            
-            # Treasurer Candidates
-            {'position': 'Treasurer', 'name': 'James Wilson', 'bio': 'Economics major with experience in budget management and financial planning.'},
-            {'position': 'Treasurer', 'name': 'Amanda Garcia', 'bio': 'Accounting background with transparent and efficient fund management approach.'},
-            {'position': 'Treasurer', 'name': 'Christopher Lee', 'bio': 'Business student committed to maximizing student organization funding.'},
-            
-            # Public Relations Officer Candidates
-            {'position': 'Public Relations Officer', 'name': 'Sophia Rodriguez', 'bio': 'Social media expert with creative marketing and outreach strategies.'},
-            {'position': 'Public Relations Officer', 'name': 'Daniel White', 'bio': 'Communications major focused on building strong community partnerships.'},
-            
-            # Sports Director Candidates
-            {'position': 'Sports Director', 'name': 'Ryan Taylor', 'bio': 'Varsity athlete dedicated to promoting sports and fitness for all students.'},
-            {'position': 'Sports Director', 'name': 'Michelle Adams', 'bio': 'Former team captain with experience organizing intramural tournaments.'},
-            {'position': 'Sports Director', 'name': 'Kevin Harris', 'bio': 'PE major committed to inclusive sports programs and wellness initiatives.'},
-        ]
-        
-        self.stdout.write('Creating candidates...')
-        for cand_data in candidates_data:
-            position_title = cand_data.pop('position')
-            candidate = Candidate.objects.create(
-                position=positions[position_title],
-                **cand_data
-            )
-            self.stdout.write(f'  ✓ Created candidate: {candidate.name} for {position_title}')
-        
-        # Create sample test users (optional)
+
+        # Votes, ballot and previously generated students go; registered users stay
+        self.stdout.write('Clearing existing election data...')
+        clear_election()
+
+        ballot = (
+            synthetic_ballot(options['positions'], options['candidates'])
+            if options['positions'] else demo_ballot()
+        )
+        summary = generate_election(
+            ballot,
+            students=options['students'],
+            turnout=options['turnout'],
+            distribution=options['distribution'],
+            seed=options['seed'],
+            password=options['password'],
+            hours=options['hours'],
+            chunk_size=options['chunk_size'],
+            log=lambda message: self.stdout.write(f'  {message}')
+        )
+
         self.stdout.write('Creating sample test users...')
-        test_users = [
-            {'student_id': 'TEST001', 'email': 'alice@test.com', 'nickname': 'Alice', 'password': 'test123'},
-            {'student_id': 'TEST002', 'email': 'bob@test.com', 'nickname': 'Bob', 'password': 'test123'},
-            {'student_id': 'TEST003', 'email': 'charlie@test.com', 'nickname': 'Charlie', 'password': 'test123'},
-        ]
-        
-        for user_data in test_users:
-            # Check if user already exists
-            if not User.objects.filter(username=user_data['student_id']).exists():
-                user = User.objects.create_user(
-                    username=user_data['student_id'],
-                    password=user_data['password']
-                )
-                Profile.objects.create(
-                    user=user,
-                    student_id=user_data['student_id'],
-                    email=user_data['email'],
-                    nickname=user_data['nickname']
-                )
-                self.stdout.write(f'  ✓ Created test user: {user_data["nickname"]} ({user_data["student_id"]})')
-            else:
-                self.stdout.write(f'  → User {user_data["student_id"]} already exists, skipping')
-        
+        self.create_test_users(options['password'])
+
         # Summary
         self.stdout.write('\n' + '='*50)
-        self.stdout.write(self.style.SUCCESS('✓ Data population completed successfully!'))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Data population completed in {time.monotonic() - started:.1f}s'
+        ))
         self.stdout.write('='*50)
         self.stdout.write(f'Total Positions: {Position.objects.count()}')
         self.stdout.write(f'Total Candidates: {Candidate.objects.count()}')
         self.stdout.write(f'Total Users: {User.objects.count()}')
+        self.stdout.write(f'Generated Students: {summary["students"]}')
+        self.stdout.write(f'Total Votes: {summary["votes"]}')
         self.stdout.write('\nTest User Credentials:')
-        self.stdout.write('  Username: TEST001, Password: test123')
-        self.stdout.write('  Username: TEST002, Password: test123')
-        self.stdout.write('  Username: TEST003, Password: test123')
+        for user_data in TEST_USERS:
+            self.stdout.write(f'  Username: {user_data["student_id"]}, Password: {options["password"]}')
+        if summary['students']:
+            self.stdout.write(f'  Generated students: {synthetic_student_id(0)} onwards, Password: {options["password"]}')
         self.stdout.write('='*50)
+
+    def create_test_users(self, password):
+        """Create the named test accounts that do not exist yet"""
+        existing = set(User.objects.filter(
+            username__in=[user_data['student_id'] for user_data in TEST_USERS]
+        ).values_list('username', flat=True))
+        password_hash = make_password(password)
+        for user_data in TEST_USERS:
+            if user_data['student_id'] in existing:
+                self.stdout.write(f'  → User {user_data["student_id"]} already exists, skipping')
+                continue
+            user = User.objects.create(username=user_data['student_id'], password=password_hash)
+            Profile.objects.create(
+                user=user,
+                student_id=user_data['student_id'],
+                email=user_data['email'],
+                nickname=user_data['nickname']
+            )
+            self.stdout.write(f'  ✓ Created test user: {user_data["nickname"]} ({user_data["student_id"]})')
@@ -0,0 +1,34 @@
+"""
+Django Management Command to Rebuild or Verify Candidate Tallies
+Usage: python manage.py rebuild_tallies [--verify]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from voting_api.results import rebuild_tallies, verify_tallies
+
+
+class Command(BaseCommand):
+    help = 'Rebuild candidate tallies from the raw Vote table, or verify them with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only compare tallies with the Vote table and fail on mismatch'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            mismatches = verify_tallies()
+            for mismatch in mismatches:
+                self.stdout.write(
+                    f"  ✗ Position {mismatch['position_id']} / Candidate {mismatch['candidate_id']}: "
+                    f"tally {mismatch['actual']}, votes {mismatch['expected']}"
+                )
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} tally rows disagree with the Vote table')
+            self.stdout.write(self.style.SUCCESS('✓ All tallies match the Vote table'))
+            return
+
+        self.stdout.write('Rebuilding candidate tallies...')
+        rows = rebuild_tallies()
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt {rows} tally rows'))
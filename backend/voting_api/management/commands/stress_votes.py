@@ -0,0 +1,61 @@
+"""
+Django Management Command to Stress-Test Concurrent Vote Casting
+Usage: python manage.py stress_votes --voters 1000 --positions 3 --threads 32
+"""
+import json
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from voting_api.models import Profile, Position, Candidate
+from voting_api.stress import run_cast_stress
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent duplicate vote casts and check for 500s, duplicates and query budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=500, help='Number of synthetic voters')
+        parser.add_argument('--positions', type=int, default=3, help='Number of synthetic positions')
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent worker threads')
+        parser.add_argument('--repeats', type=int, default=2, help='Times each cast is submitted')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic data afterwards')
+
+    def handle(self, *args, **options):
+        prefix = 'stress-'
+        if Position.objects.filter(name__startswith=prefix).exists():
+            raise CommandError('Stress data from a previous run exists; delete it first')
+
+        self.stdout.write('Creating synthetic voters and positions...')
+        password = make_password(None)
+        User.objects.bulk_create([
+            User(username=f'{prefix}{index}', password=password)
+            for index in range(options['voters'])
+        ], batch_size=500)
+        Profile.objects.bulk_create([
+            Profile(user=user, student_id=f'S{index:06d}', email=f'{user.username}@stress.local', nickname=user.username)
+            for index, user in enumerate(User.objects.filter(username__startswith=prefix).order_by('id'))
+        ], batch_size=500)
+        users = list(User.objects.filter(username__startswith=prefix).select_related('profile'))
+        positions = []
+        for index in range(options['positions']):
+            position = Position.objects.create(name=f'{prefix}{index}', order=1000 + index)
+            Candidate.objects.create(position=position, name='A')
+            Candidate.objects.create(position=position, name='B')
+            positions.append(position)
+
+        casts = [
+            (user, position.id, position.candidates.first().id)
+            for position in positions for user in users
+        ]
+        self.stdout.write(f'Submitting {len(casts) * options["repeats"]} casts on {options["threads"]} threads...')
+        report = run_cast_stress(casts, threads=options['threads'], repeats=options['repeats'])
+        self.stdout.write(json.dumps(report, indent=2))
+
+        if not options['keep']:
+            Position.objects.filter(name__startswith=prefix).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+        unexpected = set(report['statuses']) - {201, 409}
+        if unexpected or report['duplicates'] or len(report['queries_by_status'].get(201, [])) > 1:
+            raise CommandError('Stress run failed: unexpected statuses, duplicate votes or a varying query budget')
+        self.stdout.write(self.style.SUCCESS('✓ No 500s, no duplicates, fixed query budget per vote'))
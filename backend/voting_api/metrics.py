@@ -0,0 +1,332 @@
+"""
+In-process metrics in Prometheus text format
+Each worker process keeps its counters and histograms in memory and
+periodically writes them to its own file in METRICS_DIR; /metrics/ sums the
+files of every process, so values aggregate across workers without an
+external service. A scrape folds the files of processes that have exited
+into one retired file, so restarts keep the totals without leaving a file
+per process lifetime behind.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help, label names)
+METRICS = {
+    'voting_votes_cast_total': ('counter', 'Votes accepted', ('endpoint', 'mode')),
+    'voting_vote_rejections_total': ('counter', 'Vote submissions rejected', ('endpoint', 'reason')),
+    'voting_http_request_duration_seconds': ('histogram', 'API request latency', ('view', 'method')),
+    'voting_cache_requests_total': ('counter', 'Cache lookups', ('cache', 'result')),
+    'voting_llm_request_duration_seconds': ('histogram', 'Groq API call latency', ('model',)),
+    'voting_llm_errors_total': ('counter', 'Failed Groq API calls', ('model',)),
+    'voting_llm_routes_total': ('counter', 'Routed AI analyses by who answered', ('kind', 'outcome')),
+}
+
+LabelValues = Tuple[str, ...]
+
+# Totals of processes that have exited
+RETIRED_FILE = 'retired.json'
+
+
+class Registry:
+    """Metric values of this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.counters: Dict[Tuple[str, LabelValues], float] = {}
+        # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self.histograms: Dict[Tuple[str, LabelValues], List[float]] = {}
+        self.dirty = False
+        self.path = None
+        self.flusher = None
+
+    def inc(self, name: str, labels: LabelValues, amount: float = 1):
+        with self.lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + amount
+            self.dirty = True
+        self.ensure_flusher()
+
+    def observe(self, name: str, labels: LabelValues, seconds: float):
+        with self.lock:
+            key = (name, labels)
+            values = self.histograms.setdefault(key, [0] * (len(LATENCY_BUCKETS) + 2))
+            values[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            values[-1] += seconds
+            self.dirty = True
+        self.ensure_flusher()
+
+    def snapshot(self) -> Dict[str, list]:
+        with self.lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    def flush(self):
+        """Atomically replace this process's file in METRICS_DIR"""
+        with self.flush_lock:
+            if self.path is not None and os.path.dirname(self.path) != str(settings.METRICS_DIR):
+                self.close_file()
+            if self.path is None:
+                if not self.counters and not self.histograms:
+                    return  # No file until there is something to report
+                # pid plus a random suffix: a recycled pid never overwrites a dead process's totals
+                self.path = os.path.join(str(settings.METRICS_DIR), f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+            self.write()
+
+    def close_file(self):
+        """
+        Write the values to the current file one last time and start again from
+        zero, so a new METRICS_DIR does not count them a second time
+        """
+        if self.path is not None and os.path.isdir(os.path.dirname(self.path)):
+            self.write()
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.dirty = False
+        self.path = None
+
+    def write(self):
+        with self.lock:
+            self.dirty = False
+        data = self.snapshot()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_values(self.path, data)
+
+    def ensure_flusher(self):
+        if self.flusher is None or not self.flusher.is_alive():
+            with self.lock:
+                if self.flusher is None or not self.flusher.is_alive():
+                    self.flusher = threading.Thread(target=self.flush_periodically, name='metrics-flusher', daemon=True)
+                    self.flusher.start()
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(getattr(settings, 'METRICS_FLUSH_SECONDS', 1.0))
+            if self.dirty:
+                self.flush()
+
+
+registry = Registry()
+atexit.register(lambda: registry.dirty and registry.flush())
+
+
+@receiver(setting_changed)
+def metrics_dir_changed(setting, **kwargs):
+    if setting == 'METRICS_DIR':
+        with registry.flush_lock:
+            registry.close_file()
+
+
+def enabled() -> bool:
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def inc(name: str, *labels: str, amount: float = 1):
+    """Increment a counter"""
+    if enabled():
+        registry.inc(name, tuple(str(label) for label in labels), amount)
+
+
+def observe(name: str, seconds: float, *labels: str):
+    """Record a duration in a histogram"""
+    if enabled():
+        registry.observe(name, tuple(str(label) for label in labels), seconds)
+
+
+@contextmanager
+def observe_duration(name: str, *labels: str):
+    """Time the enclosed block into a histogram"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, *labels)
+
+
+def cache_lookup(cache_name: str, hit: bool):
+    inc('voting_cache_requests_total', cache_name, 'hit' if hit else 'miss')
+
+
+def read_values(path: str) -> Optional[Dict[str, list]]:
+    """A metrics file, or None when it is missing or being replaced"""
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def write_values(path: str, data: Dict[str, list]) -> None:
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(data, handle)
+    os.replace(temporary, path)
+
+
+def add_values(counters: Dict, histograms: Dict, data: Dict[str, list]) -> None:
+    for name, labels, value in data['counters']:
+        key = (name, tuple(labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, values in data['histograms']:
+        key = (name, tuple(labels))
+        totals = histograms.setdefault(key, [0] * len(values))
+        for index, value in enumerate(values):
+            totals[index] += value
+
+
+def process_exited(filename: str) -> bool:
+    """Whether the process that wrote `filename` ({pid}-{suffix}.json) is gone"""
+    try:
+        pid = int(filename.split('-', 1)[0])
+    except ValueError:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # Alive, owned by another user
+    return False
+
+
+def retire_exited(directory: str) -> None:
+    """Fold the files of exited processes into RETIRED_FILE and remove them"""
+    exited = [name for name in os.listdir(directory) if name.endswith('.json') and process_exited(name)]
+    if not exited:
+        return
+    with open(os.path.join(directory, 'retired.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)  # Scrapes in other workers may be retiring the same files
+        counters: Dict[Tuple[str, LabelValues], float] = {}
+        histograms: Dict[Tuple[str, LabelValues], List[float]] = {}
+        retired = read_values(os.path.join(directory, RETIRED_FILE))
+        if retired is not None:
+            add_values(counters, histograms, retired)
+        folded = []
+        for filename in exited:
+            data = read_values(os.path.join(directory, filename))
+            if data is not None:  # Otherwise already retired by another worker
+                add_values(counters, histograms, data)
+                folded.append(filename)
+        if not folded:
+            return
+        write_values(os.path.join(directory, RETIRED_FILE), {
+            'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+            'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()],
+        })
+        for filename in folded:
+            os.remove(os.path.join(directory, filename))
+
+
+def collect() -> Tuple[Dict, Dict]:
+    """Sum the files of every process (this one flushed first, exited ones retired)"""
+    registry.flush()
+    directory = str(settings.METRICS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    retire_exited(directory)
+    counters: Dict[Tuple[str, LabelValues], float] = {}
+    histograms: Dict[Tuple[str, LabelValues], List[float]] = {}
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        data = read_values(os.path.join(directory, filename))
+        if data is not None:  # Otherwise being replaced right now; its values are lost for this scrape only
+            add_values(counters, histograms, data)
+    return counters, histograms
+
+
+def format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render() -> str:
+    """Prometheus text exposition (version 0.0.4)"""
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, label_names) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(label_names, labels)} {value:g}')
+            continue
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values[:-1]):
+                cumulative += count
+                bucket_labels = format_labels(label_names, labels, f'le="{bound}"')
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative:g}')
+            lines.append(f'{name}_sum{format_labels(label_names, labels)} {values[-1]:.6f}')
+            lines.append(f'{name}_count{format_labels(label_names, labels)} {cumulative:g}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint
+    Requires `Authorization: Bearer <METRICS_TOKEN>`; without a token it is only
+    served with DEBUG on, so a deployment never exposes it by accident
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token and not settings.DEBUG:
+        return HttpResponse('Set METRICS_TOKEN to enable scraping\n', status=403, content_type='text/plain')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class MetricsMiddleware:
+    """Record request latency per API view (natively sync or async, like the handler)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, started)
+        return response
+
+    def record(self, request, response, started: float):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.namespace == 'voting_api' and not response.streaming:
+            observe('voting_http_request_duration_seconds', time.perf_counter() - started, match.url_name, request.method)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_tallies(apps, schema_editor):
+    """Build tallies for votes cast before the table existed"""
+    Vote = apps.get_model('voting_api', 'Vote')
+    CandidateTally = apps.get_model('voting_api', 'CandidateTally')
+
+    rows = Vote.objects.order_by().values('position_id', 'candidate_id').annotate(votes=Count('id'))
+    CandidateTally.objects.bulk_create([
+        CandidateTally(
+            position_id=row['position_id'],
+            candidate_id=row['candidate_id'],
+            vote_count=row['votes']
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote_count', models.PositiveIntegerField(default=0, help_text='Number of votes counted for this candidate and position')),
+                ('candidate', models.ForeignKey(help_text='Candidate who received the votes', on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='voting_api.candidate')),
+                ('position', models.ForeignKey(help_text='Position the votes were cast for', on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='voting_api.position')),
+            ],
+            options={
+                'verbose_name': 'Candidate Tally',
+                'verbose_name_plural': 'Candidate Tallies',
+                'unique_together': {('position', 'candidate')},
+            },
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
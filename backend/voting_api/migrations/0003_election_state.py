@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:29
+
+from django.db import migrations, models
+
+
+def create_election_state(apps, schema_editor):
+    """Create the single election state row"""
+    ElectionState = apps.get_model('voting_api', 'ElectionState')
+    ElectionState.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting_api', '0002_candidate_tally'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElectionState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0, help_text='Incremented on every change that affects results or stats')),
+            ],
+            options={
+                'verbose_name': 'Election State',
+                'verbose_name_plural': 'Election State',
+            },
+        ),
+        migrations.RunPython(create_election_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting_api', '0003_election_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vote',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the vote was cast (accept time for journaled votes)'),
+        ),
+    ]
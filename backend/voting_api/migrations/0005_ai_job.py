@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:02
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting_api', '0004_vote_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(help_text='Analysis to generate (summary, prediction, turnout)', max_length=20)),
+                ('request_key', models.CharField(help_text='Analysis, model, prompt version and election-state version requested', max_length=255)),
+                ('active_key', models.CharField(blank=True, help_text='request_key while the job is in flight, cleared when it finishes', max_length=255, null=True, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('result', models.JSONField(blank=True, help_text='Endpoint response once the job succeeded', null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'AI Job',
+                'verbose_name_plural': 'AI Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
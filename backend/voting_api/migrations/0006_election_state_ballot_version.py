@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting_api', '0005_ai_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='electionstate',
+            name='ballot_version',
+            field=models.PositiveBigIntegerField(default=0, help_text='Incremented when positions or candidates change'),
+        ),
+    ]
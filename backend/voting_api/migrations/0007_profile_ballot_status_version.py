@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting_api', '0006_election_state_ballot_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='ballot_status_version',
+            field=models.PositiveBigIntegerField(default=0, help_text="Incremented when this user's votes or nickname change (retires their cached ballot status)"),
+        ),
+    ]
@@ -0,0 +1,181 @@
+"""
+Latency-aware model routing
+Each analysis type has a route in AI_MODEL_ROUTES: the model to ask, how
+long it may take (budget_seconds) and a faster fallback model. When the
+model has not answered within its budget the fallback is asked as well and
+whichever answers first is used; when the whole route runs out of time the
+caller falls back to a templated answer. Only slowness is routed around: a
+model's error is raised as it would be without routing. A call that was
+overtaken keeps running in its thread, so its answer still reaches on_answer
+(and the cache); wait_for_background() waits for such calls. With streaming, answering means sending the first text: the
+model that starts writing first is relayed to the end.
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from django.conf import settings
+from . import metrics
+
+
+class ModelsTooSlow(Exception):
+    """Every model on the route exceeded its latency budget"""
+
+
+# Calls still running, including ones that were overtaken
+_running = set()
+_running_lock = threading.Lock()
+
+
+def track(future) -> None:
+    with _running_lock:
+        _running.add(future)
+    future.add_done_callback(forget)
+
+
+def forget(future) -> None:
+    with _running_lock:
+        _running.discard(future)
+
+
+def wait_for_background(timeout: Optional[float] = None) -> None:
+    """Wait until every routed call, overtaken ones included, has finished (and cached its answer)"""
+    with _running_lock:
+        running = list(_running)
+    wait(running, timeout)
+
+
+def get_route(kind: str) -> Dict[str, Any]:
+    """
+    {model, budget_seconds, fallback, fallback_budget_seconds} for an analysis type
+    A missing model is GROQ_MODEL, a missing budget means no limit and the
+    fallback's budget defaults to the model's
+    """
+    route = dict(getattr(settings, 'AI_MODEL_ROUTES', {}).get(kind, {}))
+    route['model'] = route.get('model') or settings.GROQ_MODEL
+    route.setdefault('budget_seconds', None)
+    route.setdefault('fallback', None)
+    route.setdefault('fallback_budget_seconds', route['budget_seconds'])
+    return route
+
+
+def route_models(route: Dict[str, Any]) -> List[Tuple[str, Optional[float]]]:
+    """(model, budget seconds) in the order they are asked"""
+    models = [(route['model'], route['budget_seconds'])]
+    if route['fallback'] and route['fallback'] != route['model'] and route['budget_seconds'] is not None:
+        models.append((route['fallback'], route['fallback_budget_seconds']))
+    return models
+
+
+class Attempt:
+    """One model's call on a route; text, error and finished_at are set under the route's condition"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.text = None
+        self.error = None
+        self.finished_at = None
+
+
+def routed_completion(
+    kind: str, run: Callable[[str, Optional[Callable[[str], None]]], str],
+    on_text: Optional[Callable[[str], None]] = None,
+    on_answer: Optional[Callable[[str, str, float], None]] = None
+) -> Tuple[str, str, float]:
+    """
+    run(model, on_text) along the route for `kind`; returns (text, model, latency ms)
+    on_answer(text, model, latency ms) is called for every model that answers,
+    including ones that were overtaken. Raises ModelsTooSlow when the route ran
+    out of time, and a model's error when every model asked has failed
+    """
+    models = route_models(get_route(kind))
+    started = time.monotonic()
+    if models[0][1] is None:
+        # No budget: nothing to race, so no thread either
+        model = models[0][0]
+        text = run(model, on_text)
+        latency_ms = (time.monotonic() - started) * 1000
+        if on_answer:
+            on_answer(text, model, latency_ms)
+        metrics.inc('voting_llm_routes_total', kind, 'primary')
+        return text, model, round(latency_ms, 1)
+
+    changed = threading.Condition()
+    relaying = []  # The attempt whose text goes to on_text (streaming only)
+    attempts = []
+
+    def relay_for(attempt: Attempt) -> Optional[Callable[[str], None]]:
+        if on_text is None:
+            return None
+
+        def relay(text: str):
+            with changed:
+                if not relaying:
+                    relaying.append(attempt)
+                    changed.notify_all()
+                owner = relaying[0] is attempt
+            if owner:
+                on_text(text)
+        return relay
+
+    def call(attempt: Attempt):
+        try:
+            text = run(attempt.model, relay_for(attempt))
+        except Exception as e:
+            with changed:
+                attempt.error, attempt.finished_at = e, time.monotonic()
+                changed.notify_all()
+            return
+        finished_at = time.monotonic()
+        if on_answer:
+            on_answer(text, attempt.model, (finished_at - started) * 1000)
+        with changed:
+            attempt.text, attempt.finished_at = text, finished_at
+            changed.notify_all()
+
+    def answered() -> Optional[Attempt]:
+        if relaying:
+            return relaying[0]
+        return next((attempt for attempt in attempts if attempt.text is not None), None)
+
+    executor = ThreadPoolExecutor(max_workers=len(models), thread_name_prefix='ai-route')
+    winner = None
+    try:
+        with changed:
+            for model, budget in models:
+                attempt = Attempt(model)
+                attempts.append(attempt)
+                # In the request's context, so timed() spans reach its Server-Timing header
+                track(executor.submit(contextvars.copy_context().run, call, attempt))
+                deadline = None if budget is None else time.monotonic() + budget
+                while True:
+                    winner = answered()
+                    if winner is not None or all(other.finished_at is not None for other in attempts):
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    changed.wait(remaining)
+                # Errors are not retried on the fallback (the caller serves the last good answer)
+                if winner is not None or all(other.finished_at is not None for other in attempts):
+                    break
+
+            if winner is None:
+                if any(attempt.finished_at is None for attempt in attempts):
+                    metrics.inc('voting_llm_routes_total', kind, 'too_slow')
+                    raise ModelsTooSlow(f'No {kind} analysis within its latency budget')
+                metrics.inc('voting_llm_routes_total', kind, 'failed')
+                raise attempts[-1].error
+
+            # A model that has started streaming is followed to the end
+            while winner.finished_at is None:
+                changed.wait()
+    finally:
+        # Overtaken calls finish in the background
+        executor.shutdown(wait=False)
+
+    if winner.error is not None:
+        raise winner.error
+    metrics.inc('voting_llm_routes_total', kind, 'primary' if winner is attempts[0] else 'fallback')
+    return winner.text, winner.model, round((winner.finished_at - started) * 1000, 1)
@@ -2,7 +2,9 @@
 Django models for AI-Enhanced Online Voting System
 Reused from existing MVT application with clean structure
 """
+import uuid
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 
@@ -30,6 +32,10 @@ class Profile(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    ballot_status_version = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Incremented when this user's votes or nickname change (retires their cached ballot status)"
+    )
 
     def __str__(self):
         return f"{self.student_id} - {self.nickname}"
@@ -154,8 +160,8 @@ class Vote(models.Model):
         help_text="Position for which the vote was cast"
     )
     timestamp = models.DateTimeField(
-        auto_now_add=True,
-        help_text="When the vote was cast"
+        default=timezone.now,
+        help_text="When the vote was cast (accept time for journaled votes)"
     )
 
     class Meta:
@@ -173,3 +179,117 @@ class Vote(models.Model):
         from django.core.exceptions import ValidationError
         if self.candidate.position != self.position:
             raise ValidationError('Candidate does not belong to the selected position.')
+
+
+class CandidateTally(models.Model):
+    """
+    Denormalized vote count for a candidate within a position
+    Maintained in the same transaction as every Vote insert and delete,
+    so results can be read in O(candidates) rows regardless of vote volume
+    """
+    position = models.ForeignKey(
+        Position,
+        on_delete=models.CASCADE,
+        related_name='tallies',
+        help_text="Position the votes were cast for"
+    )
+    candidate = models.ForeignKey(
+        Candidate,
+        on_delete=models.CASCADE,
+        related_name='tallies',
+        help_text="Candidate who received the votes"
+    )
+    vote_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of votes counted for this candidate and position"
+    )
+
+    class Meta:
+        unique_together = ('position', 'candidate')
+        verbose_name = 'Candidate Tally'
+        verbose_name_plural = 'Candidate Tallies'
+
+    def __str__(self):
+        return f"{self.candidate_id} @ {self.position_id}: {self.vote_count}"
+
+
+class ElectionState(models.Model):
+    """
+    Single-row election state with monotonically increasing versions
+    `version` advances whenever a vote, position, candidate or registered user
+    changes (results endpoints use it as their ETag); `ballot_version` only
+    when positions or candidates change, which retires every process's
+    ballot catalog
+    """
+    version = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Incremented on every change that affects results or stats"
+    )
+    ballot_version = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Incremented when positions or candidates change"
+    )
+
+    class Meta:
+        verbose_name = 'Election State'
+        verbose_name_plural = 'Election State'
+
+    def __str__(self):
+        return f"Election state v{self.version}"
+
+
+class AIJob(models.Model):
+    """
+    Background AI analysis request
+    active_key is set only while the job is pending or running; being unique,
+    it lets identical requests from any worker share one in-flight job
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(
+        max_length=20,
+        help_text="Analysis to generate (summary, prediction, turnout)"
+    )
+    request_key = models.CharField(
+        max_length=255,
+        help_text="Analysis, model, prompt version and election-state version requested"
+    )
+    active_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        unique=True,
+        help_text="request_key while the job is in flight, cleared when it finishes"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Endpoint response once the job succeeded"
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'AI Job'
+        verbose_name_plural = 'AI Jobs'
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
@@ -0,0 +1,131 @@
+"""
+On-demand request profiling for staff users
+Adding `?profile=1` (or the `X-Profile: 1` header) to any request made by a
+staff user runs it under cProfile and saves a .prof file to PROFILING_DIR,
+keeping the newest PROFILING_KEEP files. `profile=download` returns the
+.prof file instead of the response. The files load in pstats, snakeviz
+and flameprof.
+"""
+import cProfile
+import marshal
+import os
+import re
+import threading
+import time
+from typing import Optional
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+PROFILE_MODES = ('1', 'download')
+
+# cProfile profiles one thread, and only one profiler may be active per process
+_profiler_lock = threading.Lock()
+
+
+def requested_mode(request) -> Optional[str]:
+    mode = request.GET.get('profile') or request.headers.get('X-Profile')
+    return mode if mode in PROFILE_MODES else None
+
+
+def is_staff(request) -> bool:
+    """Staff via the admin session or the request's JWT"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+def profile_data(profiler: cProfile.Profile) -> bytes:
+    """The marshalled stats a .prof file contains"""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def profile_filename(request, elapsed_ms: float) -> str:
+    match = getattr(request, 'resolver_match', None)
+    name = match.url_name if match is not None and match.url_name else request.path
+    name = re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_') or 'root'
+    return f'{time.strftime("%Y%m%d-%H%M%S")}-{time.time_ns() % 10**9:09d}-{request.method}-{name}-{elapsed_ms:.0f}ms.prof'
+
+
+def save_profile(data: bytes, filename: str) -> str:
+    """Write a profile and drop the oldest beyond PROFILING_KEEP"""
+    directory = str(settings.PROFILING_DIR)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, filename), 'wb') as handle:
+        handle.write(data)
+    keep = getattr(settings, 'PROFILING_KEEP', 50)
+    profiles = sorted(name for name in os.listdir(directory) if name.endswith('.prof'))
+    for stale in profiles[:max(0, len(profiles) - keep)]:
+        try:
+            os.remove(os.path.join(directory, stale))
+        except FileNotFoundError:
+            pass  # Another process pruned it first
+    return filename
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests flagged by staff users
+    Place after AuthenticationMiddleware so admin sessions are recognised.
+    Natively sync or async, like the handler: only flagged requests leave
+    the event loop under ASGI
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        mode = requested_mode(request)
+        if mode is None or not is_staff(request):
+            return self.get_response(request)
+        return self.profile(request, mode, self.get_response)
+
+    async def __acall__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not await sync_to_async(is_staff)(request):
+            return await self.get_response(request)
+        # cProfile sees one thread: profile on a worker thread, where async_to_sync
+        # also runs the request's sync views
+        return await sync_to_async(self.profile)(request, mode, async_to_sync(self.get_response))
+
+    def profile(self, request, mode: str, get_response):
+        with _profiler_lock:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = get_response(request)
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()  # Include DRF rendering in the profile
+            finally:
+                profiler.disable()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        data = profile_data(profiler)
+        filename = profile_filename(request, elapsed_ms)
+        if mode == 'download':
+            download = HttpResponse(data, content_type='application/octet-stream')
+            download['Content-Disposition'] = f'attachment; filename="{filename}"'
+            download['X-Profile-Status'] = str(response.status_code)
+            return download
+        response['X-Profile-File'] = save_profile(data, filename)
+        return response
@@ -0,0 +1,38 @@
+"""
+Prompt token budgeting
+Helpers that keep LLM prompts within AI_PROMPT_TOKEN_BUDGET: a cheap token
+estimate and folding a race's long tail of candidates into one aggregate line.
+"""
+import math
+from typing import Any, Dict
+
+# Rough average for English prose and figures with Llama/Mixtral tokenizers;
+# errs towards overestimating so prompts stay inside the budget
+CHARS_PER_TOKEN = 3.5
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text`"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def fold_candidates(position: Dict[str, Any], top_k: int) -> Dict[str, Any]:
+    """
+    Copy of a prepare_voting_data_for_ai() position keeping its `top_k` leading
+    candidates; the rest are summed into `folded` ({count, votes, percentage}),
+    which is None when nothing was folded
+    """
+    candidates = position['candidates']
+    if len(candidates) <= top_k:
+        return {**position, 'folded': None}
+    tail = candidates[top_k:]
+    return {
+        **position,
+        'candidates': candidates[:top_k],
+        'folded': {
+            'count': len(tail),
+            'votes': sum(candidate['votes'] for candidate in tail),
+            'percentage': round(sum(candidate['percentage'] for candidate in tail), 2),
+        },
+    }
+
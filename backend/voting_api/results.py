@@ -0,0 +1,291 @@
+"""
+Results Engine for AI-Enhanced Online Voting System
+Computes tallies, percentages, winners and margins for every position
+from a constant number of queries over the materialized CandidateTally rows
+"""
+from collections import Counter, defaultdict
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Q, OuterRef, Subquery, Sum, IntegerField
+from django.db.models.functions import Coalesce
+from .models import Position, Candidate, Vote, CandidateTally, ElectionState
+
+
+# ==================== Tally Maintenance ====================
+
+def record_votes(votes: Iterable[Vote], delta: int = 1) -> None:
+    """
+    Apply votes to the CandidateTally rows
+    Call inside the transaction that inserts (delta=1) or deletes (delta=-1)
+    the votes so tallies and the Vote table never disagree. Rows receiving
+    the same change share one UPDATE, so a whole ballot costs one query.
+    """
+    grouped = Counter((vote.position_id, vote.candidate_id) for vote in votes)
+    keys_by_change = defaultdict(list)
+    for key, count in grouped.items():
+        keys_by_change[count * delta].append(key)
+
+    for change, keys in keys_by_change.items():
+        match = Q()
+        for position_id, candidate_id in keys:
+            match |= Q(position_id=position_id, candidate_id=candidate_id)
+        tallies = CandidateTally.objects.filter(match)
+        if tallies.update(vote_count=F('vote_count') + change) == len(keys) or change < 0:
+            # Missing rows on delete mean the tally was cascaded away already
+            continue
+
+        # First votes for a (position, candidate) pair: create the rows, then count
+        existing = set(tallies.values_list('position_id', 'candidate_id'))
+        missing = [key for key in keys if key not in existing]
+        CandidateTally.objects.bulk_create([
+            CandidateTally(position_id=position_id, candidate_id=candidate_id, vote_count=0)
+            for position_id, candidate_id in missing
+        ], ignore_conflicts=True)
+        match = Q()
+        for position_id, candidate_id in missing:
+            match |= Q(position_id=position_id, candidate_id=candidate_id)
+        CandidateTally.objects.filter(match).update(vote_count=F('vote_count') + change)
+
+
+def count_votes_from_table() -> Dict[Tuple[int, int], int]:
+    """
+    Count raw Vote rows per (position_id, candidate_id) with one grouped query
+    Source of truth used to rebuild and verify the tallies
+    """
+    rows = Vote.objects.order_by().values('position_id', 'candidate_id').annotate(votes=Count('id'))
+    return {(row['position_id'], row['candidate_id']): row['votes'] for row in rows}
+
+
+def verify_tallies() -> List[Dict[str, Any]]:
+    """
+    Compare tallies with the raw Vote table
+    Returns one entry per (position, candidate) pair that disagrees
+    """
+    expected = count_votes_from_table()
+    actual = {
+        (row['position_id'], row['candidate_id']): row['vote_count']
+        for row in CandidateTally.objects.values('position_id', 'candidate_id', 'vote_count')
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        if expected.get(key, 0) != actual.get(key, 0):
+            mismatches.append({
+                'position_id': key[0],
+                'candidate_id': key[1],
+                'expected': expected.get(key, 0),
+                'actual': actual.get(key, 0)
+            })
+    return mismatches
+
+
+def rebuild_tallies() -> int:
+    """
+    Recreate every tally from the raw Vote table
+    Candidates without votes get a zero row so later casts only run UPDATEs.
+    Returns the number of tally rows written
+    """
+    with transaction.atomic():
+        counts = count_votes_from_table()
+        for position_id, candidate_id in Candidate.objects.values_list('position_id', 'id'):
+            counts.setdefault((position_id, candidate_id), 0)
+        CandidateTally.objects.all().delete()
+        CandidateTally.objects.bulk_create([
+            CandidateTally(position_id=position_id, candidate_id=candidate_id, vote_count=votes)
+            for (position_id, candidate_id), votes in counts.items()
+        ], batch_size=500)
+    return len(counts)
+
+
+# ==================== Election State Version ====================
+
+def get_results_version() -> int:
+    """Current election-state version (one primary-key lookup)"""
+    version = ElectionState.objects.filter(pk=1).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_results_version() -> None:
+    """
+    Advance the election-state version
+    Call inside the transaction that changes votes, positions or candidates
+    so the new version becomes visible together with the change
+    """
+    if ElectionState.objects.filter(pk=1).update(version=F('version') + 1):
+        return
+    _, created = ElectionState.objects.get_or_create(pk=1, defaults={'version': 1})
+    if not created:
+        ElectionState.objects.filter(pk=1).update(version=F('version') + 1)
+
+
+def get_ballot_version() -> int:
+    """Current ballot version (one primary-key lookup)"""
+    version = ElectionState.objects.filter(pk=1).values_list('ballot_version', flat=True).first()
+    return version or 0
+
+
+def bump_ballot_version() -> None:
+    """
+    Advance the ballot version (and the election-state version with it)
+    Call inside the transaction that changes positions or candidates
+    """
+    if ElectionState.objects.filter(pk=1).update(version=F('version') + 1, ballot_version=F('ballot_version') + 1):
+        return
+    ElectionState.objects.get_or_create(pk=1)
+    ElectionState.objects.filter(pk=1).update(version=F('version') + 1, ballot_version=F('ballot_version') + 1)
+
+
+# ==================== Results ====================
+
+def tally_votes(position_ids: Optional[List[int]] = None) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """
+    Read votes per candidate and per position from the tally table
+    Returns (candidate_votes, position_totals) keyed by primary key
+    """
+    queryset = CandidateTally.objects.all()
+    if position_ids is not None:
+        queryset = queryset.filter(position_id__in=position_ids)
+
+    candidate_votes: Dict[int, int] = {}
+    position_totals: Dict[int, int] = {}
+    rows = queryset.values_list('position_id', 'candidate_id', 'vote_count')
+
+    for position_id, candidate_id, votes in rows:
+        candidate_votes[candidate_id] = candidate_votes.get(candidate_id, 0) + votes
+        position_totals[position_id] = position_totals.get(position_id, 0) + votes
+
+    return candidate_votes, position_totals
+
+
+def calculate_percentage(votes: int, total: int) -> float:
+    """Percentage of a position's votes, rounded like Candidate.get_vote_percentage()"""
+    if total == 0:
+        return 0.0
+    return round((votes / total) * 100, 2)
+
+
+def compute_position_results(positions=None) -> List[Dict[str, Any]]:
+    """
+    Build results for the given positions (all positions by default)
+
+    Each entry carries the position fields, its total votes, the active
+    candidates sorted by vote count, the winner and the margin between the
+    top two candidates. Candidates are read from a single prefetch and votes
+    from the tally rows, so the query count does not depend on the size of
+    the ballot or the number of votes cast.
+    """
+    if positions is None:
+        positions = Position.objects.all()
+    positions = list(positions.prefetch_related('candidates'))
+
+    position_ids = [position.id for position in positions]
+    candidate_votes, position_totals = tally_votes(position_ids)
+
+    results = []
+    for position in positions:
+        total_votes = position_totals.get(position.id, 0)
+        all_candidates = list(position.candidates.all())
+
+        candidates_data = []
+        for candidate in all_candidates:
+            if not candidate.is_active:
+                continue
+            vote_count = candidate_votes.get(candidate.id, 0)
+            candidates_data.append({
+                'id': candidate.id,
+                'name': candidate.name,
+                'bio': candidate.bio,
+                'vote_count': vote_count,
+                'percentage': calculate_percentage(vote_count, total_votes)
+            })
+
+        # Sort candidates by vote count (descending)
+        candidates_data.sort(key=lambda x: x['vote_count'], reverse=True)
+
+        # Determine winner (if there are votes)
+        winner = candidates_data[0] if candidates_data and total_votes > 0 else None
+
+        # Margin between the top two candidates (None for uncontested races)
+        margin = None
+        if len(candidates_data) >= 2:
+            margin = candidates_data[0]['vote_count'] - candidates_data[1]['vote_count']
+
+        results.append({
+            'position_id': position.id,
+            'position_name': position.name,
+            'position_description': position.description,
+            'is_active': position.is_active,
+            'total_votes': total_votes,
+            'candidates_count': len(all_candidates),
+            'candidates': candidates_data,
+            'winner': winner,
+            'margin': margin
+        })
+
+    return results
+
+
+def get_most_competitive_position(position_results: List[Dict[str, Any]]) -> Optional[str]:
+    """Find position with smallest vote margin between top 2 candidates"""
+    min_margin = float('inf')
+    most_competitive = None
+
+    for result in position_results:
+        if result['margin'] is None:
+            continue
+        if result['margin'] < min_margin:
+            min_margin = result['margin']
+            most_competitive = result['position_name']
+
+    return most_competitive
+
+
+def compute_overall_stats() -> Dict[str, Any]:
+    """
+    Registered users, unique voters, votes cast and turnout
+    Votes cast are summed from the tallies; unique voters still need the
+    Vote table because a voter can appear in several positions
+    """
+    total_users = User.objects.count()
+    total_votes = CandidateTally.objects.aggregate(total=Sum('vote_count'))['total'] or 0
+    total_voters = Vote.objects.order_by().values('user').distinct().count()
+    turnout = round((total_voters / total_users * 100), 2) if total_users > 0 else 0
+
+    return {
+        'total_users': total_users,
+        'total_voters': total_voters,
+        'total_votes': total_votes,
+        'turnout': turnout
+    }
+
+
+def annotate_position_tallies(queryset):
+    """
+    Annotate positions with `tally_total_votes` and `tally_candidates_count`
+    Used by list pages (e.g. admin changelist) to avoid per-row COUNT queries
+    """
+    votes = CandidateTally.objects.filter(position=OuterRef('pk')).order_by().values('position').annotate(
+        total=Sum('vote_count')
+    ).values('total')
+    return queryset.annotate(
+        tally_total_votes=Coalesce(Subquery(votes, output_field=IntegerField()), 0),
+        tally_candidates_count=Count('candidates', distinct=True)
+    )
+
+
+def annotate_candidate_tallies(queryset):
+    """
+    Annotate candidates with `tally_vote_count` and `tally_position_votes`
+    Used by list pages (e.g. admin changelist) to avoid per-row COUNT queries
+    """
+    candidate_votes = CandidateTally.objects.filter(candidate=OuterRef('pk')).order_by().values('candidate').annotate(
+        total=Sum('vote_count')
+    ).values('total')
+    position_votes = CandidateTally.objects.filter(position=OuterRef('position')).order_by().values('position').annotate(
+        total=Sum('vote_count')
+    ).values('total')
+    return queryset.annotate(
+        tally_vote_count=Coalesce(Subquery(candidate_votes, output_field=IntegerField()), 0),
+        tally_position_votes=Coalesce(Subquery(position_votes, output_field=IntegerField()), 0)
+    )
@@ -3,9 +3,11 @@ DRF Serializers for AI-Enhanced Online Voting System
 Clean REST API design with proper validation
 """
 from rest_framework import serializers
+from django.db import transaction
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from .models import Profile, Position, Candidate, Vote
+from .signals import votes_cast
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -125,60 +127,44 @@ class UserSerializer(serializers.ModelSerializer):
 class CandidateSerializer(serializers.ModelSerializer):
     """
     Serializer for candidate information
-    Includes vote count and percentage
+    Static ballot data only; live counts come from the results endpoints
     """
     position_name = serializers.CharField(source='position.name', read_only=True)
-    vote_count = serializers.SerializerMethodField()
-    vote_percentage = serializers.SerializerMethodField()
     
     class Meta:
         model = Candidate
         fields = [
             'id', 'name', 'bio', 'photo_url', 'position',
-            'position_name', 'vote_count', 'vote_percentage',
-            'is_active', 'created_at'
+            'position_name', 'is_active', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
 
-    def get_vote_count(self, obj):
-        """Get total votes for this candidate"""
-        return obj.get_vote_count()
-
-    def get_vote_percentage(self, obj):
-        """Get vote percentage for this candidate"""
-        return obj.get_vote_percentage()
-
 
 class PositionSerializer(serializers.ModelSerializer):
     """
     Serializer for position information
-    Includes list of candidates
+    Includes list of candidates (expects them prefetched)
     """
     candidates = CandidateSerializer(many=True, read_only=True)
-    total_votes = serializers.SerializerMethodField()
     candidates_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Position
         fields = [
             'id', 'name', 'description', 'order', 'is_active',
-            'candidates', 'total_votes', 'candidates_count', 'created_at'
+            'candidates', 'candidates_count', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
 
-    def get_total_votes(self, obj):
-        """Get total votes cast for this position"""
-        return obj.get_total_votes()
-
     def get_candidates_count(self, obj):
         """Get number of candidates"""
-        return obj.get_candidates_count()
+        return len(obj.candidates.all())
 
 
 class VoteSerializer(serializers.ModelSerializer):
     """
-    Serializer for casting votes
-    Validates that user hasn't already voted for this position
+    Serializer for recorded votes
+    Used to render vote confirmations and voting history
     """
     user_nickname = serializers.CharField(source='user.profile.nickname', read_only=True)
     candidate_name = serializers.CharField(source='candidate.name', read_only=True)
@@ -192,42 +178,124 @@ class VoteSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'timestamp', 'user_nickname', 'candidate_name', 'position_name']
 
+
+def get_selection_error(candidate, position_id):
+    """
+    Check a (position, candidate) selection loaded with select_related('position')
+    Returns an error message, or None when the selection can be voted for
+    """
+    if candidate is None or candidate.position_id != position_id:
+        return "Candidate does not belong to the selected position."
+    if not candidate.is_active:
+        return "This candidate is no longer active."
+    if not candidate.position.is_active:
+        return "Voting for this position is currently closed."
+    return None
+
+
+class CastVoteSerializer(serializers.Serializer):
+    """
+    Serializer for casting a single vote
+    Candidate and position are loaded in one joined query. Duplicate votes
+    are not pre-checked: the unique (user, position) constraint decides at
+    insert time, which stays correct under concurrent submissions.
+    """
+    candidate = serializers.IntegerField()
+    position = serializers.IntegerField()
+
     def validate(self, attrs):
         """
         Validate that:
-        1. User hasn't already voted for this position
-        2. Candidate belongs to the specified position
-        3. Both candidate and position are active
+        1. Candidate exists and belongs to the specified position
+        2. Both candidate and position are active
+        """
+        candidate = Candidate.objects.select_related('position').filter(pk=attrs['candidate']).first()
+        if candidate is None:
+            raise serializers.ValidationError({'candidate': "Candidate does not exist."})
+
+        error = get_selection_error(candidate, attrs['position'])
+        if error:
+            raise serializers.ValidationError(error)
+
+        return {'candidate': candidate, 'position': candidate.position}
+
+    def create(self, validated_data):
+        """
+        Insert the vote with current user; tally updated in the same transaction
+        Raises IntegrityError when the user already voted for the position
+        """
+        with transaction.atomic():
+            return Vote.objects.create(user=self.context['request'].user, **validated_data)
+
+
+class BallotSelectionSerializer(serializers.Serializer):
+    """
+    One selection on a ballot (position and chosen candidate)
+    """
+    position = serializers.IntegerField()
+    candidate = serializers.IntegerField()
+
+
+class BallotSerializer(serializers.Serializer):
+    """
+    Serializer for submitting a whole ballot at once
+    Validates every selection against one prefetched set of candidates and
+    positions, reports errors per position, and inserts all votes together
+    """
+    votes = BallotSelectionSerializer(many=True, allow_empty=False)
+
+    def validate_votes(self, value):
+        """Reject ballots that select the same position twice"""
+        position_ids = [selection['position'] for selection in value]
+        if len(position_ids) != len(set(position_ids)):
+            raise serializers.ValidationError("Each position can only appear once on a ballot.")
+        return value
+
+    def validate(self, attrs):
+        """
+        Validate each selection:
+        1. Candidate exists and belongs to the position
+        2. Both candidate and position are active
+        3. User hasn't already voted for the position
         """
         user = self.context['request'].user
-        candidate = attrs.get('candidate')
-        position = attrs.get('position')
-        
-        # Check if user already voted for this position
-        if Vote.objects.filter(user=user, position=position).exists():
-            raise serializers.ValidationError(
-                f"You have already voted for {position.name}."
-            )
-        
-        # Check if candidate belongs to position
-        if candidate.position != position:
-            raise serializers.ValidationError(
-                "Candidate does not belong to the selected position."
-            )
-        
-        # Check if candidate and position are active
-        if not candidate.is_active:
-            raise serializers.ValidationError("This candidate is no longer active.")
-        
-        if not position.is_active:
-            raise serializers.ValidationError("Voting for this position is currently closed.")
-        
+        selections = attrs['votes']
+
+        candidates = Candidate.objects.select_related('position').in_bulk(
+            [selection['candidate'] for selection in selections]
+        )
+        already_voted = set(Vote.objects.filter(
+            user=user,
+            position_id__in=[selection['position'] for selection in selections]
+        ).values_list('position_id', flat=True))
+
+        errors = {}
+        votes = []
+        for selection in selections:
+            position_id = selection['position']
+            candidate = candidates.get(selection['candidate'])
+            error = get_selection_error(candidate, position_id)
+
+            if error is None and position_id in already_voted:
+                error = f"You have already voted for {candidate.position.name}."
+            if error:
+                errors[str(position_id)] = error
+            else:
+                votes.append(Vote(user=user, candidate=candidate, position=candidate.position))
+
+        if errors:
+            raise serializers.ValidationError({'positions': errors})
+
+        attrs['votes'] = votes
         return attrs
 
     def create(self, validated_data):
-        """Create vote with current user"""
-        validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
+        """Insert every vote in one statement and update tallies in the same transaction"""
+        votes = validated_data['votes']
+        with transaction.atomic():
+            Vote.objects.bulk_create(votes)
+            votes_cast(votes)
+        return votes
 
 
 class VoteResultSerializer(serializers.Serializer):
@@ -1,6 +1,81 @@
 """
 Django signals for Voting API
 Profile creation is handled by UserRegisterSerializer to ensure all required fields are set.
-Signals removed to prevent IntegrityError on unique email constraint.
+Vote signals keep the materialized CandidateTally rows in step with the Vote table,
+and every change that affects results or stats advances the election-state version.
+Changes to a voter's votes or nickname advance their ballot-status version.
 """
-# Signals removed - Profile creation handled in serializers.py
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Profile, Position, Candidate, Vote, CandidateTally
+from . import ballot_status, catalog
+from .results import record_votes, bump_ballot_version, bump_results_version
+from .streams import notify_results_changed
+
+
+def votes_cast(votes):
+    """
+    Bookkeeping for newly inserted votes
+    Must run inside the insert transaction; bulk_create paths call it directly
+    because bulk inserts do not send post_save
+    """
+    record_votes(votes, delta=1)
+    bump_results_version()
+    ballot_status.bump_user_versions({vote.user_id for vote in votes})
+    transaction.on_commit(notify_results_changed)
+
+
+@receiver(post_save, sender=Vote)
+def count_cast_vote(sender, instance, created, raw=False, **kwargs):
+    """Add a newly cast vote to its candidate tally"""
+    if created and not raw:
+        votes_cast([instance])
+
+
+@receiver(post_delete, sender=Vote)
+def uncount_deleted_vote(sender, instance, **kwargs):
+    """Remove a deleted vote from its candidate tally"""
+    record_votes([instance], delta=-1)
+    bump_results_version()
+    ballot_status.bump_user_versions([instance.user_id])
+    transaction.on_commit(notify_results_changed)
+
+
+@receiver(post_save, sender=Position)
+@receiver(post_delete, sender=Position)
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+def ballot_changed(sender, raw=False, **kwargs):
+    """Positions and candidates appear in results, so edits invalidate them"""
+    if not raw:
+        bump_ballot_version()
+        transaction.on_commit(catalog.invalidate)
+
+
+@receiver(post_save, sender=Candidate)
+def create_candidate_tally(sender, instance, created, raw=False, **kwargs):
+    """Start every candidate with a zero tally so vote casts only run UPDATEs"""
+    if created and not raw:
+        CandidateTally.objects.get_or_create(position_id=instance.position_id, candidate_id=instance.id)
+
+
+@receiver(post_save, sender=Profile)
+def profile_changed(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Voting history shows the voter's nickname"""
+    if not raw and not created and (update_fields is None or 'nickname' in update_fields):
+        ballot_status.bump_user_versions([instance.user_id])
+
+
+@receiver(post_save, sender=User)
+def user_registered(sender, created, raw=False, **kwargs):
+    """Registered users feed turnout in the stats endpoint"""
+    if created and not raw:
+        bump_results_version()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, **kwargs):
+    """Removing a user changes turnout in the stats endpoint"""
+    bump_results_version()
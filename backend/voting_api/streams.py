@@ -0,0 +1,259 @@
+"""
+Server-Sent Events for live results
+One poller per process watches the election-state version and fans compact
+tally deltas out to every connected watcher, so thousands of open streams
+cost a handful of coroutines instead of thousands of aggregate queries
+"""
+import asyncio
+import json
+import time
+import weakref
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from .results import get_results_version, tally_votes
+
+
+def read_tally_state() -> Tuple[int, Dict[str, Dict[int, int]]]:
+    """Current version and per-candidate/per-position tallies"""
+    version = get_results_version()
+    candidate_votes, position_totals = tally_votes()
+    return version, {'candidates': candidate_votes, 'positions': position_totals}
+
+
+def diff_tallies(old: Dict[str, Dict[int, int]], new: Dict[str, Dict[int, int]]) -> Dict[str, Dict[int, int]]:
+    """Entries whose counts changed (with their new values)"""
+    delta = {}
+    for key in ('candidates', 'positions'):
+        before, after = old.get(key, {}), new[key]
+        changed = {pk: after.get(pk, 0) for pk in set(before) | set(after) if before.get(pk, 0) != after.get(pk, 0)}
+        delta[key] = changed
+    return delta
+
+
+class ResultsBroadcaster:
+    """
+    Shares one version poller between all watchers on an event loop
+    Keeps a bounded history of deltas so reconnecting clients can resume
+    from their Last-Event-ID without a full snapshot
+    """
+
+    def __init__(self, poll_interval: float, history_size: int):
+        self.poll_interval = poll_interval
+        self.version: Optional[int] = None
+        self.tallies: Dict[str, Dict[int, int]] = {'candidates': {}, 'positions': {}}
+        self.history = deque(maxlen=history_size)  # (previous_version, version, delta)
+        self.changed = asyncio.Event()
+        self.wakeup = asyncio.Event()
+        self.watchers = 0
+        self.poller: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Register a watcher and make sure the poller is running"""
+        self.watchers += 1
+        if self.poller is None or self.poller.done():
+            # State may be stale after an idle period; catch up before serving
+            await self.refresh()
+            if self.poller is None or self.poller.done():
+                self.poller = asyncio.ensure_future(self._poll())
+
+    def stop(self):
+        """Unregister a watcher; the poller exits once nobody is listening"""
+        self.watchers -= 1
+        if self.watchers <= 0:
+            self.wakeup.set()
+
+    def notify(self):
+        """Skip the rest of the poll interval (called when a vote commits locally)"""
+        self.wakeup.set()
+
+    async def _poll(self):
+        while self.watchers > 0:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            if self.watchers <= 0:
+                break
+            await self.refresh()
+
+    async def refresh(self):
+        """Read the version (one query) and publish a delta when it moved"""
+        version = await sync_to_async(get_results_version)()
+        if version == self.version:
+            return
+        version, tallies = await sync_to_async(read_tally_state)()
+        if self.version is not None:
+            self.history.append((self.version, version, diff_tallies(self.tallies, tallies)))
+        self.version, self.tallies = version, tallies
+
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def events_since(self, version: int):
+        """(version, delta) pairs after the given version, or None when it fell out of history"""
+        if version == self.version:
+            return []
+        history = list(self.history)
+        for index, (previous, _, _) in enumerate(history):
+            if previous == version:
+                return [(current, delta) for _, current, delta in history[index:]]
+        return None
+
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def get_broadcaster() -> ResultsBroadcaster:
+    """Broadcaster bound to the running event loop"""
+    loop = asyncio.get_running_loop()
+    broadcaster = _broadcasters.get(loop)
+    if broadcaster is None:
+        broadcaster = ResultsBroadcaster(
+            poll_interval=getattr(settings, 'RESULTS_STREAM_POLL_SECONDS', 1.0),
+            history_size=getattr(settings, 'RESULTS_STREAM_HISTORY', 500)
+        )
+        _broadcasters[loop] = broadcaster
+    return broadcaster
+
+
+def notify_results_changed():
+    """Wake every local broadcaster (safe to call from any thread)"""
+    for loop, broadcaster in list(_broadcasters.items()):
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(broadcaster.notify)
+
+
+def format_event(event: str, version: int, data: Dict[str, Any]) -> str:
+    """Encode one SSE message"""
+    payload = json.dumps({'version': version, **data}, separators=(',', ':'))
+    return f"id: {version}\nevent: {event}\ndata: {payload}\n\n"
+
+
+async def results_event_stream(last_event_id: Optional[int]):
+    """
+    Yield a snapshot (or replayed deltas) followed by live deltas
+    Ends after RESULTS_STREAM_MAX_SECONDS; EventSource then reconnects
+    with Last-Event-ID and resumes where it left off
+    """
+    broadcaster = get_broadcaster()
+    heartbeat = getattr(settings, 'RESULTS_STREAM_HEARTBEAT_SECONDS', 15)
+    deadline = time.monotonic() + getattr(settings, 'RESULTS_STREAM_MAX_SECONDS', 300)
+
+    await broadcaster.start()
+    try:
+        yield f"retry: {getattr(settings, 'RESULTS_STREAM_RETRY_MS', 3000)}\n\n"
+
+        replay = broadcaster.events_since(last_event_id) if last_event_id is not None else None
+        if replay is None:
+            yield format_event('snapshot', broadcaster.version, broadcaster.tallies)
+        else:
+            for version, delta in replay:
+                yield format_event('delta', version, delta)
+        seen = broadcaster.version
+
+        while time.monotonic() < deadline:
+            if broadcaster.version == seen:
+                try:
+                    await asyncio.wait_for(broadcaster.changed.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+
+            pending = broadcaster.events_since(seen)
+            if pending is None:
+                yield format_event('snapshot', broadcaster.version, broadcaster.tallies)
+            else:
+                for version, delta in pending:
+                    yield format_event('delta', version, delta)
+            seen = broadcaster.version
+    finally:
+        broadcaster.stop()
+
+
+TICKET_SALT = 'voting_api.results_stream'
+
+
+def authenticate_stream_request(request):
+    """Resolve the JWT from the Authorization header (never from the URL)"""
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return authenticator.get_user(authenticator.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def issue_stream_ticket(user) -> str:
+    """Signed ticket that opens the results stream for `user` (and nothing else)"""
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def read_stream_ticket(ticket: str):
+    """The active user a ticket was issued to, or None when it is forged or older than RESULTS_STREAM_TICKET_SECONDS"""
+    try:
+        user_id = signing.TimestampSigner(salt=TICKET_SALT).unsign(
+            ticket, max_age=getattr(settings, 'RESULTS_STREAM_TICKET_SECONDS', 60)
+        )
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def results_stream_ticket_view(request):
+    """
+    Short-lived ticket for `?ticket=` on the results stream
+    EventSource cannot send an Authorization header, and an access token in a
+    URL would end up in proxy logs and browser history
+    """
+    return Response({
+        'ticket': issue_stream_ticket(request.user),
+        'expires_in': getattr(settings, 'RESULTS_STREAM_TICKET_SECONDS', 60),
+    })
+
+
+def authenticate_results_stream(request):
+    """The Authorization header, or a stream ticket from `?ticket=`"""
+    ticket = request.GET.get('ticket')
+    if ticket is not None:
+        return read_stream_ticket(ticket)
+    return authenticate_stream_request(request)
+
+
+async def results_stream_view(request):
+    """
+    Live results over Server-Sent Events
+    Serve under ASGI (e.g. `uvicorn voting_backend.asgi:application`)
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    user = await sync_to_async(authenticate_results_stream)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'error': 'Authentication credentials were not provided or are invalid'}, status=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id is not None else None
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(results_event_stream(last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
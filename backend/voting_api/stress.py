@@ -0,0 +1,86 @@
+"""
+Concurrency stress harness for the vote cast pipeline
+Fires many concurrent (and deliberately duplicated) casts at CastVoteView
+and reports response statuses, duplicate rows and queries per request
+"""
+import queue
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import Vote
+
+
+def run_cast_stress(casts: List[Tuple[Any, int, int]], threads: int = 16, repeats: int = 2) -> Dict[str, Any]:
+    """
+    Submit every (user, position_id, candidate_id) cast `repeats` times
+    from `threads` worker threads
+
+    Returns status counts, the number of (user, position) pairs holding more
+    than one vote, and the distinct query counts seen per response status.
+    Needs a database that accepts concurrent connections (file-based SQLite
+    or PostgreSQL, not in-memory SQLite).
+    """
+    url = reverse('voting_api:cast_vote')
+    lock = threading.Lock()
+    statuses = Counter()
+    queries_by_status: Dict[int, set] = {}
+
+    tasks = queue.Queue()
+    for cast_task in casts:
+        for _ in range(repeats):
+            tasks.put(cast_task)
+    total = tasks.qsize()
+
+    # The test client's default "testserver" host is only allowed under the test runner
+    host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host), 'testserver')
+
+    def worker():
+        client = APIClient(SERVER_NAME=host)
+        try:
+            while True:
+                try:
+                    user, position_id, candidate_id = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                client.force_authenticate(user)
+                try:
+                    with CaptureQueriesContext(connection) as context:
+                        response = client.post(url, {
+                            'position': position_id, 'candidate': candidate_id
+                        }, format='json')
+                    status_code, query_count = response.status_code, len(context)
+                except Exception:
+                    status_code, query_count = 500, None
+                with lock:
+                    statuses[status_code] += 1
+                    queries_by_status.setdefault(status_code, set()).add(query_count)
+        finally:
+            # Each thread owns its connection; release it before the thread exits
+            for conn in connections.all(initialized_only=True):
+                conn.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    duplicates = Vote.objects.values('user', 'position').annotate(
+        votes=Count('id')
+    ).filter(votes__gt=1).count()
+
+    return {
+        'requests': total,
+        'statuses': dict(statuses),
+        'duplicates': duplicates,
+        'queries_by_status': {
+            code: sorted(count for count in counts if count is not None)
+            for code, counts in queries_by_status.items()
+        }
+    }
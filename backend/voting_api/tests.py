@@ -1,3 +1,2389 @@
-from django.test import TestCase
+"""
+Tests for AI-Enhanced Online Voting System API
+"""
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import groq
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .models import Profile, Position, Candidate, Vote, CandidateTally, AIJob
+from .ai_analysis import (
+    prepare_voting_data_for_ai, generate_voting_summary_prompt, generate_prediction_prompt,
+    generate_voting_summary, generate_winner_prediction, generate_turnout_analysis, FragmentedPrompt
+)
+from .results import compute_position_results, get_results_version, verify_tallies
+from .stress import run_cast_stress
+from . import ai_jobs, ballot_status, catalog, llm_cache
+from .ingestion import get_journal, flush_journal
+from .generator import generate_election, synthetic_ballot
+from .benchmark import run_benchmark, percentile
+from .instrumentation import RequestTiming, RequestTimingMiddleware
+from . import metrics
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware, save_profile
+from .groq_client import CircuitOpen, build_client, get_client
+from .analytics import analyze_races
+from .streams import issue_stream_ticket, read_stream_ticket
+from .forecast import get_forecast, run_simulations, simulate_races
+from .prompt_budget import estimate_tokens, fold_candidates
+from .model_router import routed_completion, wait_for_background
 
-# Create your tests here.
+
+_metrics_dir = tempfile.TemporaryDirectory()
+_metrics_settings = override_settings(METRICS_DIR=_metrics_dir.name)
+
+
+def setUpModule():
+    # Requests record metrics; keep their files out of the project directory
+    _metrics_settings.enable()
+
+
+def tearDownModule():
+    _metrics_settings.disable()
+    _metrics_dir.cleanup()
+
+
+def create_voter(student_id):
+    """Create a user with profile (fast password hash not needed for API tests)"""
+    user = User.objects.create(username=student_id)
+    Profile.objects.create(
+        user=user,
+        student_id=student_id,
+        email=f'{student_id}@test.com',
+        nickname=f'Voter {student_id}'
+    )
+    return user
+
+
+def create_ballot(positions, candidates_per_position, start_order=0):
+    """Create positions with candidates and return them"""
+    created = []
+    for index in range(positions):
+        position = Position.objects.create(
+            name=f'Position {start_order + index}',
+            order=start_order + index
+        )
+        for number in range(candidates_per_position):
+            Candidate.objects.create(position=position, name=f'Candidate {number}')
+        created.append(position)
+    return created
+
+
+def cast_votes(voters, positions, pick=lambda voter_index, candidates: candidates[0]):
+    """Cast one vote per voter for each position"""
+    for voter_index, voter in enumerate(voters):
+        for position in positions:
+            candidates = list(position.candidates.all())
+            Vote.objects.create(user=voter, position=position, candidate=pick(voter_index, candidates))
+
+
+def reset_llm_cache():
+    """Clear the LLM caches once overtaken model calls have stopped writing to them"""
+    wait_for_background()
+    llm_cache.clear()
+
+
+# ==================== Results Engine Tests ====================
+
+class ResultsEngineTests(TestCase):
+    """Set-based results computed for every position at once"""
+
+    def setUp(self):
+        self.positions = create_ballot(positions=2, candidates_per_position=3)
+        self.voters = [create_voter(f'{index:07d}') for index in range(4)]
+        # Each position: candidate 0 x3, candidate 1 x1
+        cast_votes(
+            self.voters, self.positions,
+            pick=lambda voter_index, candidates: candidates[0] if voter_index < 3 else candidates[1]
+        )
+
+    def test_results_match_model_helpers(self):
+        """Engine output agrees with the per-row model helpers"""
+        for result in compute_position_results():
+            position = Position.objects.get(id=result['position_id'])
+            self.assertEqual(result['total_votes'], position.get_total_votes())
+            self.assertEqual(result['candidates_count'], position.get_candidates_count())
+            for candidate_data in result['candidates']:
+                candidate = Candidate.objects.get(id=candidate_data['id'])
+                self.assertEqual(candidate_data['vote_count'], candidate.get_vote_count())
+                self.assertEqual(candidate_data['percentage'], candidate.get_vote_percentage())
+            self.assertEqual(result['winner']['vote_count'], 3)
+            self.assertEqual(result['margin'], 2)
+
+    def test_inactive_candidates_excluded_but_counted_in_total(self):
+        """Inactive candidates are hidden while their votes stay in the position total"""
+        candidate = self.positions[0].candidates.get(name='Candidate 1')
+        candidate.is_active = False
+        candidate.save()
+
+        result = compute_position_results(Position.objects.filter(id=self.positions[0].id))[0]
+        self.assertEqual(result['total_votes'], 4)
+        self.assertNotIn(candidate.id, [c['id'] for c in result['candidates']])
+
+
+class ResultsQueryCountTests(TestCase):
+    """Query counts stay constant as positions and candidates grow"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_voter('0000001')
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def count_ai_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            prepare_voting_data_for_ai()
+        return len(context)
+
+    def test_query_count_independent_of_ballot_size(self):
+        urls = [reverse('voting_api:results'), reverse('voting_api:stats')]
+
+        small = create_ballot(positions=1, candidates_per_position=2)
+        cast_votes([self.user], small)
+        position_url = reverse('voting_api:position_result', args=[small[0].id])
+        small_counts = [self.count_queries(url) for url in urls + [position_url]]
+        small_ai = self.count_ai_queries()
+
+        large = create_ballot(positions=6, candidates_per_position=5, start_order=10)
+        cast_votes([self.user, create_voter('0000002')], large)
+        large_counts = [self.count_queries(url) for url in urls + [position_url]]
+        large_ai = self.count_ai_queries()
+
+        self.assertEqual(small_counts, large_counts)
+        self.assertEqual(small_ai, large_ai)
+
+
+# ==================== Candidate Tally Tests ====================
+
+class CandidateTallyTests(TestCase):
+    """Materialized tallies follow every Vote insert and delete"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.position = create_ballot(positions=1, candidates_per_position=2)[0]
+        self.candidate = self.position.candidates.first()
+        self.voters = [create_voter(f'{index:07d}') for index in range(3)]
+
+    def test_cast_vote_updates_tally(self):
+        self.client.force_authenticate(self.voters[0])
+        response = self.client.post(reverse('voting_api:cast_vote'), {
+            'candidate': self.candidate.id, 'position': self.position.id
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        tally = CandidateTally.objects.get(position=self.position, candidate=self.candidate)
+        self.assertEqual(tally.vote_count, 1)
+
+    def test_deletes_and_cascades_keep_tallies_consistent(self):
+        cast_votes(self.voters, [self.position])
+        self.assertEqual(CandidateTally.objects.get(candidate=self.candidate).vote_count, 3)
+
+        Vote.objects.filter(user=self.voters[0]).delete()
+        self.voters[1].delete()
+        self.assertEqual(CandidateTally.objects.get(candidate=self.candidate).vote_count, 1)
+        self.assertEqual(verify_tallies(), [])
+
+        self.candidate.delete()
+        self.assertFalse(CandidateTally.objects.filter(candidate_id=self.candidate.id).exists())
+
+    def test_rebuild_command_repairs_drift(self):
+        cast_votes(self.voters, [self.position])
+        CandidateTally.objects.update(vote_count=99)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_tallies', verify=True, stdout=StringIO())
+
+        call_command('rebuild_tallies', stdout=StringIO())
+        call_command('rebuild_tallies', verify=True, stdout=StringIO())
+        self.assertEqual(CandidateTally.objects.get(candidate=self.candidate).vote_count, 3)
+
+
+# ==================== Conditional GET Tests ====================
+
+class ResultsConditionalGetTests(TestCase):
+    """Results and stats answer If-None-Match from the election-state version"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_voter('0000001')
+        self.client.force_authenticate(self.user)
+        self.position = create_ballot(positions=1, candidates_per_position=2)[0]
+        self.urls = [
+            reverse('voting_api:results'),
+            reverse('voting_api:position_result', args=[self.position.id]),
+            reverse('voting_api:stats'),
+        ]
+
+    def test_unchanged_poll_returns_304_with_single_query(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('no-cache', response['Cache-Control'])
+
+            with CaptureQueriesContext(connection) as context:
+                cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(cached.status_code, 304)
+            self.assertEqual(len(context), 1)
+
+    def test_votes_and_ballot_edits_advance_etag(self):
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+
+        cast_votes([self.user], [self.position])
+        after_vote = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(after_vote.status_code, 200)
+        self.assertNotEqual(after_vote['ETag'], etag)
+
+        candidate = self.position.candidates.first()
+        candidate.bio = 'Updated'
+        candidate.save()
+        after_edit = self.client.get(url, HTTP_IF_NONE_MATCH=after_vote['ETag'])
+        self.assertEqual(after_edit.status_code, 200)
+        self.assertNotEqual(after_edit['ETag'], after_vote['ETag'])
+
+
+# ==================== Live Results Stream Tests ====================
+
+def parse_sse(chunk):
+    """Decode one SSE message into (id, event, data)"""
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().splitlines())
+    return int(fields['id']), fields['event'], json.loads(fields['data'])
+
+
+@override_settings(RESULTS_STREAM_POLL_SECONDS=0.05, RESULTS_STREAM_HEARTBEAT_SECONDS=5)
+class ResultsStreamTests(TestCase):
+    """SSE stream through the in-process ASGI client"""
+
+    def setUp(self):
+        self.user = create_voter('0000001')
+        self.position = create_ballot(positions=1, candidates_per_position=2)[0]
+        self.candidate = self.position.candidates.first()
+        self.candidate_ids = list(self.position.candidates.values_list('id', flat=True))
+        self.url = reverse('voting_api:results_stream') + f'?ticket={issue_stream_ticket(self.user)}'
+
+    async def test_rejects_missing_token(self):
+        response = await AsyncClient().get(reverse('voting_api:results_stream'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_access_token_is_not_accepted_in_the_url(self):
+        url = reverse('voting_api:results_stream') + f'?token={AccessToken.for_user(self.user)}'
+        self.assertEqual((await AsyncClient().get(url)).status_code, 401)
+        response = await AsyncClient().get(url, headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        await response.streaming_content.aclose()
+
+    def test_ticket_is_short_lived_and_single_purpose(self):
+        client = APIClient()
+        self.assertEqual(client.post(reverse('voting_api:results_stream_ticket')).status_code, 401)
+        client.force_authenticate(user=self.user)
+        ticket = client.post(reverse('voting_api:results_stream_ticket')).json()['ticket']
+        self.assertEqual(read_stream_ticket(ticket), self.user)
+        self.assertIsNone(read_stream_ticket(ticket + 'x'))
+        with override_settings(RESULTS_STREAM_TICKET_SECONDS=-1):
+            self.assertIsNone(read_stream_ticket(ticket))
+
+    async def test_snapshot_then_delta_then_resume(self):
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+
+        self.assertTrue((await stream.__anext__()).startswith(b'retry:'))
+        snapshot_id, event, data = parse_sse(await stream.__anext__())
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(data['candidates'], {str(pk): 0 for pk in self.candidate_ids})
+
+        await sync_to_async(cast_votes)([self.user], [self.position])
+        delta_id, event, data = parse_sse(await stream.__anext__())
+        await stream.aclose()
+
+        self.assertEqual(event, 'delta')
+        self.assertGreater(delta_id, snapshot_id)
+        self.assertEqual(data['candidates'], {str(self.candidate.id): 1})
+        self.assertEqual(data['positions'], {str(self.position.id): 1})
+
+        # Reconnecting with Last-Event-ID replays only what was missed
+        response = await AsyncClient().get(self.url, headers={'Last-Event-ID': str(snapshot_id)})
+        stream = response.streaming_content
+        await stream.__anext__()
+        replay_id, event, data = parse_sse(await stream.__anext__())
+        await stream.aclose()
+        self.assertEqual((replay_id, event), (delta_id, 'delta'))
+
+
+# ==================== Ballot Submission Tests ====================
+
+class CastBallotTests(TestCase):
+    """Whole-ballot submission in one request"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_voter('0000001')
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        self.url = reverse('voting_api:cast_ballot')
+
+    def ballot_for(self, positions):
+        return {'votes': [
+            {'position': position.id, 'candidate': position.candidates.first().id}
+            for position in positions
+        ]}
+
+    def test_submits_all_positions_with_constant_queries(self):
+        small = self.ballot_for(create_ballot(positions=2, candidates_per_position=2))
+        large = self.ballot_for(create_ballot(positions=6, candidates_per_position=3, start_order=10))
+
+        with CaptureQueriesContext(connection) as small_context:
+            response = self.client.post(self.url, small, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['votes']), 2)
+
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        with CaptureQueriesContext(connection) as large_context:
+            response = self.client.post(self.url, large, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(len(small_context), len(large_context))
+        self.assertEqual(Vote.objects.filter(user=self.user).count(), 8)
+        self.assertEqual(verify_tallies(), [])
+
+    def test_invalid_selection_rejects_whole_ballot(self):
+        positions = create_ballot(positions=3, candidates_per_position=2)
+        cast_votes([self.user], positions[:1])
+        ballot = self.ballot_for(positions)
+        ballot['votes'][1]['candidate'] = positions[2].candidates.first().id
+
+        response = self.client.post(self.url, ballot, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            set(response.data['positions']),
+            {str(positions[0].id), str(positions[1].id)}
+        )
+        self.assertEqual(Vote.objects.filter(user=self.user).count(), 1)
+
+    def test_rejects_repeated_position(self):
+        position = create_ballot(positions=1, candidates_per_position=2)[0]
+        ballot = self.ballot_for([position, position])
+
+        response = self.client.post(self.url, ballot, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Vote.objects.exists())
+
+
+# ==================== Vote Cast Pipeline Tests ====================
+
+class CastVoteTests(TestCase):
+    """Insert-first vote casting"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_voter('0000001')
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        self.position = create_ballot(positions=1, candidates_per_position=2)[0]
+        self.candidate = self.position.candidates.first()
+        self.url = reverse('voting_api:cast_vote')
+
+    def test_repeat_vote_returns_conflict(self):
+        data = {'candidate': self.candidate.id, 'position': self.position.id}
+        self.assertEqual(self.client.post(self.url, data, format='json').status_code, 201)
+
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(verify_tallies(), [])
+
+    def test_other_integrity_errors_are_not_conflicts(self):
+        data = {'candidate': self.candidate.id, 'position': self.position.id}
+        failure = IntegrityError('FOREIGN KEY constraint failed')  # The candidate was deleted mid-request
+        with mock.patch('voting_api.serializers.CastVoteSerializer.create', side_effect=failure):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_rejects_candidate_from_other_position(self):
+        other = create_ballot(positions=1, candidates_per_position=1, start_order=5)[0]
+        response = self.client.post(self.url, {
+            'candidate': other.candidates.first().id, 'position': self.position.id
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Vote.objects.exists())
+
+
+class CastVoteConcurrencyTests(TransactionTestCase):
+    """Concurrent double-submits never produce 500s or duplicate votes"""
+
+    def test_stress_concurrent_double_submits(self):
+        positions = create_ballot(positions=3, candidates_per_position=2)
+        voters = [create_voter(f'{index:07d}') for index in range(40)]
+        casts = [
+            (voter, position.id, position.candidates.first().id)
+            for voter in voters for position in positions
+        ]
+
+        report = run_cast_stress(casts, threads=8, repeats=2)
+
+        self.assertNotIn(500, report['statuses'])
+        self.assertEqual(report['statuses'].get(201), len(casts))
+        self.assertEqual(report['statuses'].get(409), len(casts))
+        self.assertEqual(report['duplicates'], 0)
+        self.assertEqual(len(report['queries_by_status'][201]), 1)
+        self.assertEqual(verify_tallies(), [])
+
+
+# ==================== Write-Behind Ingestion Tests ====================
+
+class VoteJournalTests(TestCase):
+    """Journal mode accepts votes immediately and flushes them in batches"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        settings_override = override_settings(
+            VOTE_INGESTION_MODE='journal',
+            VOTE_JOURNAL_PATH=os.path.join(directory, 'journal.sqlite3'),
+            VOTE_JOURNAL_BACKGROUND_FLUSH=False
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(lambda: get_journal().close())
+
+        self.client = APIClient()
+        self.user = create_voter('0000001')
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        self.positions = create_ballot(positions=3, candidates_per_position=2)
+
+    def post_vote(self, position):
+        return self.client.post(reverse('voting_api:cast_vote'), {
+            'candidate': position.candidates.first().id, 'position': position.id
+        }, format='json')
+
+    def test_accepts_then_flushes_into_votes(self):
+        self.assertEqual(self.post_vote(self.positions[0]).status_code, 202)
+        response = self.client.post(reverse('voting_api:cast_ballot'), {'votes': [
+            {'position': position.id, 'candidate': position.candidates.first().id}
+            for position in self.positions[1:]
+        ]}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Vote.objects.exists())
+
+        self.assertEqual(flush_journal(get_journal()), 3)
+        self.assertEqual(Vote.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(verify_tallies(), [])
+        self.assertEqual(get_journal().pending_count(), 0)
+
+    def test_duplicates_rejected_before_and_after_flush(self):
+        cache.clear()
+        self.assertEqual(self.post_vote(self.positions[0]).status_code, 202)
+        status_data = self.client.get(reverse('voting_api:voting_status')).json()
+        self.assertEqual(status_data['voted_count'], 1)
+        self.assertEqual(self.post_vote(self.positions[0]).status_code, 409)
+
+        flush_journal(get_journal())
+        self.assertEqual(self.post_vote(self.positions[0]).status_code, 409)
+
+        # Votes recorded before journal mode was enabled also count
+        cast_votes([self.user], self.positions[1:2])
+        self.assertEqual(self.post_vote(self.positions[1]).status_code, 409)
+
+    def test_replay_recovers_from_crash_mid_flush(self):
+        for position in self.positions:
+            self.post_vote(position)
+        journal = get_journal()
+
+        # Crash after claiming and inserting part of a batch, before marking it flushed
+        entries = journal.claim(limit=10, lease_seconds=30)
+        first = entries[0]
+        cast_votes([self.user], [Position.objects.get(pk=first['position_id'])])
+
+        call_command('replay_vote_journal', stdout=StringIO())
+
+        self.assertEqual(Vote.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(journal.pending_count(), 0)
+        self.assertEqual(verify_tallies(), [])
+
+    def test_entry_with_deleted_candidate_does_not_block_the_batch(self):
+        for position in self.positions:
+            self.post_vote(position)
+        self.positions[0].candidates.first().delete()
+
+        journal = get_journal()
+        with self.assertLogs('voting_api.ingestion', 'WARNING'):
+            self.assertEqual(flush_journal(journal), 3)
+        self.assertEqual(Vote.objects.filter(user=self.user).count(), 2)
+        self.assertEqual((journal.pending_count(), journal.rejected_count()), (0, 1))
+        # The rejected entry no longer holds the position
+        self.assertEqual(self.post_vote(self.positions[0]).status_code, 202)
+
+    @override_settings(VOTE_JOURNAL_RETENTION_SECONDS=0)
+    def test_flushed_entries_are_pruned(self):
+        self.post_vote(self.positions[0])
+        journal = get_journal()
+        flush_journal(journal)
+        self.assertEqual(journal.journaled_positions(self.user.id), set())
+        self.assertEqual(self.post_vote(self.positions[0]).status_code, 409)
+
+        # An admin removes the vote: the user may vote again
+        Vote.objects.filter(user=self.user).delete()
+        cache.clear()
+        self.assertEqual(self.post_vote(self.positions[0]).status_code, 202)
+
+
+# ==================== Ballot Status Cache Tests ====================
+
+class BallotStatusCacheTests(TestCase):
+    """Status and my-votes are served from the per-user cache"""
+
+    def setUp(self):
+        cache.clear()
+        catalog.invalidate()
+        self.client = APIClient()
+        self.user = create_voter('0000001')
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        self.positions = create_ballot(positions=3, candidates_per_position=2)
+
+    def get_status(self):
+        return self.client.get(reverse('voting_api:voting_status')).json()
+
+    def cast(self, position):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('voting_api:cast_vote'), {
+                'candidate': position.candidates.first().id, 'position': position.id
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_warm_requests_run_one_version_lookup(self):
+        self.cast(self.positions[0])
+        self.get_status()
+        self.client.get(reverse('voting_api:my_votes'))
+
+        for name in ('voting_api:voting_status', 'voting_api:my_votes'):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(context), 1, name)
+
+    def test_vote_cast_refreshes_status_with_one_query(self):
+        self.assertEqual(self.get_status()['voted_count'], 0)
+        self.cast(self.positions[1])
+
+        with CaptureQueriesContext(connection) as context:
+            data = self.get_status()
+        self.assertEqual(len(context), 2)
+        self.assertEqual(data['voted_count'], 1)
+        self.assertEqual(data['total_positions'], 3)
+        self.assertEqual(
+            [item['has_voted'] for item in data['voting_status']],
+            [False, True, False]
+        )
+
+        votes = self.client.get(reverse('voting_api:my_votes')).json()
+        self.assertEqual(len(votes), 1)
+        self.assertEqual(votes[0]['position_name'], self.positions[1].name)
+        self.assertEqual(votes[0]['user_nickname'], self.user.profile.nickname)
+
+    def test_ballot_edits_invalidate_entries(self):
+        self.get_status()
+        with self.captureOnCommitCallbacks(execute=True):
+            Position.objects.filter(pk=self.positions[2].pk).update(is_active=False)
+            self.positions[2].refresh_from_db()
+            self.positions[2].save()
+
+        data = self.get_status()
+        self.assertEqual(data['total_positions'], 2)
+
+    def test_vote_in_another_process_retires_the_entry(self):
+        self.assertEqual(self.get_status()['voted_count'], 0)
+        # Another worker's vote: this process's cache is never told, the version moves
+        cast_votes([self.user], self.positions[:1])
+        self.assertEqual(self.get_status()['voted_count'], 1)
+
+    def test_other_voters_leave_the_entry_warm(self):
+        self.get_status()
+        cast_votes([create_voter('0000002')], self.positions)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.get_status()['voted_count'], 0)
+        self.assertEqual(len(context), 1)
+
+    def test_nickname_change_refreshes_history(self):
+        self.cast(self.positions[0])
+        self.client.get(reverse('voting_api:my_votes'))
+        profile = Profile.objects.get(user=self.user)
+        profile.nickname = 'Renamed'
+        profile.save()
+        self.assertEqual(self.client.get(reverse('voting_api:my_votes')).json()[0]['user_nickname'], 'Renamed')
+
+    def test_mask_uses_ballot_order_not_ids(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            position = Position.objects.create(id=10_000, name='Treasurer', order=3)
+            Candidate.objects.create(position=position, name='Candidate 0')
+            cast_votes([self.user], [position])
+        entry = ballot_status.get_user_entry(self.user, catalog.get_catalog())
+        self.assertEqual(entry['mask'], 1 << 3)
+        self.assertEqual(self.get_status()['voted_count'], 1)
+
+
+# ==================== Ballot Catalog Tests ====================
+
+class BallotCatalogTests(TestCase):
+    """Positions and candidates are served from the in-memory catalog"""
+
+    def setUp(self):
+        catalog.invalidate()
+        self.client = APIClient()
+        self.user = create_voter('0000001')
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        self.positions = create_ballot(positions=3, candidates_per_position=4)
+
+    def test_warm_catalog_runs_no_queries(self):
+        self.client.get(reverse('voting_api:positions_list'))
+
+        with CaptureQueriesContext(connection) as context:
+            positions = self.client.get(reverse('voting_api:positions_list')).json()
+            candidates = self.client.get(
+                reverse('voting_api:candidates_list'), {'position': self.positions[1].id}
+            ).json()
+        self.assertEqual(len(context), 0)
+        self.assertEqual([position['id'] for position in positions], [position.id for position in self.positions])
+        self.assertEqual(positions[0]['candidates_count'], 4)
+        self.assertNotIn('vote_count', positions[0]['candidates'][0])
+        self.assertEqual({candidate['position'] for candidate in candidates}, {self.positions[1].id})
+
+    def test_votes_do_not_rebuild_catalog(self):
+        self.client.get(reverse('voting_api:positions_list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            cast_votes([self.user], self.positions)
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('voting_api:positions_list'))
+        self.assertEqual(len(context), 0)
+
+    def test_ballot_edit_rebuilds_catalog(self):
+        self.client.get(reverse('voting_api:positions_list'))
+        candidate = self.positions[0].candidates.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            candidate.name = 'Renamed Candidate'
+            candidate.save()
+
+        positions = self.client.get(reverse('voting_api:positions_list')).json()
+        self.assertIn('Renamed Candidate', [c['name'] for c in positions[0]['candidates']])
+
+    @override_settings(BALLOT_CATALOG_CHECK_SECONDS=0)
+    def test_edit_in_another_process_rebuilds_catalog(self):
+        self.client.get(reverse('voting_api:positions_list'))
+        # Another worker's edit: this process's catalog is never dropped, the ballot version moves
+        candidate = self.positions[0].candidates.first()
+        candidate.name = 'Renamed Candidate'
+        candidate.save()
+
+        positions = self.client.get(reverse('voting_api:positions_list')).json()
+        self.assertIn('Renamed Candidate', [c['name'] for c in positions[0]['candidates']])
+
+
+# ==================== Endpoint Query Budget & Latency Regression ====================
+
+# Latency is only compared on request: VOTING_PERF_BASELINE=record writes this machine's
+# baseline (not committed, timings do not travel between machines), =1 compares with it
+PERF_BASELINE_MODE = os.environ.get('VOTING_PERF_BASELINE', '')
+PERF_BASELINE_PATH = os.environ.get(
+    'VOTING_PERF_BASELINE_PATH', os.path.join(settings.BASE_DIR, '.perf_baseline.json')
+)
+PERF_PASSWORD = 'Ballot-Box-2024!'
+
+# Queries per request (JWT user lookup included) with cold caches; identical at every election size
+QUERY_BUDGET = {
+    'health_check': 1,
+    'register': 6,
+    'login': 2,
+    'profile': 2,
+    'token_refresh': 1,
+    'positions_list': 5,
+    'candidates_list': 5,
+    'cast_vote': 9,
+    'cast_ballot': 10,
+    'my_votes': 7,
+    'voting_status': 7,
+    'results': 5,
+    'results_stream': 2,
+    'results_stream_ticket': 1,
+    'position_result': 5,
+    'stats': 8,
+    'race_analytics': 5,
+    'win_forecast': 7,
+    'ai_summary': 8,
+    'ai_prediction': 13,
+    'ai_turnout': 8,
+    'ai_insights': 13,
+    'ai_summary_stream': 8,       # WSGI test client: the buffered fallback
+    'ai_prediction_stream': 13,
+    'ai_turnout_stream': 8,
+    'ai_insights_stream': 13,
+    'ai_job': 2,
+}
+
+
+def seed_election(candidates, votes, candidates_per_position=5):
+    """
+    Generate an election with `candidates` candidates and exactly `votes` votes
+    (every voter answers every position)
+    """
+    positions = max(1, candidates // candidates_per_position)
+    generate_election(
+        synthetic_ballot(positions, candidates_per_position),
+        students=max(1, votes // positions), turnout=1.0, completion=1.0, password=PERF_PASSWORD
+    )
+    return list(Position.objects.order_by('order'))
+
+
+class EndpointBudgetMixin:
+    """
+    Requests every URL in voting_api/urls.py against a seeded election and
+    asserts its query budget. With VOTING_PERF_BASELINE set, best-of-N latency
+    is also recorded (=record) or compared with the local baseline (=1);
+    VOTING_PERF_TOLERANCE changes the allowed slowdown (default 0.5 = +50%)
+    """
+    scale = None            # Baseline key
+    candidates = None
+    votes = None
+    timing_repeats = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.positions = seed_election(cls.candidates, cls.votes)
+        cls.voter = User.objects.order_by('id').first()
+        cls.fresh_ids = iter(range(9000000, 9999999))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def new_voter(self):
+        user = create_voter(f'{next(self.fresh_ids):07d}')
+        self.authenticate(user)
+        return user
+
+    def request_specs(self):
+        """
+        URL name -> prepare callable; prepare builds any fixtures and
+        returns the request to measure (non-HTTP checks return a plain call)
+        """
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from .streams import read_tally_state
+
+        position = self.positions[0]
+        candidate_id = position.candidates.values_list('id', flat=True).first()
+        ballot = [
+            {'position': seat.id, 'candidate': seat.candidates.values_list('id', flat=True).first()}
+            for seat in self.positions[:3]
+        ]
+
+        def get(name, anonymous=False, **kwargs):
+            def prepare():
+                if anonymous:
+                    self.client.credentials()
+                else:
+                    self.authenticate(self.voter)
+                return lambda: self.client.get(reverse(f'voting_api:{name}', kwargs=kwargs))
+            return prepare
+
+        def anonymous_post(name, payload):
+            def prepare():
+                self.client.credentials()
+                data = payload()
+                return lambda: self.client.post(reverse(f'voting_api:{name}'), data, format='json')
+            return prepare
+
+        def voter_post(name, data):
+            def prepare():
+                self.new_voter()
+                return lambda: self.client.post(reverse(f'voting_api:{name}'), data, format='json')
+            return prepare
+
+        def authenticated_post(name):
+            def prepare():
+                self.authenticate(self.voter)
+                return lambda: self.client.post(reverse(f'voting_api:{name}'))
+            return prepare
+
+        def registration():
+            student_id = f'{next(self.fresh_ids):07d}'
+            return {
+                'student_id': student_id, 'email': f'{student_id}@test.com', 'nickname': 'New',
+                'password': PERF_PASSWORD, 'password_confirm': PERF_PASSWORD
+            }
+
+        return {
+            'health_check': get('health_check'),
+            'register': anonymous_post('register', registration),
+            'login': anonymous_post('login', lambda: {'student_id': self.voter.username, 'password': PERF_PASSWORD}),
+            'profile': get('profile'),
+            'token_refresh': anonymous_post('token_refresh', lambda: {'refresh': str(RefreshToken.for_user(self.voter))}),
+            'positions_list': get('positions_list'),
+            'candidates_list': get('candidates_list'),
+            'cast_vote': voter_post('cast_vote', {'position': position.id, 'candidate': candidate_id}),
+            'cast_ballot': voter_post('cast_ballot', {'votes': ballot}),
+            'my_votes': get('my_votes'),
+            'voting_status': get('voting_status'),
+            'results': get('results'),
+            # The SSE view is async; each process pays one read_tally_state() per version change
+            'results_stream': lambda: lambda: read_tally_state() and None,
+            'results_stream_ticket': authenticated_post('results_stream_ticket'),
+            'position_result': get('position_result', position_id=position.id),
+            'stats': get('stats'),
+            'race_analytics': get('race_analytics'),
+            'win_forecast': get('win_forecast'),
+            'ai_summary': get('ai_summary'),
+            'ai_prediction': get('ai_prediction'),
+            'ai_turnout': get('ai_turnout'),
+            'ai_insights': get('ai_insights'),
+            'ai_summary_stream': get('ai_summary_stream'),
+            'ai_prediction_stream': get('ai_prediction_stream'),
+            'ai_turnout_stream': get('ai_turnout_stream'),
+            'ai_insights_stream': get('ai_insights_stream'),
+            'ai_job': get('ai_job', job_id=AIJob.objects.create(kind='summary', request_key='summary').pk),
+        }
+
+    def measure(self, prepare):
+        """Run one request with cold caches; returns (response, queries, milliseconds)"""
+        send = prepare()
+        cache.clear()
+        catalog.invalidate()
+        llm_cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = send()
+            elapsed = time.perf_counter() - started
+        return response, context.captured_queries, elapsed * 1000
+
+    @override_settings(GROQ_API_KEY='')
+    def test_query_budget_and_latency(self):
+        from . import urls
+
+        specs = self.request_specs()
+        self.assertEqual(set(specs), {pattern.name for pattern in urls.urlpatterns})
+
+        timings = {}
+        for name, prepare in specs.items():
+            samples = []
+            for _ in range(self.timing_repeats if PERF_BASELINE_MODE else 1):
+                response, queries, elapsed = self.measure(prepare)
+                if response is not None:
+                    self.assertLess(response.status_code, 400, f'{name}: {response.status_code}')
+                self.assertEqual(
+                    len(queries), QUERY_BUDGET[name],
+                    f'{name} query budget:\n' + '\n'.join(query['sql'] for query in queries)
+                )
+                samples.append(elapsed)
+            timings[name] = round(min(samples), 2)
+        if PERF_BASELINE_MODE:
+            self.check_baseline(timings)
+
+    def check_baseline(self, timings):
+        if PERF_BASELINE_MODE == 'record':
+            baseline = {}
+            if os.path.exists(PERF_BASELINE_PATH):
+                with open(PERF_BASELINE_PATH) as handle:
+                    baseline = json.load(handle)
+            baseline[self.scale] = timings
+            with open(PERF_BASELINE_PATH, 'w') as handle:
+                json.dump(baseline, handle, indent=2, sort_keys=True)
+                handle.write('\n')
+            return
+
+        if not os.path.exists(PERF_BASELINE_PATH):
+            self.skipTest('No latency baseline; record one with VOTING_PERF_BASELINE=record')
+        with open(PERF_BASELINE_PATH) as handle:
+            baseline = json.load(handle).get(self.scale, {})
+        tolerance = float(os.environ.get('VOTING_PERF_TOLERANCE', '0.5'))
+        slack_ms = float(os.environ.get('VOTING_PERF_SLACK_MS', '10'))
+        regressions = {
+            name: (baseline[name], elapsed)
+            for name, elapsed in timings.items()
+            if name in baseline and elapsed > baseline[name] * (1 + tolerance) + slack_ms
+        }
+        self.assertFalse(regressions, f'Latency regressions (baseline ms, measured ms): {regressions}')
+
+
+class SmallElectionBudgetTests(EndpointBudgetMixin, TestCase):
+    scale, candidates, votes = 'small', 5, 1000
+
+
+class MediumElectionBudgetTests(EndpointBudgetMixin, TestCase):
+    scale, candidates, votes = 'medium', 50, 10000
+
+
+@skipUnless(os.environ.get('VOTING_PERF_LARGE'), 'Seeds 100k votes; set VOTING_PERF_LARGE=1 to run')
+class LargeElectionBudgetTests(EndpointBudgetMixin, TestCase):
+    scale, candidates, votes = 'large', 500, 100000
+
+
+# ==================== Synthetic Election Generator Tests ====================
+
+class ElectionGeneratorTests(TestCase):
+    """populate_data builds consistent elections with bulk inserts"""
+
+    def test_generated_election_is_consistent_and_seeded(self):
+        summary = generate_election(synthetic_ballot(4, 3), students=300, turnout=0.8, seed=7)
+
+        self.assertEqual(summary['students'], 300)
+        self.assertEqual(Profile.objects.filter(email__endswith='@synthetic.local').count(), 300)
+        self.assertEqual(Vote.objects.count(), summary['votes'])
+        self.assertTrue(600 < summary['votes'] < 1200)
+        self.assertEqual(verify_tallies(), [])
+        self.assertEqual(CandidateTally.objects.count(), 12)
+        self.assertTrue(User.objects.get(username='G000000').check_password('test123'))
+
+        first_run = sorted(Vote.objects.values_list('user__username', 'position__name', 'candidate__name'))
+        call_command('populate_data', positions=4, candidates=3, students=300, turnout=0.8, seed=7, stdout=StringIO())
+        second_run = sorted(Vote.objects.values_list('user__username', 'position__name', 'candidate__name'))
+        self.assertEqual(first_run, second_run)
+
+    def test_distributions_shape_support(self):
+        def leader_share(distribution):
+            call_command(
+                'populate_data', positions=1, candidates=4, students=2000, turnout=1.0,
+                distribution=distribution, stdout=StringIO()
+            )
+            counts = sorted(CandidateTally.objects.values_list('vote_count', flat=True), reverse=True)
+            return counts[0] / sum(counts)
+
+        self.assertGreater(leader_share('skewed'), 0.4)
+        self.assertLess(leader_share('close'), 0.3)
+
+    def test_rerun_keeps_real_students_and_consistent_state(self):
+        student = create_voter('1000000')
+        generate_election(synthetic_ballot(2, 3), students=20, turnout=1.0)
+        version = get_results_version()
+
+        call_command('populate_data', positions=3, candidates=2, students=20, turnout=1.0, stdout=StringIO())
+
+        self.assertTrue(User.objects.filter(pk=student.pk, username='1000000').exists())
+        self.assertEqual(User.objects.filter(username__startswith='G').count(), 20)
+        self.assertEqual(verify_tallies(), [])
+        self.assertEqual(CandidateTally.objects.count(), 6)
+        self.assertGreater(get_results_version(), version)
+        self.assertEqual(len(catalog.get_catalog()['positions']), 3)
+
+    def test_default_populates_demo_ballot(self):
+        call_command('populate_data', stdout=StringIO())
+        self.assertEqual(Position.objects.count(), 6)
+        self.assertEqual(Candidate.objects.count(), 16)
+        self.assertEqual(Vote.objects.count(), 0)
+        self.assertTrue(User.objects.filter(username='TEST001').exists())
+
+
+# ==================== Benchmark Tests ====================
+
+class BenchmarkTests(TransactionTestCase):
+    """The benchmark reports latency percentiles and SQL cost per endpoint"""
+
+    def test_reports_every_requested_endpoint(self):
+        generate_election(synthetic_ballot(2, 3), students=50, turnout=1.0)
+
+        report = run_benchmark(['results', 'cast_vote'], requests=12, concurrency=3)
+
+        self.assertEqual(report['results']['statuses'], {'200': 12})
+        self.assertEqual(report['cast_vote']['statuses'], {'201': 12})
+        for name in ('results', 'cast_vote'):
+            latency = report[name]['latency_ms']
+            self.assertLessEqual(latency['p50'], latency['p95'])
+            self.assertLessEqual(latency['p95'], latency['p99'])
+            self.assertGreater(report[name]['requests_per_second'], 0)
+        self.assertEqual(report['results']['sql_queries']['max'], QUERY_BUDGET['results'])
+        self.assertEqual(verify_tallies(), [])
+
+    def test_percentile_uses_nearest_rank(self):
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(values, 0.50), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([7.0], 0.95), 7.0)
+
+
+# ==================== Request Timing Instrumentation Tests ====================
+
+class RequestTimingTests(TestCase):
+    """Opt-in Server-Timing header and slow-request log"""
+
+    def setUp(self):
+        self.user = create_voter('0000001')
+        create_ballot(positions=2, candidates_per_position=2)
+        self.token = AccessToken.for_user(self.user)
+
+    def get_stats(self):
+        client = APIClient()  # Middleware is loaded per client
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return client.get(reverse('voting_api:stats'))
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.get_stats())
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_SLOW_MS=10000)
+    def test_server_timing_header(self):
+        header = self.get_stats()['Server-Timing']
+        phases = dict(entry.split(';', 1) for entry in header.split(', '))
+        self.assertEqual(set(phases), {'total', 'db', 'view', 'render', 'auth'})
+        self.assertIn(f'desc="{QUERY_BUDGET["stats"]} queries"', phases['db'])
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_SLOW_MS=10000)
+    async def test_async_requests_are_timed(self):
+        self.assertTrue(RequestTimingMiddleware.async_capable)
+        response = await AsyncClient().get(reverse('voting_api:stats'), headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 200)
+        phases = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+        self.assertIn(f'desc="{QUERY_BUDGET["stats"]} queries"', phases['db'])
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_SLOW_MS=0)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs('voting_api.slow_requests', level='WARNING') as logs:
+            self.get_stats()
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['path'], reverse('voting_api:stats'))
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['user_id'], self.user.id)
+        self.assertEqual(entry['queries'], QUERY_BUDGET['stats'])
+
+    def test_repeated_sql_is_grouped(self):
+        timing = RequestTiming()
+        with connection.execute_wrapper(timing.record_query):
+            for position in Position.objects.all():
+                list(position.candidates.all())
+
+        repeated = timing.repeated_queries()
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0]['count'], 2)
+        self.assertIn('voting_api_candidate', repeated[0]['sql'])
+
+
+# ==================== Prometheus Metrics Tests ====================
+
+def scrape_value(text, series):
+    """Value of one exposition line such as 'name{label="x"}', 0 when absent"""
+    for line in text.splitlines():
+        if line.startswith(series + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+class MetricsTests(TestCase):
+    """/metrics/ exposition and aggregation across worker processes"""
+
+    def setUp(self):
+        cache.clear()
+        catalog.invalidate()
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.metrics_dir.cleanup)
+        overrides = override_settings(METRICS_DIR=self.metrics_dir.name, METRICS_TOKEN='scrape-secret')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = create_voter('0000001')
+        self.positions = create_ballot(positions=2, candidates_per_position=2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def scrape(self):
+        response = APIClient().get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_vote_counters(self):
+        cast = 'voting_votes_cast_total{endpoint="vote",mode="direct"}'
+        rejected = 'voting_vote_rejections_total{endpoint="vote",reason="invalid"}'
+        before = self.scrape()
+        position = self.positions[0]
+        selection = {'position': position.id, 'candidate': position.candidates.first().id}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(reverse('voting_api:cast_vote'), selection, format='json').status_code, 201)
+        incomplete = {'position': position.id}
+        self.assertEqual(self.client.post(reverse('voting_api:cast_vote'), incomplete, format='json').status_code, 400)
+
+        after = self.scrape()
+        self.assertEqual(scrape_value(after, cast) - scrape_value(before, cast), 1)
+        self.assertEqual(scrape_value(after, rejected) - scrape_value(before, rejected), 1)
+
+    def test_latency_histograms_and_cache_ratio(self):
+        count = 'voting_http_request_duration_seconds_count{view="results",method="GET"}'
+        catalog_miss = 'voting_cache_requests_total{cache="catalog",result="miss"}'
+        catalog_hit = 'voting_cache_requests_total{cache="catalog",result="hit"}'
+        before = self.scrape()
+        self.client.get(reverse('voting_api:results'))
+        self.client.get(reverse('voting_api:stats'))
+        self.client.get(reverse('voting_api:positions_list'))
+        self.client.get(reverse('voting_api:positions_list'))
+
+        after = self.scrape()
+        self.assertEqual(scrape_value(after, count) - scrape_value(before, count), 1)
+        self.assertIn('voting_http_request_duration_seconds_bucket{view="stats",method="GET",le="+Inf"}', after)
+        self.assertEqual(scrape_value(after, catalog_miss) - scrape_value(before, catalog_miss), 1)
+        self.assertEqual(scrape_value(after, catalog_hit) - scrape_value(before, catalog_hit), 1)
+
+    def test_other_process_files_are_summed(self):
+        series = 'voting_llm_errors_total{model="test-model"}'
+        with open(os.path.join(self.metrics_dir.name, '99999-abcdef01.json'), 'w') as handle:
+            json.dump({
+                'counters': [['voting_llm_errors_total', ['test-model'], 3]],
+                'histograms': [['voting_llm_request_duration_seconds', ['test-model'], [1] + [0] * 11 + [0.004]]],
+            }, handle)
+        metrics.inc('voting_llm_errors_total', 'test-model', amount=2)
+
+        text = self.scrape()
+        self.assertEqual(scrape_value(text, series), 5)
+        self.assertEqual(scrape_value(text, 'voting_llm_request_duration_seconds_count{model="test-model"}'), 1)
+        self.assertEqual(
+            scrape_value(text, 'voting_llm_request_duration_seconds_bucket{model="test-model",le="0.005"}'), 1
+        )
+
+    def test_exited_processes_are_retired(self):
+        series = 'voting_llm_errors_total{model="test-model"}'
+        process = subprocess.Popen(['true'])
+        process.wait()  # Its pid is now free
+        for suffix in ('abcdef01', 'abcdef02'):
+            with open(os.path.join(self.metrics_dir.name, f'{process.pid}-{suffix}.json'), 'w') as handle:
+                json.dump({'counters': [['voting_llm_errors_total', ['test-model'], 2]], 'histograms': []}, handle)
+
+        self.assertEqual(scrape_value(self.scrape(), series), 4)
+        self.assertEqual(scrape_value(self.scrape(), series), 4)
+        files = os.listdir(self.metrics_dir.name)
+        self.assertIn(metrics.RETIRED_FILE, files)
+        self.assertFalse([name for name in files if name.startswith(f'{process.pid}-')])
+
+    def test_changed_directory_starts_from_zero(self):
+        series = 'voting_llm_errors_total{model="test-model"}'
+        metrics.inc('voting_llm_errors_total', 'test-model', amount=2)
+        self.assertEqual(scrape_value(self.scrape(), series), 2)
+        with tempfile.TemporaryDirectory() as other, override_settings(METRICS_DIR=other):
+            self.assertEqual(scrape_value(self.scrape(), series), 0)
+            metrics.inc('voting_llm_errors_total', 'test-model')
+            self.assertEqual(scrape_value(self.scrape(), series), 1)
+        # The first directory kept its own file, not a second copy of the totals
+        self.assertEqual(scrape_value(self.scrape(), series), 2)
+
+    def test_token_required_when_configured(self):
+        self.assertEqual(APIClient().get('/metrics/').status_code, 401)
+        self.assertEqual(APIClient().get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+
+    def test_closed_without_token_unless_debug(self):
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(APIClient().get('/metrics/').status_code, 403)
+            with override_settings(DEBUG=True):
+                self.assertEqual(APIClient().get('/metrics/').status_code, 200)
+
+    async def test_async_requests_are_recorded(self):
+        count = 'voting_http_request_duration_seconds_count{view="health_check",method="GET"}'
+        before = await sync_to_async(self.scrape)()
+        response = await AsyncClient().get(
+            reverse('voting_api:health_check'), headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(MetricsMiddleware.async_capable)
+
+        after = await sync_to_async(self.scrape)()
+        self.assertEqual(scrape_value(after, count) - scrape_value(before, count), 1)
+
+
+# ==================== Request Profiling Tests ====================
+
+@override_settings(PROFILING_ENABLED=True)
+class RequestProfilingTests(TestCase):
+    """Staff-only cProfile capture of individual requests"""
+
+    def setUp(self):
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profile_dir.cleanup)
+        overrides = override_settings(PROFILING_DIR=self.profile_dir.name, PROFILING_KEEP=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        create_ballot(positions=2, candidates_per_position=2)
+        self.staff = create_voter('0000001')
+        self.staff.is_staff = True
+        self.staff.save()
+        self.voter = create_voter('0000002')
+
+    def get_results(self, user, query='', **headers):
+        client = APIClient()  # Middleware is loaded per client
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}', **headers)
+        return client.get(reverse('voting_api:results') + query)
+
+    def load_stats(self, path):
+        import pstats
+        return {function for (_, _, function) in pstats.Stats(path).stats}
+
+    def test_staff_profile_is_saved(self):
+        response = self.get_results(self.staff, '?profile=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('results', response.json())
+        path = os.path.join(self.profile_dir.name, response['X-Profile-File'])
+        self.assertIn('get', self.load_stats(path))
+
+    def test_header_trigger_and_download(self):
+        response = self.get_results(self.staff, HTTP_X_PROFILE='download')
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertIn('attachment; filename=', response['Content-Disposition'])
+        self.assertEqual(response['X-Profile-Status'], '200')
+        with tempfile.NamedTemporaryFile(suffix='.prof') as handle:
+            handle.write(response.content)
+            handle.flush()
+            self.assertIn('get', self.load_stats(handle.name))
+        self.assertEqual(os.listdir(self.profile_dir.name), [])
+
+    async def test_async_requests_are_profiled(self):
+        self.assertTrue(ProfilingMiddleware.async_capable)
+
+        async def get_results(user):
+            return await AsyncClient().get(
+                reverse('voting_api:results') + '?profile=1', headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+            )
+
+        response = await get_results(self.staff)
+        self.assertEqual(response.status_code, 200)
+        # The sync view ran on the profiled thread
+        self.assertIn('get', self.load_stats(os.path.join(self.profile_dir.name, response['X-Profile-File'])))
+        response = await get_results(self.voter)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-File', response)
+
+    def test_non_staff_requests_are_not_profiled(self):
+        response = self.get_results(self.voter, '?profile=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(os.listdir(self.profile_dir.name), [])
+
+    def test_retention_keeps_newest(self):
+        saved = [self.get_results(self.staff, '?profile=1')['X-Profile-File'] for _ in range(2)]
+        self.assertEqual(sorted(os.listdir(self.profile_dir.name)), sorted(saved))
+        save_profile(b'', '99991231-235959-000000000-GET-later-1ms.prof')
+        self.assertEqual(
+            sorted(os.listdir(self.profile_dir.name)),
+            sorted([saved[1], '99991231-235959-000000000-GET-later-1ms.prof'])
+        )
+
+
+# ==================== AI Analysis Cache Tests ====================
+
+class FakeGroq:
+    """
+    Stands in for the Groq client: records prompts and answers with a counter
+    after `latency` seconds
+    """
+
+    def __init__(self, fail=False, latency=0.0):
+        self.prompts = []
+        self.fail = fail
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **options):
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError('rate limited')
+        with self.lock:
+            self.prompts.append(messages[-1]['content'])
+        text = f'Analysis {len(self.prompts)} by {model}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+@override_settings(AI_JOBS_ENABLED=False)
+class AIAnalysisCacheTests(TestCase):
+    """Generated analyses are reused until their inputs, model or prompt change"""
+
+    def setUp(self):
+        cache.clear()
+        llm_cache.clear()
+        self.addCleanup(reset_llm_cache)
+        self.user = create_voter('0000001')
+        self.voter = create_voter('0000002')
+        self.positions = create_ballot(positions=2, candidates_per_position=2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.groq = FakeGroq()
+        patcher = mock.patch('voting_api.ai_analysis.get_groq_client', return_value=self.groq)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def summary(self):
+        response = self.client.get(reverse('voting_api:ai_summary'))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def vote(self):
+        position = self.positions[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=self.voter, position=position, candidate=position.candidates.first())
+
+    def test_repeat_requests_are_served_from_cache(self):
+        first = self.summary()
+        self.assertFalse(first['cached'])
+        self.assertRegex(first['summary'], r'\n\nPosition 0: Analysis [12] by llama-3.3-70b-versatile\n\n')
+
+        with CaptureQueriesContext(connection) as context:
+            second = self.summary()
+        self.assertTrue(second['cached'])
+        self.assertGreaterEqual(second['cache_age_seconds'], 0)
+        self.assertEqual(second['summary'], first['summary'])
+        self.assertEqual(len(self.groq.prompts), 2)  # One per position
+        self.assertEqual(len(context), 1)  # Election-state version only
+
+    def test_new_votes_model_or_prompt_version_miss(self):
+        self.summary()
+        self.vote()
+        self.assertFalse(self.summary()['cached'])
+        self.assertEqual(len(self.groq.prompts), 3)  # Only the race that changed
+        with override_settings(GROQ_MODEL='other-model'):
+            self.assertIn('by other-model', self.summary()['summary'])
+        from .ai_analysis import PROMPT_VERSION
+        with mock.patch('voting_api.ai_analysis.PROMPT_VERSION', PROMPT_VERSION + 1):
+            self.assertFalse(self.summary()['cached'])
+        self.assertEqual(len(self.groq.prompts), 7)
+
+    def test_analyses_are_cached_per_endpoint(self):
+        self.summary()
+        prediction = self.client.get(reverse('voting_api:ai_prediction')).json()
+        turnout = self.client.get(reverse('voting_api:ai_turnout')).json()
+        self.assertFalse(prediction['cached'])
+        self.assertFalse(turnout['cached'])
+        self.assertTrue(self.client.get(reverse('voting_api:ai_turnout')).json()['cached'])
+        self.assertEqual(len(self.groq.prompts), 5)  # Two positions each for summary and prediction
+
+    def test_failures_are_not_cached(self):
+        self.groq.fail = True
+        self.assertEqual(self.summary()['summary'], 'AI analysis error: rate limited')
+        self.groq.fail = False
+        result = self.summary()
+        self.assertFalse(result['cached'])
+        self.assertIn('Position 1: Analysis', result['summary'])
+
+    @override_settings(AI_CACHE_TTL_SECONDS=0)
+    def test_expired_entries_are_regenerated(self):
+        self.summary()
+        self.assertFalse(self.summary()['cached'])
+        self.assertEqual(len(self.groq.prompts), 4)
+
+    @override_settings(AI_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        for key in ('a', 'b'):
+            llm_cache.analyses.set(key, key)
+        llm_cache.analyses.get('a')
+        llm_cache.analyses.set('c', 'c')
+        self.assertIsNone(llm_cache.analyses.get('b'))
+        self.assertEqual(llm_cache.analyses.get('a')[0], 'a')
+        self.assertEqual(len(llm_cache.analyses), 2)
+
+
+# ==================== Background AI Job Tests ====================
+
+class AIJobTests(TransactionTestCase):
+    """Uncached analyses are generated off the request thread and polled"""
+
+    def setUp(self):
+        cache.clear()
+        llm_cache.clear()
+        self.addCleanup(reset_llm_cache)
+        self.user = create_voter('0000001')
+        create_ballot(positions=2, candidates_per_position=2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.groq = FakeGroq(latency=0.3)
+        patcher = mock.patch('voting_api.ai_analysis.get_groq_client', return_value=self.groq)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait_for(self, status_url, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.client.get(status_url).json()
+            if job['status'] in (AIJob.SUCCEEDED, AIJob.FAILED):
+                return job
+            time.sleep(0.05)
+        self.fail(f'AI job did not finish: {job}')
+
+    def test_accepted_then_polled_then_cached(self):
+        started = time.perf_counter()
+        response = self.client.get(reverse('voting_api:ai_summary'))
+        self.assertLess(time.perf_counter() - started, self.groq.latency)
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        self.assertEqual(response['Location'], body['status_url'])
+        self.assertIn(body['status'], (AIJob.PENDING, AIJob.RUNNING))
+
+        job = self.wait_for(body['status_url'])
+        self.assertEqual(job['status'], AIJob.SUCCEEDED)
+        self.assertIn('Position 0: Analysis', job['result']['summary'])
+        self.assertFalse(job['result']['cached'])
+
+        response = self.client.get(reverse('voting_api:ai_summary'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['cached'])
+        self.assertEqual(len(self.groq.prompts), 2)
+
+    def test_identical_requests_share_one_job(self):
+        first = self.client.get(reverse('voting_api:ai_prediction')).json()
+        second = self.client.get(reverse('voting_api:ai_prediction')).json()
+        other = self.client.get(reverse('voting_api:ai_turnout')).json()
+        self.assertEqual(first['job_id'], second['job_id'])
+        self.assertNotEqual(first['job_id'], other['job_id'])
+
+        self.wait_for(first['status_url'])
+        self.wait_for(other['status_url'])
+        self.assertEqual(len(self.groq.prompts), 3)
+        self.assertEqual(AIJob.objects.filter(active_key__isnull=False).count(), 0)
+
+    def test_failed_job_reports_error(self):
+        failing = mock.Mock(side_effect=[None, RuntimeError('boom')])  # Cache check, then the job
+        with mock.patch.dict(ai_jobs.GENERATORS, {'summary': failing}), self.assertLogs('voting_api.ai_jobs', 'ERROR'):
+            body = self.client.get(reverse('voting_api:ai_summary')).json()
+            job = self.wait_for(body['status_url'])
+        self.assertEqual(job['status'], AIJob.FAILED)
+        self.assertEqual(job['error'], 'boom')
+
+    def test_lost_jobs_are_replaced(self):
+        key = ai_jobs.request_key('summary')
+        lost = AIJob.objects.create(kind='summary', request_key=key, active_key=key)
+        AIJob.objects.filter(pk=lost.pk).update(created_at=lost.created_at - timedelta(hours=1))
+
+        body = self.client.get(reverse('voting_api:ai_summary')).json()
+        self.assertNotEqual(body['job_id'], str(lost.pk))
+        self.assertEqual(AIJob.objects.get(pk=lost.pk).status, AIJob.FAILED)
+        self.wait_for(body['status_url'])
+
+    def test_queue_race_with_a_job_that_already_finished(self):
+        create = AIJob.objects.create
+        calls = []
+
+        def competing_create(**kwargs):
+            # Other workers held the key at insert time and finished before each re-check
+            calls.append(kwargs)
+            if len(calls) <= 2:
+                raise IntegrityError('UNIQUE constraint failed: voting_api_aijob.active_key')
+            return create(**kwargs)
+
+        with mock.patch.object(AIJob.objects, 'create', side_effect=competing_create):
+            response = self.client.get(reverse('voting_api:ai_summary'))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(calls), 3)
+        self.wait_for(response.json()['status_url'])
+
+    def test_result_of_another_workers_job_is_reused(self):
+        body = self.client.get(reverse('voting_api:ai_summary')).json()
+        result = self.wait_for(body['status_url'])['result']
+        llm_cache.clear()  # This worker never saw the analysis
+
+        response = self.client.get(reverse('voting_api:ai_summary'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), result)
+        self.assertEqual(len(self.groq.prompts), 2)
+        self.assertEqual(AIJob.objects.count(), 1)
+
+        # A new election state needs a new analysis
+        create_voter('0000002')
+        response = self.client.get(reverse('voting_api:ai_summary'))
+        self.assertEqual(response.status_code, 202)
+        self.wait_for(response.json()['status_url'])
+
+    @override_settings(AI_JOB_RETENTION_SECONDS=60)
+    def test_finished_jobs_expire(self):
+        now = timezone.now()
+        old = AIJob.objects.create(
+            kind='summary', request_key='old', status=AIJob.SUCCEEDED, finished_at=now - timedelta(minutes=5)
+        )
+        recent = AIJob.objects.create(kind='summary', request_key='recent', status=AIJob.FAILED, finished_at=now)
+
+        body = self.client.get(reverse('voting_api:ai_summary')).json()
+        self.assertFalse(AIJob.objects.filter(pk=old.pk).exists())
+        self.assertTrue(AIJob.objects.filter(pk=recent.pk).exists())
+        self.wait_for(body['status_url'])
+
+    def test_unknown_job(self):
+        import uuid
+        response = self.client.get(reverse('voting_api:ai_job', kwargs={'job_id': uuid.uuid4()}))
+        self.assertEqual(response.status_code, 404)
+
+
+# ==================== Combined AI Insights Tests ====================
+
+class SelectiveGroq(FakeGroq):
+    """FakeGroq whose latency and failures depend on which analysis is asked for"""
+
+    def __init__(self, latencies=None, failing=()):
+        super().__init__()
+        self.latencies = latencies or {}
+        self.failing = failing
+
+    def create(self, model, messages, **options):
+        prompt = messages[-1]['content']
+        kind = 'turnout' if prompt.startswith('Analyze voter turnout') else (
+            'prediction' if 'winner likelihood' in prompt else 'summary'
+        )
+        time.sleep(self.latencies.get(kind, 0.0))
+        if kind in self.failing:
+            raise RuntimeError(f'{kind} rate limited')
+        with self.lock:
+            self.prompts.append(prompt)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f'{kind} analysis'))])
+
+
+@override_settings(AI_JOBS_ENABLED=False)
+class AIInsightsTests(TestCase):
+    """One snapshot, three concurrent model calls, partial results"""
+
+    def setUp(self):
+        cache.clear()
+        llm_cache.clear()
+        self.addCleanup(reset_llm_cache)
+        self.user = create_voter('0000001')
+        create_ballot(positions=2, candidates_per_position=2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def insights(self, groq):
+        with mock.patch('voting_api.ai_analysis.get_groq_client', return_value=groq):
+            response = self.client.get(reverse('voting_api:ai_insights'))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_calls_run_concurrently(self):
+        groq = SelectiveGroq(latencies={'summary': 0.3, 'prediction': 0.3, 'turnout': 0.3})
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as context:
+            result = self.insights(groq)
+        self.assertLess(time.perf_counter() - started, 0.6)
+        self.assertEqual(len(context), QUERY_BUDGET['ai_insights'] - 1)  # Forced auth skips the JWT lookup
+        self.assertEqual(result['errors'], {})
+        self.assertTrue(result['summary']['summary'].endswith('Position 0: summary analysis\n\nPosition 1: summary analysis'))
+        self.assertEqual(result['prediction']['prediction'], 'Position 0: prediction analysis\n\nPosition 1: prediction analysis')
+        self.assertEqual(result['turnout']['turnout_analysis'], 'turnout analysis')
+        self.assertNotIn('data', result['summary'])
+        self.assertEqual(result['data']['overall_stats']['total_registered'], 1)
+        self.assertFalse(result['cached'])
+
+    def test_failed_call_returns_partial_results(self):
+        result = self.insights(SelectiveGroq(failing=('prediction',)))
+        self.assertIsNone(result['prediction'])
+        self.assertEqual(result['errors'], {'prediction': 'AI analysis error: prediction rate limited'})
+        self.assertIn('Position 1: summary analysis', result['summary']['summary'])
+        self.assertEqual(result['turnout']['turnout_analysis'], 'turnout analysis')
+
+    @override_settings(AI_INSIGHTS_TIMEOUT_SECONDS=0.1)
+    def test_slow_call_times_out(self):
+        started = time.perf_counter()
+        result = self.insights(SelectiveGroq(latencies={'turnout': 0.5}))
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertIsNone(result['turnout'])
+        self.assertEqual(result['errors'], {'turnout': 'Timed out after 0.1s'})
+        self.assertIn('Position 1: summary analysis', result['summary']['summary'])
+
+    def test_sections_share_the_analysis_cache(self):
+        groq = SelectiveGroq()
+        self.insights(groq)
+        self.assertTrue(self.insights(groq)['cached'])
+        with mock.patch('voting_api.ai_analysis.get_groq_client', return_value=groq):
+            self.assertTrue(self.client.get(reverse('voting_api:ai_prediction')).json()['cached'])
+        self.assertEqual(len(groq.prompts), 5)
+
+
+# ==================== Groq Client Tests ====================
+
+class FakeGroqServer:
+    """
+    Local HTTP server speaking the chat completions API
+    `script` holds (status, delay seconds) per request; once it runs out
+    every request succeeds immediately
+    """
+
+    def __init__(self):
+        self.script = []
+        self.requests = []
+        self.client_ports = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                server.requests.append((self.path, self.headers['Authorization'], payload))
+                server.client_ports.add(self.client_address[1])
+                status, delay = server.script.pop(0) if server.script else (200, 0)
+                time.sleep(delay)
+                if status == 200 and payload.get('stream'):
+                    self.send_stream(len(server.requests))
+                    return
+                if status == 200:
+                    body = {'choices': [{'message': {'role': 'assistant', 'content': f' Reply {len(server.requests)} '}}]}
+                else:
+                    body = {'error': {'message': f'status {status}'}}
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up (read timeout)
+
+            def send_stream(self, number):
+                """A streamed completion as chunked server-sent events"""
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                deltas = [{'role': 'assistant'}, {'content': 'Reply'}, {'content': f' {number}'}]
+                for data in [json.dumps({'choices': [{'delta': delta}]}) for delta in deltas] + ['[DONE]']:
+                    event = f'data: {data}\n\n'.encode()
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(event), event))
+                self.wfile.write(b'0\r\n\r\n')
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class GroqClientTests(SimpleTestCase):
+    """The SDK client's timeouts and retries, and the circuit breaker, against a local server"""
+
+    def setUp(self):
+        self.server = FakeGroqServer()
+        self.addCleanup(self.server.stop)
+
+    def make_client(self, **options):
+        options = {
+            'connect_timeout': 1.0, 'read_timeout': 2.0, 'max_retries': 0,
+            'breaker_threshold': 5, 'breaker_reset_seconds': 30.0, **options
+        }
+        client = build_client('test-key', self.server.base_url, **options)
+        self.addCleanup(client.close)
+        return client
+
+    def complete(self, client):
+        response = client.chat.completions.create(
+            model='test-model', messages=[{'role': 'user', 'content': 'Hi'}], max_tokens=5
+        )
+        return response.choices[0].message.content
+
+    def test_connections_are_reused(self):
+        client = self.make_client()
+        self.assertEqual([self.complete(client) for _ in range(3)], [' Reply 1 ', ' Reply 2 ', ' Reply 3 '])
+        self.assertEqual(len(self.server.client_ports), 1)
+        path, authorization, payload = self.server.requests[0]
+        self.assertEqual(path, '/openai/v1/chat/completions')
+        self.assertEqual(authorization, 'Bearer test-key')
+        self.assertEqual(payload['model'], 'test-model')
+        self.assertEqual(payload['max_tokens'], 5)
+
+    def test_streamed_completion(self):
+        client = self.make_client()
+        chunks = client.chat.completions.create(
+            model='test-model', messages=[{'role': 'user', 'content': 'Hi'}], stream=True
+        )
+        self.assertEqual([chunk.choices[0].delta.content for chunk in chunks], [None, 'Reply', ' 1'])
+        self.assertIs(self.server.requests[0][2]['stream'], True)
+        self.assertEqual(self.complete(client), ' Reply 2 ')
+
+    def test_read_timeout(self):
+        self.server.script = [(200, 0.5)]
+        client = self.make_client(read_timeout=0.1)
+        started = time.perf_counter()
+        with self.assertRaises(groq.APITimeoutError):
+            self.complete(client)
+        self.assertLess(time.perf_counter() - started, 0.4)
+
+    def test_transient_errors_are_retried(self):
+        self.server.script = [(503, 0), (429, 0)]
+        client = self.make_client(max_retries=2)
+        self.assertEqual(self.complete(client), ' Reply 3 ')
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.script = [(400, 0)]
+        client = self.make_client(max_retries=2)
+        with self.assertRaises(groq.BadRequestError) as raised:
+            self.complete(client)
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_circuit_breaker(self):
+        self.server.script = [(503, 0), (503, 0)]
+        client = self.make_client(breaker_threshold=2, breaker_reset_seconds=0.2)
+        for _ in range(2):
+            with self.assertRaises(groq.InternalServerError):
+                self.complete(client)
+        self.assertEqual(client.breaker.state, 'open')
+        with self.assertRaises(CircuitOpen):
+            self.complete(client)
+        self.assertEqual(len(self.server.requests), 2)  # Failed fast without calling the server
+
+        time.sleep(0.25)
+        self.assertEqual(client.breaker.state, 'half-open')
+        self.assertEqual(self.complete(client), ' Reply 3 ')
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_unexpected_error_ends_the_trial(self):
+        self.server.script = [(503, 0)]
+        client = self.make_client(breaker_threshold=1, breaker_reset_seconds=0.05)
+        with self.assertRaises(groq.InternalServerError):
+            self.complete(client)
+        time.sleep(0.1)
+        with mock.patch.object(client.client.chat.completions, 'create', side_effect=ValueError('bad payload')):
+            with self.assertRaises(ValueError):
+                self.complete(client)
+        self.assertFalse(client.breaker.trial_running)
+        self.assertEqual(self.complete(client), ' Reply 2 ')  # Not locked out by the broken trial
+
+    def test_process_wide_client(self):
+        with override_settings(GROQ_API_KEY='test-key', GROQ_BASE_URL=self.server.base_url):
+            self.assertIs(get_client(), get_client())
+            self.assertEqual(get_client().client.max_retries, settings.GROQ_MAX_RETRIES)
+        with override_settings(GROQ_API_KEY=''):
+            self.assertIsNone(get_client())
+
+
+@override_settings(AI_JOBS_ENABLED=False, GROQ_API_KEY='test-key', GROQ_MAX_RETRIES=0)
+class GroqFallbackTests(TestCase):
+    """The last good analysis is served while Groq is failing"""
+
+    def setUp(self):
+        cache.clear()
+        llm_cache.clear()
+        self.addCleanup(reset_llm_cache)
+        self.server = FakeGroqServer()
+        self.addCleanup(self.server.stop)
+        overrides = override_settings(GROQ_BASE_URL=self.server.base_url)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = create_voter('0000001')
+        self.positions = create_ballot(positions=1, candidates_per_position=2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_stale_analysis_while_provider_is_down(self):
+        first = self.client.get(reverse('voting_api:ai_summary')).json()
+        self.assertTrue(first['summary'].endswith('Position 0: Reply 1'))
+        self.assertFalse(first['stale'])
+
+        position = self.positions[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=self.user, position=position, candidate=position.candidates.first())
+        self.server.script = [(503, 0)]
+        fallback = self.client.get(reverse('voting_api:ai_summary')).json()
+        self.assertEqual(fallback['summary'], first['summary'])
+        self.assertTrue(fallback['stale'])
+        self.assertTrue(fallback['cached'])
+
+        self.assertTrue(self.client.get(reverse('voting_api:ai_summary')).json()['summary'].endswith('Position 0: Reply 3'))
+
+
+# ==================== Race Analytics Tests ====================
+
+def race(name, *votes):
+    """compute_position_results()-shaped entry"""
+    return {
+        'position_id': len(name), 'position_name': name, 'total_votes': sum(votes),
+        'candidates': [
+            {'id': index, 'name': f'{name} {index}', 'vote_count': count} for index, count in enumerate(votes)
+        ]
+    }
+
+
+class RaceAnalyticsTests(TestCase):
+    """Vectorized margins, intervals and competitiveness"""
+
+    def test_shares_intervals_and_margins(self):
+        result = analyze_races([race('Even', 50, 50), race('Clear', 550, 450)])
+        even, clear = result['positions']
+        self.assertEqual(even['candidates'][0]['share'], 50.0)
+        self.assertEqual(even['candidates'][0]['interval'], [40.38, 59.62])  # Wilson, 95%
+        self.assertEqual(even['margin_votes'], 0)
+        self.assertFalse(even['lead_is_significant'])
+        self.assertEqual(clear['leader'], 'Clear 0')
+        self.assertEqual(clear['runner_up'], 'Clear 1')
+        self.assertEqual(clear['margin_points'], 10.0)
+        self.assertEqual(clear['margin_interval'], [3.82, 16.14])
+        self.assertTrue(clear['lead_is_significant'])
+        self.assertEqual(result['most_competitive'], 'Even')
+
+    def test_competitiveness_classes(self):
+        races = [
+            race('Tied', 51, 49), race('Close', 550, 450), race('Rout', 70, 30),
+            race('Alone', 12), race('Empty', 0, 0), race('Small lead', 7, 3),
+        ]
+        classes = {entry['position_name']: entry['competitiveness'] for entry in analyze_races(races)['positions']}
+        self.assertEqual(classes, {
+            'Tied': 'very_close', 'Close': 'competitive', 'Rout': 'landslide',
+            'Alone': 'uncontested', 'Empty': 'no_votes', 'Small lead': 'very_close',
+        })
+
+    def test_wider_intervals_at_higher_confidence(self):
+        low = analyze_races([race('Seat', 60, 40)], confidence=0.9)['positions'][0]['candidates'][0]['interval']
+        high = analyze_races([race('Seat', 60, 40)], confidence=0.99)['positions'][0]['candidates'][0]['interval']
+        self.assertLess(high[0], low[0])
+        self.assertGreater(high[1], low[1])
+
+    def test_endpoint(self):
+        user = create_voter('0000001')
+        position = create_ballot(positions=1, candidates_per_position=2)[0]
+        first = position.candidates.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=user, position=position, candidate=first)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.get(reverse('voting_api:race_analytics'))
+        self.assertEqual(response.status_code, 200)
+        entry = response.json()['positions'][0]
+        self.assertEqual(entry['leader'], first.name)
+        self.assertEqual(entry['competitiveness'], 'very_close')
+        self.assertEqual(
+            client.get(reverse('voting_api:race_analytics'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+        self.assertEqual(client.get(reverse('voting_api:race_analytics') + '?confidence=0.9').json()['confidence'], 0.9)
+        self.assertEqual(client.get(reverse('voting_api:race_analytics') + '?confidence=2').status_code, 400)
+
+    def test_prompts_carry_precomputed_facts(self):
+        user = create_voter('0000001')
+        position = create_ballot(positions=1, candidates_per_position=2)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=user, position=position, candidate=position.candidates.first())
+
+        prompt = generate_prediction_prompt(prepare_voting_data_for_ai()).prompts[0]
+        self.assertIn('Position 0 (1 votes) - very close', prompt)
+        self.assertIn('95% CI', prompt)
+        self.assertIn('not statistically clear', prompt)
+
+
+# ==================== Win-Probability Forecast Tests ====================
+
+class ForecastTests(TestCase):
+    """Monte Carlo win probabilities over the votes still outstanding"""
+
+    def setUp(self):
+        llm_cache.clear()
+        self.addCleanup(reset_llm_cache)
+
+    def test_win_probabilities_and_expected_shares(self):
+        forecast = simulate_races([race('Clear', 300, 40), race('Open', 5, 4, 0)], registered=400, simulations=20000)
+        clear, open_race = forecast['positions']
+        self.assertEqual(forecast['simulations'], 20000)
+        self.assertEqual(clear['remaining_voters'], 60)
+        self.assertEqual(clear['favourite'], 'Clear 0')
+        self.assertEqual(clear['candidates'][0]['win_probability'], 100.0)
+        # Nine votes in with 391 to come: anyone can still win
+        probabilities = [candidate['win_probability'] for candidate in open_race['candidates']]
+        self.assertAlmostEqual(sum(probabilities), 100.0, delta=0.05)
+        self.assertGreater(probabilities[0], probabilities[1])
+        self.assertGreater(probabilities[2], 0)
+        self.assertAlmostEqual(sum(candidate['expected_share'] for candidate in open_race['candidates']), 100.0, delta=0.05)
+        self.assertGreater(open_race['expected_total_votes'], 9)
+
+    def test_settled_races_are_exact(self):
+        forecast = simulate_races([race('Done', 3, 1), race('Tied', 2, 2), race('Alone', 4)], registered=4)
+        done, tied, alone = forecast['positions']
+        self.assertEqual(forecast['simulations'], 0)
+        self.assertEqual([c['win_probability'] for c in done['candidates']], [100.0, 0.0])
+        self.assertEqual([c['expected_share'] for c in done['candidates']], [75.0, 25.0])
+        self.assertEqual([c['win_probability'] for c in tied['candidates']], [50.0, 50.0])
+        self.assertEqual(alone['candidates'][0]['win_probability'], 100.0)
+
+    def test_same_tallies_give_same_forecast(self):
+        races = [race('Seat', 12, 10, 9)]
+        self.assertEqual(simulate_races(races, 100, 5000), simulate_races(races, 100, 5000))
+
+    def test_races_do_not_move_each_other(self):
+        before = simulate_races([race('Seat', 12, 10, 9), race('Other', 5, 4)], 100, 5000)
+        after = simulate_races([race('Seat', 12, 10, 9), race('Other', 6, 4)], 100, 5000)
+        self.assertEqual(before['positions'][0], after['positions'][0])
+        self.assertNotEqual(before['positions'][1], after['positions'][1])
+
+    def test_only_changed_races_are_simulated_again(self):
+        races = [race(f'Seat {index}', 5, 4, 3) for index in range(5)]
+        first = simulate_races(races, 100, 5000)
+        races[2] = race('Seat 2', 6, 4, 3)
+        with mock.patch('voting_api.forecast.run_simulations', wraps=run_simulations) as run:
+            second = simulate_races(races, 100, 5000)
+            self.assertEqual(run.call_count, 1)  # One vectorized pass, over the changed race alone
+            self.assertEqual(len(run.call_args.args[0]), 1)
+            self.assertEqual(simulate_races(races, 100, 5000), second)
+            self.assertEqual(run.call_count, 1)
+        self.assertEqual(
+            [position for index, position in enumerate(first['positions']) if index != 2],
+            [position for index, position in enumerate(second['positions']) if index != 2],
+        )
+
+    def test_large_ballots_run_fewer_simulations(self):
+        races = [race(f'Seat {index}', 5, 4, 3, 2) for index in range(10)]
+        forecast = simulate_races(races, 100, 100000, max_cells=400000)
+        self.assertEqual(forecast['simulations'], 10000)
+        self.assertEqual(forecast['simulations_requested'], 100000)
+
+    @override_settings(FORECAST_SIMULATIONS=2000, FORECAST_REFRESH_SECONDS=60)
+    def test_votes_within_the_refresh_interval_reuse_the_forecast(self):
+        user = create_voter('0000001')
+        position = create_ballot(positions=1, candidates_per_position=2)[0]
+        first = get_forecast()
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=user, position=position, candidate=position.candidates.first())
+        self.assertIs(get_forecast(), first)
+
+        with override_settings(FORECAST_REFRESH_SECONDS=0):
+            self.assertEqual(get_forecast()['positions'][0]['total_votes'], 1)
+
+    @override_settings(FORECAST_SIMULATIONS=2000, FORECAST_REFRESH_SECONDS=60)
+    def test_a_reused_forecast_keeps_its_own_etag_and_tallies(self):
+        user = create_voter('0000001')
+        create_voter('0000002')
+        position = create_ballot(positions=1, candidates_per_position=2)[0]
+        client = APIClient()
+        client.force_authenticate(user=user)
+        etag = client.get(reverse('voting_api:win_forecast'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=user, position=position, candidate=position.candidates.first())
+
+        self.assertNotEqual(f'"election-{get_results_version()}"', etag)
+        self.assertEqual(client.get(reverse('voting_api:win_forecast'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # The prediction describes the votes the reused forecast was computed from
+        groq = FakeGroq()
+        with mock.patch('voting_api.ai_analysis.get_groq_client', return_value=groq):
+            prediction = generate_winner_prediction()
+        self.assertIn('Position 0 (0 votes)', groq.prompts[0])
+        self.assertEqual(prediction['data']['positions'][0]['total_votes'], 0)
+
+        with override_settings(FORECAST_REFRESH_SECONDS=0):
+            response = client.get(reverse('voting_api:win_forecast'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"election-{get_results_version()}"')
+
+    @override_settings(FORECAST_SIMULATIONS=2000)
+    def test_endpoint_and_prediction_payload(self):
+        user = create_voter('0000001')
+        create_voter('0000002')
+        position = create_ballot(positions=1, candidates_per_position=2)[0]
+        first = position.candidates.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=user, position=position, candidate=first)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.get(reverse('voting_api:win_forecast'))
+        self.assertEqual(response.status_code, 200)
+        entry = response.json()['positions'][0]
+        self.assertEqual(entry['remaining_voters'], 1)
+        self.assertEqual(entry['favourite'], first.name)
+        self.assertEqual(
+            client.get(reverse('voting_api:win_forecast'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+
+        groq = FakeGroq()
+        with mock.patch('voting_api.ai_analysis.get_groq_client', return_value=groq), \
+                override_settings(AI_JOBS_ENABLED=False):
+            prediction = client.get(reverse('voting_api:ai_prediction')).json()
+        self.assertEqual(prediction['forecast'], response.json())
+        self.assertIn(f"{first.name} {entry['candidates'][0]['win_probability']}% to win", groq.prompts[0])
+        self.assertIn('2,000 simulations, 1 registered users yet to vote', groq.prompts[0])
+
+
+# ==================== Prompt Budget Tests ====================
+
+class PromptBudgetTests(TestCase):
+    """Per-race prompts stay within AI_PROMPT_TOKEN_BUDGET by folding the long tail"""
+
+    def setUp(self):
+        llm_cache.clear()
+        self.addCleanup(reset_llm_cache)
+        create_voter('0000001')
+        create_ballot(positions=2, candidates_per_position=8)
+
+    def test_helpers(self):
+        self.assertEqual(estimate_tokens('x' * 35), 10)
+        position = {'position': 'Seat', 'candidates': [
+            {'name': name, 'votes': votes, 'percentage': votes * 10.0} for name, votes in zip('abcd', (4, 3, 2, 1))
+        ]}
+        folded = fold_candidates(position, 2)
+        self.assertEqual([candidate['name'] for candidate in folded['candidates']], ['a', 'b'])
+        self.assertEqual(folded['folded'], {'count': 2, 'votes': 3, 'percentage': 30.0})
+        self.assertIsNone(fold_candidates(position, 4)['folded'])
+
+    def test_small_race_lists_every_candidate(self):
+        prompt = generate_voting_summary_prompt(prepare_voting_data_for_ai()).prompts[0]
+        self.assertLessEqual(estimate_tokens(prompt), 3000)
+        self.assertIn('8. Candidate', prompt)
+
+    @override_settings(AI_PROMPT_TOP_CANDIDATES=2, FORECAST_SIMULATIONS=1000)
+    def test_long_tail_is_folded_to_fit(self):
+        voting_data = prepare_voting_data_for_ai()
+        for budget, generate in ((200, generate_voting_summary_prompt), (320, generate_prediction_prompt)):
+            with override_settings(AI_PROMPT_TOKEN_BUDGET=budget):
+                prompts = generate(voting_data).prompts
+            for prompt in prompts:
+                self.assertLessEqual(estimate_tokens(prompt), budget)
+                self.assertNotIn('3. Candidate', prompt)
+                self.assertIn('+6 more candidates: 0 votes (0.0%) combined', prompt)
+        self.assertIn('6 others', prompts[0])
+
+    @override_settings(AI_MAX_FRAGMENTS=4, AI_PROMPT_TOKEN_BUDGET=1000, FORECAST_SIMULATIONS=1000)
+    def test_groups_are_split_until_they_fit(self):
+        create_ballot(positions=58, candidates_per_position=8, start_order=2)
+        voting_data = prepare_voting_data_for_ai()
+        for generate in (generate_voting_summary_prompt, generate_prediction_prompt):
+            plan = generate(voting_data)
+            self.assertGreater(len(plan.prompts), 4)
+            for prompt in plan.prompts:
+                self.assertLessEqual(estimate_tokens(prompt), 1000)
+            # Still every race, in ballot order
+            self.assertEqual(plan.titles[0].split(' to ')[0], 'Position 0')
+            self.assertEqual(plan.titles[-1].split(' to ')[-1], 'Position 59')
+            for title, prompt in zip(plan.titles, plan.prompts):
+                self.assertIn(f"\n{title.split(' to ')[-1]} (", prompt)
+
+
+# ==================== Incremental AI Analysis Tests ====================
+
+@override_settings(AI_JOBS_ENABLED=False, AI_MAX_FRAGMENTS=30, FORECAST_SIMULATIONS=1000, FORECAST_REFRESH_SECONDS=0)
+class IncrementalAnalysisTests(TestCase):
+    """Summary and prediction are stitched from per-race answers; a refresh asks only about changed races"""
+
+    def setUp(self):
+        cache.clear()
+        llm_cache.clear()
+        self.addCleanup(reset_llm_cache)
+        self.voter = create_voter('0000001')
+        create_voter('0000002')
+        self.positions = create_ballot(positions=30, candidates_per_position=2)
+        self.groq = FakeGroq(latency=0.05)
+        patcher = mock.patch('voting_api.ai_analysis.get_groq_client', return_value=self.groq)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def vote(self, position):
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=self.voter, position=position, candidate=position.candidates.first())
+
+    def calls(self, generate):
+        before = len(self.groq.prompts)
+        result = generate()
+        return len(self.groq.prompts) - before, result
+
+    def test_only_changed_races_are_asked_again(self):
+        plan = generate_prediction_prompt(prepare_voting_data_for_ai())
+        self.assertIsInstance(plan, FragmentedPrompt)
+        self.assertEqual(len(plan.prompts), 30)
+
+        with override_settings(AI_FRAGMENT_WORKERS=10):
+            started = time.perf_counter()
+            calls, first = self.calls(generate_winner_prediction)
+        self.assertEqual(calls, 30)
+        self.assertLess(time.perf_counter() - started, 30 * self.groq.latency)  # Asked concurrently
+        self.assertEqual(first['prediction'].count('\n\nPosition '), 29)
+        self.assertEqual(self.calls(generate_voting_summary)[0], 30)
+        self.assertEqual(self.calls(generate_winner_prediction)[0], 0)
+
+        self.vote(self.positions[7])
+        calls, second = self.calls(generate_winner_prediction)
+        self.assertEqual(calls, 1)
+        self.assertFalse(second['cached'])
+        changed = f'Position 7: Analysis {len(self.groq.prompts)} by'
+        self.assertIn(changed, second['prediction'])
+        self.assertNotIn(changed, first['prediction'])
+        unchanged = [section for section in first['prediction'].split('\n\n') if not section.startswith('Position 7:')]
+        self.assertTrue(all(section in second['prediction'] for section in unchanged))
+        self.assertEqual(self.calls(generate_voting_summary)[0], 1)
+
+    def test_answered_races_are_kept_when_another_fails(self):
+        create = self.groq.create
+
+        def flaky(model, messages, **options):
+            if '\nPosition 3 (' in messages[-1]['content']:
+                raise RuntimeError('rate limited')
+            return create(model, messages, **options)
+
+        with mock.patch.object(self.groq.chat.completions, 'create', flaky):
+            self.assertEqual(generate_voting_summary()['summary'], 'AI analysis error: rate limited')
+        self.assertEqual(len(self.groq.prompts), 29)
+        self.assertEqual(self.calls(generate_voting_summary)[0], 1)
+
+    @override_settings(AI_MAX_FRAGMENTS=8)
+    def test_long_ballots_are_asked_in_groups(self):
+        plan = generate_voting_summary_prompt(prepare_voting_data_for_ai())
+        self.assertEqual(len(plan.prompts), 8)
+        self.assertEqual(plan.titles[0], 'Position 0 to Position 3')
+        self.assertEqual(plan.titles[-1], 'Position 28 to Position 29')
+        self.assertIn('\nPosition 3 (', plan.prompts[0])
+        self.assertIn('Position 29: ', plan.templates[-1])
+
+        calls, summary = self.calls(generate_voting_summary)
+        self.assertEqual(calls, 8)
+        self.assertIn('Position 4 to Position 7: Analysis', summary['summary'])
+        self.vote(self.positions[5])
+        self.assertEqual(self.calls(generate_voting_summary)[0], 1)
+
+
+# ==================== AI Streaming Tests ====================
+
+class FakeStreamingGroq(FakeGroq):
+    """FakeGroq that, asked to stream, sends its answer word by word `token_latency` seconds apart"""
+
+    def __init__(self, token_latency=0.0, **options):
+        super().__init__(**options)
+        self.token_latency = token_latency
+
+    def create(self, model, messages, stream=False, **options):
+        response = super().create(model, messages, **options)
+        if not stream:
+            return response
+        words = response.choices[0].message.content.split(' ')
+
+        def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(role='assistant'))])
+            for index, word in enumerate(words):
+                time.sleep(self.token_latency)
+                content = word if index == 0 else f' {word}'
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+        return chunks()
+
+
+def parse_event(chunk):
+    """Decode one SSE message without an id into (event, data)"""
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().splitlines())
+    return fields['event'], json.loads(fields['data'])
+
+
+@override_settings(AI_JOBS_ENABLED=False)
+class AIStreamTests(TestCase):
+    """Model tokens relayed over SSE, ending with the endpoint's usual body"""
+
+    def setUp(self):
+        cache.clear()
+        llm_cache.clear()
+        self.addCleanup(reset_llm_cache)
+        self.user = create_voter('0000001')
+        create_ballot(positions=2, candidates_per_position=2)
+        self.token = str(AccessToken.for_user(self.user))
+        self.groq = FakeStreamingGroq(token_latency=0.1)
+        patcher = mock.patch('voting_api.ai_analysis.get_groq_client', return_value=self.groq)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def stream(self, name):
+        """[(seconds since the request, event, data)] of one stream"""
+        started = time.perf_counter()
+        response = await AsyncClient().get(reverse(f'voting_api:{name}'), headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return [
+            (time.perf_counter() - started, *parse_event(chunk)) async for chunk in response.streaming_content
+        ]
+
+    async def test_tokens_arrive_before_the_completion_ends(self):
+        events = await self.stream('ai_turnout_stream')
+        tokens = [data['text'] for _, event, data in events if event == 'token']
+        self.assertEqual(tokens, ['Analysis', ' 1', ' by', ' llama-3.1-8b-instant'])
+        self.assertLess(events[0][0], events[-1][0] - 0.2)
+
+        finished, event, result = events[-1]
+        self.assertEqual(event, 'done')
+        self.assertEqual(result['turnout_analysis'], ''.join(tokens))
+        self.assertFalse(result['cached'])
+
+        # Cached now: one `done` event with the same body
+        (_, event, cached), = await self.stream('ai_turnout_stream')
+        self.assertEqual(event, 'done')
+        self.assertTrue(cached['cached'])
+        self.assertEqual(cached['turnout_analysis'], result['turnout_analysis'])
+
+    async def test_races_stream_in_ballot_order(self):
+        events = await self.stream('ai_prediction_stream')
+        text = ''.join(data['text'] for _, event, data in events if event == 'token')
+        event, result = events[-1][1:]
+        self.assertEqual(event, 'done')
+        self.assertEqual(text, result['prediction'])
+        self.assertRegex(text, r'^Position 0: Analysis \d by [^\n]+\n\nPosition 1: Analysis \d by ')
+        self.assertIn('forecast', result)
+
+    async def test_insights_tag_each_section(self):
+        events = await self.stream('ai_insights_stream')
+        sections = {data['section'] for _, event, data in events if event == 'token'}
+        self.assertEqual(sections, {'summary', 'prediction', 'turnout'})
+        event, result = events[-1][1:]
+        self.assertEqual((event, result['errors']), ('done', {}))
+
+    async def test_client_without_streaming_sends_the_whole_text(self):
+        with mock.patch('voting_api.ai_analysis.get_groq_client', return_value=FakeGroq()):
+            events = await self.stream('ai_turnout_stream')
+        self.assertEqual([event for _, event, _ in events], ['token', 'done'])
+        self.assertEqual(events[0][2]['text'], events[1][2]['turnout_analysis'])
+
+    async def test_rejects_missing_token(self):
+        response = await AsyncClient().get(reverse('voting_api:ai_summary_stream'))
+        self.assertEqual(response.status_code, 401)
+        # Access tokens are only taken from the Authorization header
+        response = await AsyncClient().get(reverse('voting_api:ai_summary_stream') + f'?token={self.token}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_buffered_fallback(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('voting_api:ai_turnout_stream'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['turnout_analysis'], 'Analysis 1 by llama-3.1-8b-instant')
+        with override_settings(AI_STREAMING_ENABLED=False):
+            self.assertTrue(client.get(reverse('voting_api:ai_turnout_stream')).json()['cached'])
+
+
+# ==================== Model Routing ====================
+
+class PerModelGroq(FakeGroq):
+    """FakeGroq that takes `latencies[model]` seconds to answer and records the models asked"""
+
+    def __init__(self, latencies, **options):
+        super().__init__(**options)
+        self.latencies = latencies
+        self.models = []
+
+    def create(self, model, messages, **options):
+        with self.lock:
+            self.models.append(model)
+        time.sleep(self.latencies.get(model, 0.0))
+        return super().create(model, messages, **options)
+
+
+ROUTES = {
+    'summary': {'model': 'big', 'budget_seconds': 0.3, 'fallback': 'small', 'fallback_budget_seconds': 2.0},
+    'turnout': {'model': 'small', 'budget_seconds': 0.3},
+}
+
+
+@override_settings(AI_JOBS_ENABLED=False, AI_MODEL_ROUTES=ROUTES)
+class ModelRoutingTests(TestCase):
+    """Each analysis type goes to its own model within a latency budget"""
+
+    def setUp(self):
+        cache.clear()
+        llm_cache.clear()
+        self.addCleanup(reset_llm_cache)
+        self.user = create_voter('0000001')
+        create_ballot(positions=2, candidates_per_position=2)
+
+    def use_groq(self, groq):
+        patcher = mock.patch('voting_api.ai_analysis.get_groq_client', return_value=groq)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return groq
+
+    def wait_for_model(self, generate, model):
+        """The cached analysis once `model`'s late answer has landed"""
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            analysis = generate(cached_only=True)
+            if analysis and analysis['model'] == model:
+                return analysis
+            time.sleep(0.05)
+        self.fail(f'No answer from {model}')
+
+    def test_each_type_uses_its_model(self):
+        groq = self.use_groq(PerModelGroq({}))
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        turnout = client.get(reverse('voting_api:ai_turnout')).json()
+        self.assertEqual((turnout['turnout_analysis'], turnout['model']), ('Analysis 1 by small', 'small'))
+        self.assertGreaterEqual(turnout['latency_ms'], 0)
+
+        insights = client.get(reverse('voting_api:ai_insights')).json()
+        self.assertEqual(insights['summary']['model'], 'big')
+        self.assertEqual(insights['prediction']['model'], settings.GROQ_MODEL)
+        self.assertEqual(insights['turnout']['model'], 'small')
+        self.assertEqual(sorted(set(groq.models)), sorted({'big', 'small', settings.GROQ_MODEL}))
+
+    @override_settings(REQUEST_TIMING_ENABLED=True, REQUEST_TIMING_SLOW_MS=10000)
+    def test_routed_calls_are_timed_in_their_request(self):
+        self.use_groq(PerModelGroq({}))
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        for name in ('voting_api:ai_summary', 'voting_api:ai_insights'):
+            header = client.get(reverse(name))['Server-Timing']
+            self.assertIn('llm', dict(entry.split(';', 1) for entry in header.split(', ')), name)
+
+    def test_slow_model_is_raced_against_the_fallback(self):
+        self.use_groq(PerModelGroq({'big': 1.5}))
+        started = time.monotonic()
+        summary = generate_voting_summary()
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(summary['model'], 'small')
+        self.assertIn('Position 0: Analysis', summary['summary'])
+        self.assertIn('by small', summary['summary'])
+        self.assertGreaterEqual(summary['latency_ms'], 300)
+
+        # The routed model's answer replaces the fallback's once it lands
+        late = self.wait_for_model(generate_voting_summary, 'big')
+        self.assertTrue(late['cached'])
+        self.assertIn('by big', late['summary'])
+        self.assertGreaterEqual(late['latency_ms'], 1500)
+
+    def test_template_when_no_model_answers_in_time(self):
+        self.use_groq(PerModelGroq({'big': 1.0, 'small': 1.0}))
+        with override_settings(AI_MODEL_ROUTES={**ROUTES, 'summary': {**ROUTES['summary'], 'fallback_budget_seconds': 0.3}}):
+            summary = generate_voting_summary()
+            turnout = generate_turnout_analysis()
+        self.assertEqual((summary['model'], turnout['model']), ('template', 'template'))
+        self.assertRegex(summary['summary'], r'^0 of 1 registered users have voted .*\n\nPosition 0: No votes have been cast yet\.')
+        self.assertEqual(turnout['turnout_analysis'], '0 of 1 registered users have voted, a turnout of 0.0%.')
+        self.assertFalse(summary['cached'])
+        # Templates are not cached; the models' answers are, once they land
+        self.assertRegex(self.wait_for_model(generate_turnout_analysis, 'small')['turnout_analysis'], r'^Analysis \d by small$')
+        self.wait_for_model(generate_voting_summary, 'big')
+
+    def test_errors_are_not_sent_to_the_fallback(self):
+        groq = self.use_groq(PerModelGroq({}, fail=True))
+        summary = generate_voting_summary()
+        self.assertTrue(summary['summary'].startswith('AI analysis error: rate limited'))
+        self.assertEqual(groq.models, ['big', 'big'])
+
+    def test_stream_follows_the_first_model_to_write(self):
+        def run(model, on_text):
+            time.sleep({'big': 1.0, 'small': 0.0}[model])
+            for word in ('from', f' {model}'):
+                on_text(word)
+            return f'from {model}'
+
+        pieces, answers = [], []
+        text, model, latency_ms = routed_completion('summary', run, pieces.append, lambda *answer: answers.append(answer[:2]))
+        self.assertEqual((text, model), ('from small', 'small'))
+        self.assertEqual(pieces, ['from', ' small'])
+        self.assertLess(latency_ms, 1000)
+        wait_for_background()
+        self.assertEqual(answers, [('from small', 'small'), ('from big', 'big')])
@@ -10,14 +10,18 @@ from .views import (
     # Positions & Candidates
     PositionListView, CandidateListView,
     # Voting
-    CastVoteView, UserVotesView, VotingStatusView,
+    CastVoteView, CastBallotView, UserVotesView, VotingStatusView,
     # Results
     VoteResultsView, PositionResultView,
     # Analytics
-    VotingStatsView, health_check
+    VotingStatsView, RaceAnalyticsView, WinForecastView, health_check
+)
+from .streams import results_stream_view, results_stream_ticket_view
+from .ai_streams import (
+    ai_summary_stream_view, ai_prediction_stream_view, ai_turnout_stream_view, ai_insights_stream_view
 )
 from .ai_views import (
-    ai_summary_view, ai_prediction_view, ai_turnout_view
+    ai_summary_view, ai_prediction_view, ai_turnout_view, ai_insights_view, ai_job_view
 )
 
 app_name = 'voting_api'
@@ -38,18 +42,29 @@ urlpatterns = [
     
     # Voting endpoints
     path('vote/', CastVoteView.as_view(), name='cast_vote'),
+    path('ballot/', CastBallotView.as_view(), name='cast_ballot'),
     path('votes/my-votes/', UserVotesView.as_view(), name='my_votes'),
     path('votes/status/', VotingStatusView.as_view(), name='voting_status'),
     
     # Results endpoints
     path('results/', VoteResultsView.as_view(), name='results'),
+    path('results/stream/', results_stream_view, name='results_stream'),
+    path('results/stream/ticket/', results_stream_ticket_view, name='results_stream_ticket'),
     path('results/<int:position_id>/', PositionResultView.as_view(), name='position_result'),
     
     # Analytics endpoints
     path('analytics/stats/', VotingStatsView.as_view(), name='stats'),
+    path('analytics/races/', RaceAnalyticsView.as_view(), name='race_analytics'),
+    path('analytics/forecast/', WinForecastView.as_view(), name='win_forecast'),
     
     # AI Analysis endpoints (lightweight Groq-based)
     path('ai/summary/', ai_summary_view, name='ai_summary'),
     path('ai/prediction/', ai_prediction_view, name='ai_prediction'),
     path('ai/turnout/', ai_turnout_view, name='ai_turnout'),
+    path('ai/insights/', ai_insights_view, name='ai_insights'),
+    path('ai/summary/stream/', ai_summary_stream_view, name='ai_summary_stream'),
+    path('ai/prediction/stream/', ai_prediction_stream_view, name='ai_prediction_stream'),
+    path('ai/turnout/stream/', ai_turnout_stream_view, name='ai_turnout_stream'),
+    path('ai/insights/stream/', ai_insights_stream_view, name='ai_insights_stream'),
+    path('ai/jobs/<uuid:job_id>/', ai_job_view, name='ai_job'),
 ]
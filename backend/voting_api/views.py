@@ -2,6 +2,7 @@
 REST API Views for AI-Enhanced Online Voting System
 Clean REST design with proper authentication and permissions
 """
+from functools import wraps
 from rest_framework import status, generics, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
@@ -9,14 +10,56 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from django.contrib.auth.models import User
-from django.db.models import Count, Q
-from .models import Profile, Position, Candidate, Vote
+from django.db import IntegrityError
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from .models import Position, Vote
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
-    ProfileSerializer, PositionSerializer, CandidateSerializer,
-    VoteSerializer, VoteResultSerializer, VotingStatsSerializer
+    VoteSerializer, CastVoteSerializer, BallotSerializer
 )
+from . import catalog, metrics
+from .ballot_status import get_voting_status, get_user_votes
+from .ingestion import journal_enabled, accept_votes, DuplicateVote
+from .analytics import DEFAULT_CONFIDENCE, analyze_races
+from .forecast import get_forecast, get_forecast_entry
+from .results import (
+    compute_position_results, compute_overall_stats, get_most_competitive_position,
+    get_results_version
+)
+
+
+def results_version_etag(request, *args, **kwargs):
+    """ETag for responses derived from the current election state"""
+    return f'"election-{get_results_version()}"'
+
+
+def require_revalidation(view_func):
+    """Let clients keep the response but revalidate it on every request"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
+
+
+def forecast_version_etag(request, *args, **kwargs):
+    """ETag for the forecast: the election state it was computed at, which may trail the current one"""
+    return f'"election-{get_forecast_entry()[0]}"'
+
+
+# Answer If-None-Match with 304 before any aggregation runs
+conditional_on_results = method_decorator([
+    require_revalidation,
+    condition(etag_func=results_version_etag)
+], name='get')
+
+conditional_on_forecast = method_decorator([
+    require_revalidation,
+    condition(etag_func=forecast_version_etag)
+], name='get')
 
 
 # ==================== Authentication Views ====================
@@ -114,35 +157,28 @@ class UserProfileView(APIView):
 
 # ==================== Position & Candidate Views ====================
 
-class PositionListView(generics.ListAPIView):
+class PositionListView(APIView):
     """
     List all active positions with their candidates
-    Used for voting page
+    Used for voting page; served from the in-memory ballot catalog
     """
     permission_classes = [IsAuthenticated]
-    serializer_class = PositionSerializer
     
-    def get_queryset(self):
+    def get(self, request):
         """Get active positions ordered by display order"""
-        return Position.objects.filter(is_active=True).prefetch_related('candidates')
+        return Response(catalog.get_positions(), status=status.HTTP_200_OK)
 
 
-class CandidateListView(generics.ListAPIView):
+class CandidateListView(APIView):
     """
     List all candidates or filter by position
     """
     permission_classes = [IsAuthenticated]
-    serializer_class = CandidateSerializer
     
-    def get_queryset(self):
+    def get(self, request):
         """Get active candidates, optionally filtered by position"""
-        queryset = Candidate.objects.filter(is_active=True).select_related('position')
-        
-        position_id = self.request.query_params.get('position', None)
-        if position_id is not None:
-            queryset = queryset.filter(position_id=position_id)
-        
-        return queryset
+        position_id = request.query_params.get('position', None)
+        return Response(catalog.get_candidates(position_id), status=status.HTTP_200_OK)
 
 
 # ==================== Voting Views ====================
@@ -150,22 +186,110 @@ class CandidateListView(generics.ListAPIView):
 class CastVoteView(APIView):
     """
     Cast a vote for a candidate
-    Validates that user hasn't already voted for this position
+    Insert-first: the unique (user, position) constraint rejects repeat
+    votes, so concurrent double-submits get a clean 409 instead of a 500
     """
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
         """Cast a vote"""
-        serializer = VoteSerializer(data=request.data, context={'request': request})
+        serializer = CastVoteSerializer(data=request.data, context={'request': request})
         
-        if serializer.is_valid():
-            vote = serializer.save()
+        if not serializer.is_valid():
+            metrics.inc('voting_vote_rejections_total', 'vote', 'invalid')
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        if journal_enabled():
+            vote = Vote(user=request.user, **serializer.validated_data)
+            try:
+                accept_votes(request.user, [vote])
+            except DuplicateVote:
+                metrics.inc('voting_vote_rejections_total', 'vote', 'duplicate')
+                return Response({
+                    'error': f"You have already voted for {vote.position.name}."
+                }, status=status.HTTP_409_CONFLICT)
+            metrics.inc('voting_votes_cast_total', 'vote', 'journal')
             return Response({
-                'message': 'Vote cast successfully',
+                'message': 'Vote accepted',
                 'vote': VoteSerializer(vote).data
-            }, status=status.HTTP_201_CREATED)
+            }, status=status.HTTP_202_ACCEPTED)
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            vote = serializer.save()
+        except IntegrityError:
+            position = serializer.validated_data['position']
+            if not Vote.objects.filter(user=request.user, position=position).exists():
+                # Not the one-vote-per-position constraint: the selection vanished mid-request
+                metrics.inc('voting_vote_rejections_total', 'vote', 'invalid')
+                return Response({
+                    'error': 'The selected candidate or position is no longer available.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            metrics.inc('voting_vote_rejections_total', 'vote', 'duplicate')
+            return Response({
+                'error': f"You have already voted for {position.name}."
+            }, status=status.HTTP_409_CONFLICT)
+        
+        metrics.inc('voting_votes_cast_total', 'vote', 'direct')
+        return Response({
+            'message': 'Vote cast successfully',
+            'vote': VoteSerializer(vote).data
+        }, status=status.HTTP_201_CREATED)
+
+
+class CastBallotView(APIView):
+    """
+    Cast votes for several positions in one request
+    All-or-nothing: any invalid selection rejects the whole ballot
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        """Submit a ballot"""
+        serializer = BallotSerializer(data=request.data, context={'request': request})
+        
+        if not serializer.is_valid():
+            metrics.inc('voting_vote_rejections_total', 'ballot', 'invalid')
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        if journal_enabled():
+            votes = serializer.validated_data['votes']
+            try:
+                accept_votes(request.user, votes)
+            except DuplicateVote as duplicate:
+                metrics.inc('voting_vote_rejections_total', 'ballot', 'duplicate')
+                return Response({
+                    'positions': {
+                        str(vote.position_id): f"You have already voted for {vote.position.name}."
+                        for vote in votes if vote.position_id in duplicate.position_ids
+                    }
+                }, status=status.HTTP_409_CONFLICT)
+            metrics.inc('voting_votes_cast_total', 'ballot', 'journal', amount=len(votes))
+            return Response({
+                'message': 'Ballot accepted',
+                'votes': VoteSerializer(votes, many=True).data
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        try:
+            votes = serializer.save()
+        except IntegrityError:
+            position_ids = [vote.position_id for vote in serializer.validated_data['votes']]
+            if not Vote.objects.filter(user=request.user, position_id__in=position_ids).exists():
+                # Not the one-vote-per-position constraint: a selection vanished mid-request
+                metrics.inc('voting_vote_rejections_total', 'ballot', 'invalid')
+                return Response({
+                    'error': 'One or more selected candidates or positions are no longer available.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            # A concurrent submission recorded one of these positions first
+            metrics.inc('voting_vote_rejections_total', 'ballot', 'duplicate')
+            return Response({
+                'error': 'You have already voted for one or more of these positions.'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        metrics.inc('voting_votes_cast_total', 'ballot', 'direct', amount=len(votes))
+        return Response({
+            'message': 'Ballot submitted successfully',
+            'votes': VoteSerializer(votes, many=True).data
+        }, status=status.HTTP_201_CREATED)
 
 
 class UserVotesView(APIView):
@@ -177,11 +301,7 @@ class UserVotesView(APIView):
     
     def get(self, request):
         """Get user's voting history"""
-        votes = Vote.objects.filter(user=request.user).select_related(
-            'candidate', 'position', 'candidate__position'
-        )
-        serializer = VoteSerializer(votes, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(get_user_votes(request.user), status=status.HTTP_200_OK)
 
 
 class VotingStatusView(APIView):
@@ -193,29 +313,12 @@ class VotingStatusView(APIView):
     
     def get(self, request):
         """Get user's voting status"""
-        voted_positions = Vote.objects.filter(
-            user=request.user
-        ).values_list('position_id', flat=True)
-        
-        all_positions = Position.objects.filter(is_active=True)
-        
-        status_data = []
-        for position in all_positions:
-            status_data.append({
-                'position_id': position.id,
-                'position_name': position.name,
-                'has_voted': position.id in voted_positions
-            })
-        
-        return Response({
-            'voting_status': status_data,
-            'total_positions': all_positions.count(),
-            'voted_count': len(voted_positions)
-        }, status=status.HTTP_200_OK)
+        return Response(get_voting_status(request.user), status=status.HTTP_200_OK)
 
 
 # ==================== Results Views ====================
 
+@conditional_on_results
 class VoteResultsView(APIView):
     """
     Get voting results for all positions
@@ -225,37 +328,15 @@ class VoteResultsView(APIView):
     
     def get(self, request):
         """Get comprehensive voting results"""
-        positions = Position.objects.all().prefetch_related('candidates')
         results = []
         
-        for position in positions:
-            candidates_data = []
-            total_votes = position.get_total_votes()
-            
-            for candidate in position.candidates.filter(is_active=True):
-                vote_count = candidate.get_vote_count()
-                percentage = candidate.get_vote_percentage()
-                
-                candidates_data.append({
-                    'id': candidate.id,
-                    'name': candidate.name,
-                    'bio': candidate.bio,
-                    'vote_count': vote_count,
-                    'percentage': percentage
-                })
-            
-            # Sort candidates by vote count (descending)
-            candidates_data.sort(key=lambda x: x['vote_count'], reverse=True)
-            
-            # Determine winner (if there are votes)
-            winner = candidates_data[0] if candidates_data and total_votes > 0 else None
-            
+        for result in compute_position_results():
             results.append({
-                'position_id': position.id,
-                'position_name': position.name,
-                'total_votes': total_votes,
-                'candidates': candidates_data,
-                'winner': winner
+                'position_id': result['position_id'],
+                'position_name': result['position_name'],
+                'total_votes': result['total_votes'],
+                'candidates': result['candidates'],
+                'winner': result['winner']
             })
         
         return Response({
@@ -264,6 +345,7 @@ class VoteResultsView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+@conditional_on_results
 class PositionResultView(APIView):
     """
     Get detailed results for a specific position
@@ -272,45 +354,28 @@ class PositionResultView(APIView):
     
     def get(self, request, position_id):
         """Get results for specific position"""
-        try:
-            position = Position.objects.get(id=position_id)
-        except Position.DoesNotExist:
+        position_results = compute_position_results(Position.objects.filter(id=position_id))
+        
+        if not position_results:
             return Response({
                 'error': 'Position not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        candidates = position.candidates.filter(is_active=True)
-        total_votes = position.get_total_votes()
-        
-        candidates_data = []
-        for candidate in candidates:
-            vote_count = candidate.get_vote_count()
-            percentage = candidate.get_vote_percentage()
-            
-            candidates_data.append({
-                'id': candidate.id,
-                'name': candidate.name,
-                'bio': candidate.bio,
-                'vote_count': vote_count,
-                'percentage': percentage
-            })
-        
-        # Sort by vote count
-        candidates_data.sort(key=lambda x: x['vote_count'], reverse=True)
-        winner = candidates_data[0] if candidates_data and total_votes > 0 else None
+        result = position_results[0]
         
         return Response({
-            'position_id': position.id,
-            'position_name': position.name,
-            'position_description': position.description,
-            'total_votes': total_votes,
-            'candidates': candidates_data,
-            'winner': winner
+            'position_id': result['position_id'],
+            'position_name': result['position_name'],
+            'position_description': result['position_description'],
+            'total_votes': result['total_votes'],
+            'candidates': result['candidates'],
+            'winner': result['winner']
         }, status=status.HTTP_200_OK)
 
 
 # ==================== Analytics Views ====================
 
+@conditional_on_results
 class VotingStatsView(APIView):
     """
     Get overall voting statistics
@@ -320,67 +385,76 @@ class VotingStatsView(APIView):
     
     def get(self, request):
         """Get comprehensive voting statistics"""
-        # Total registered users
-        total_users = User.objects.count()
+        # Registered users, unique voters, votes cast and turnout
+        overall = compute_overall_stats()
         
-        # Total unique voters
-        total_voters = Vote.objects.values('user').distinct().count()
-        
-        # Total votes cast
-        total_votes = Vote.objects.count()
-        
-        # Voter turnout percentage
-        turnout = round((total_voters / total_users * 100), 2) if total_users > 0 else 0
+        # Tallies for every position in a constant number of queries
+        position_results = compute_position_results()
+        active_results = [result for result in position_results if result['is_active']]
         
         # Positions and candidates count
-        positions_count = Position.objects.filter(is_active=True).count()
-        candidates_count = Candidate.objects.filter(is_active=True).count()
+        positions_count = len(active_results)
+        candidates_count = sum(len(result['candidates']) for result in position_results)
         
         # Most competitive position (smallest vote margin)
-        most_competitive = self._get_most_competitive_position()
+        most_competitive = get_most_competitive_position(active_results)
         
         # Votes by position
         votes_by_position = []
-        for position in Position.objects.filter(is_active=True):
+        for result in active_results:
             votes_by_position.append({
-                'position_name': position.name,
-                'vote_count': position.get_total_votes(),
-                'candidates_count': position.get_candidates_count()
+                'position_name': result['position_name'],
+                'vote_count': result['total_votes'],
+                'candidates_count': result['candidates_count']
             })
         
         return Response({
-            'total_registered_users': total_users,
-            'total_voters': total_voters,
-            'total_votes_cast': total_votes,
-            'voter_turnout_percentage': turnout,
+            'total_registered_users': overall['total_users'],
+            'total_voters': overall['total_voters'],
+            'total_votes_cast': overall['total_votes'],
+            'voter_turnout_percentage': overall['turnout'],
             'positions_count': positions_count,
             'candidates_count': candidates_count,
             'most_competitive_position': most_competitive,
             'votes_by_position': votes_by_position
         }, status=status.HTTP_200_OK)
+
+
+@conditional_on_results
+class RaceAnalyticsView(APIView):
+    """
+    Margins, vote shares, confidence intervals and competitiveness for every
+    active position, computed locally (no AI call)
+    Optional ?confidence= between 0.5 and 0.999 (default 0.95)
+    """
+    permission_classes = [IsAuthenticated]
     
-    def _get_most_competitive_position(self):
-        """Find position with smallest vote margin between top 2 candidates"""
-        positions = Position.objects.filter(is_active=True)
-        min_margin = float('inf')
-        most_competitive = None
-        
-        for position in positions:
-            candidates = position.candidates.filter(is_active=True)
-            if candidates.count() < 2:
-                continue
-            
-            # Get vote counts for top 2 candidates
-            vote_counts = [c.get_vote_count() for c in candidates]
-            vote_counts.sort(reverse=True)
-            
-            if len(vote_counts) >= 2:
-                margin = vote_counts[0] - vote_counts[1]
-                if margin < min_margin:
-                    min_margin = margin
-                    most_competitive = position.name
+    def get(self, request):
+        """Get race analytics"""
+        try:
+            confidence = float(request.query_params.get('confidence', DEFAULT_CONFIDENCE))
+        except ValueError:
+            confidence = None
+        if confidence is None or not 0.5 <= confidence <= 0.999:
+            return Response({
+                'error': 'confidence must be a number between 0.5 and 0.999.'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        return most_competitive
+        position_results = compute_position_results(Position.objects.filter(is_active=True))
+        return Response(analyze_races(position_results, confidence), status=status.HTTP_200_OK)
+
+
+@conditional_on_forecast
+class WinForecastView(APIView):
+    """
+    Simulated win probabilities and expected final shares for every active
+    position, given the registered users who have not voted yet (no AI call)
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """Get the win-probability forecast"""
+        return Response(get_forecast(), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -3,6 +3,11 @@ ASGI config for voting_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve through an ASGI server (e.g. ``uvicorn voting_backend.asgi:application``)
+so the live results stream at /api/results/stream/ can hold many open
+connections on a single event loop, and the AI endpoints' /stream/ variants
+can relay model tokens as they arrive.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
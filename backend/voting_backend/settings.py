@@ -44,12 +44,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'voting_api.instrumentation.RequestTimingMiddleware',  # No-op unless REQUEST_TIMING_ENABLED
+    'voting_api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'voting_api.profiling.ProfilingMiddleware',  # No-op unless PROFILING_ENABLED
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,6 +85,18 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent vote casts queue on
+            # the busy timeout instead of failing with "database is locked".
+            # transaction_mode and init_command need Django 5.1+ (requirements.txt)
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
+        'TEST': {
+            # File-backed test database so concurrency tests get real connections
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -131,7 +146,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'voting_api.instrumentation.TimedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -176,3 +191,112 @@ CORS_ALLOW_CREDENTIALS = True
 # Groq API settings (for AI analysis)
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')  # Set this in .env file
 GROQ_MODEL = 'llama-3.3-70b-versatile'  # Updated model for analysis
+GROQ_FAST_MODEL = os.environ.get('GROQ_FAST_MODEL', 'llama-3.1-8b-instant')  # Small model for short or late answers
+GROQ_BASE_URL = os.environ.get('GROQ_BASE_URL', 'https://api.groq.com')
+GROQ_CONNECT_TIMEOUT = 5.0          # Seconds to establish a connection
+GROQ_READ_TIMEOUT = 30.0            # Seconds to wait for response data
+GROQ_MAX_RETRIES = 2                # SDK retries after timeouts, connection errors, 429 and 5xx
+GROQ_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failed calls that open the circuit breaker
+GROQ_BREAKER_RESET_SECONDS = 30.0   # How long the breaker fails fast before a trial call
+
+# Generated AI analyses are cached per process under a fingerprint of their inputs
+AI_CACHE_TTL_SECONDS = 600          # Oldest analysis served without asking the model again
+AI_CACHE_MAX_ENTRIES = 128          # Least recently used analyses are dropped beyond this
+AI_FRAGMENT_CACHE_MAX_ENTRIES = 1024  # Per-race answers behind the summary and prediction
+AI_STALE_TTL_SECONDS = 86400        # Oldest last-good analysis served while Groq is failing
+
+# Uncached analyses run as background jobs (202 Accepted + /api/ai/jobs/<id>/ polling)
+AI_JOBS_ENABLED = True
+AI_JOB_WORKERS = 4                  # Concurrent Groq calls per process
+AI_JOB_TIMEOUT_SECONDS = 120        # In-flight jobs older than this are treated as lost
+AI_JOB_RETENTION_SECONDS = 3600     # Finished jobs are deleted this long after finishing
+AI_INSIGHTS_TIMEOUT_SECONDS = 30    # Per-call limit for the concurrent calls behind /api/ai/insights/
+AI_STREAMING_ENABLED = True         # /api/ai/*/stream/ relay tokens over SSE (ASGI); False: buffered answers
+
+# Summary and prediction are asked race by race and stitched together; each race's
+# answer is reused until its tally changes. Ballots with more than AI_MAX_FRAGMENTS
+# races are asked in that many groups of consecutive races instead. A race whose
+# prompt does not fit AI_PROMPT_TOKEN_BUDGET lists only its top candidates (the rest
+# folded into one line); a group that still does not fit is split until it does
+AI_PROMPT_TOKEN_BUDGET = 3000       # Estimated tokens per prompt
+AI_PROMPT_TOP_CANDIDATES = 5        # Candidates listed per race once its prompt is compacted
+AI_FRAGMENT_WORKERS = 4             # Concurrent per-race calls per analysis
+AI_MAX_FRAGMENTS = 16               # Model calls per summary or prediction (unless prompts need splitting)
+
+# Model per analysis type. A model that has not answered (or started streaming)
+# within budget_seconds is raced against the fallback, given fallback_budget_seconds
+# (default: budget_seconds); past both, the figures are returned as a template.
+# A missing model is GROQ_MODEL; without a budget the model is simply awaited
+AI_MODEL_ROUTES = {
+    'summary': {'budget_seconds': 8.0, 'fallback': GROQ_FAST_MODEL},
+    'prediction': {'budget_seconds': 12.0, 'fallback': GROQ_FAST_MODEL},
+    'turnout': {'model': GROQ_FAST_MODEL, 'budget_seconds': 3.0},
+}
+
+# Win-probability forecast (/api/analytics/forecast/ and the AI prediction data):
+# Monte Carlo runs over the votes still outstanding, cached per election-state version.
+# The defaults keep a forecast well under 100 ms (about 30 ms for 6 positions x 4 candidates)
+FORECAST_SIMULATIONS = int(os.environ.get('FORECAST_SIMULATIONS', '20000'))
+FORECAST_MAX_CELLS = 500_000        # Runs x candidates in open races; larger ballots get fewer runs (reported)
+FORECAST_REFRESH_SECONDS = 5        # A forecast is reused this long after a vote before it is recomputed
+FORECAST_RACE_CACHE_MAX_ENTRIES = 1024  # Per-race results reused until that race's tally changes
+
+# Live results stream (Server-Sent Events, served under ASGI)
+RESULTS_STREAM_POLL_SECONDS = 1.0        # How often each process checks the election-state version
+RESULTS_STREAM_HEARTBEAT_SECONDS = 15    # Keep-alive comment interval for idle streams
+RESULTS_STREAM_MAX_SECONDS = 300         # Streams end after this; EventSource reconnects with Last-Event-ID
+RESULTS_STREAM_HISTORY = 500             # Deltas kept per process for Last-Event-ID resume
+RESULTS_STREAM_TICKET_SECONDS = 60       # How long a ?ticket= from /api/results/stream/ticket/ can open a stream
+
+# Vote ingestion: 'direct' inserts each vote in the request; 'journal' appends
+# accepted votes to a durable local journal and a flusher thread moves them into
+# the Vote table in batches (run `manage.py replay_vote_journal` after a crash)
+VOTE_INGESTION_MODE = os.environ.get('VOTE_INGESTION_MODE', 'direct')
+VOTE_JOURNAL_PATH = BASE_DIR / 'vote_journal.sqlite3'
+VOTE_JOURNAL_FLUSH_INTERVAL = 0.5   # Seconds between flusher passes
+VOTE_JOURNAL_BATCH_SIZE = 500       # Votes per bulk insert
+VOTE_JOURNAL_LEASE_SECONDS = 30     # Claimed entries are reclaimable after this
+VOTE_JOURNAL_RETENTION_SECONDS = 300  # Flushed entries are pruned after this (the Vote table takes over)
+
+# Cache (per-user ballot status). The default is per-process; entries are keyed by
+# the election-state version in the database, so a vote handled by another worker
+# still retires them. A shared cache such as django.core.cache.backends.redis.RedisCache
+# (CACHE_BACKEND/CACHE_LOCATION) lets workers share the entries themselves
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+BALLOT_STATUS_CACHE_SECONDS = 300   # Upper bound on how long a voter's cached status can live
+BALLOT_CATALOG_CHECK_SECONDS = 5    # How often a process confirms its in-memory ballot catalog is current
+
+# Request timing: Server-Timing header (db, auth, view, render, llm, total) on every
+# response and a structured log line for requests slower than the threshold
+REQUEST_TIMING_ENABLED = os.environ.get('REQUEST_TIMING', '') == '1'
+REQUEST_TIMING_SLOW_MS = float(os.environ.get('REQUEST_TIMING_SLOW_MS', '500'))
+
+# Prometheus metrics at /metrics/. Each worker process writes its values to its own
+# file in METRICS_DIR and scrapes sum them; files of exited processes are folded into
+# retired.json, so the totals survive restarts without a file per process lifetime
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / 'metrics'))
+METRICS_FLUSH_SECONDS = 1.0
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # Scrapes send "Authorization: Bearer <token>"; unset = DEBUG only
+
+# Staff-only request profiling: ?profile=1 (or an "X-Profile: 1" header) saves a
+# cProfile .prof file to PROFILING_DIR, ?profile=download returns it instead
+PROFILING_ENABLED = os.environ.get('PROFILING', '') == '1'
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_KEEP = 50                 # Newest profiles kept on disk
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'voting_api.slow_requests': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
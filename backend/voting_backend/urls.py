@@ -4,8 +4,10 @@ AI-Enhanced Online Voting System Using Django REST and React
 """
 from django.contrib import admin
 from django.urls import path, include
+from voting_api.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('voting_api.urls')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -17,28 +17,53 @@ const AIInsights = () => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const [activeTab, setActiveTab] = useState('summary');
+  // Text streamed so far for each tab while its analysis is being generated
+  const [drafts, setDrafts] = useState({});
+
+  const appendDraft = (section, text) => {
+    setDrafts((current) => ({ ...current, [section]: (current[section] || '') + text }));
+  };
 
   useEffect(() => {
-    if (activeTab === 'summary' && !summary) {
-      fetchSummary();
-    } else if (activeTab === 'prediction' && !prediction) {
-      fetchPrediction();
-    } else if (activeTab === 'turnout' && !turnout) {
-      fetchTurnout();
+    fetchInsights();
+  }, []);
+
+  // All three analyses in one request; the tabs' buttons refresh them individually
+  const fetchInsights = async () => {
+    try {
+      setLoading(true);
+      setError('');
+      setDrafts({});
+      const data = await aiService.streamAnalysis('insights', (text, section) => appendDraft(section, text));
+      if (data.summary) setSummary({ ...data.summary, data: data.data });
+      if (data.prediction) setPrediction({ ...data.prediction, data: data.data });
+      if (data.turnout) setTurnout(data.turnout);
+      const failed = Object.keys(data.errors || {});
+      if (failed.length > 0) {
+        setError(`Some analyses could not be generated (${failed.join(', ')}). Use the buttons below to retry.`);
+      }
+    } catch (err) {
+      setError('Failed to generate AI insights. Make sure Groq API key is configured.');
+      console.error(err);
+    } finally {
+      setLoading(false);
+      setDrafts({});
     }
-  }, [activeTab]);
+  };
 
   const fetchSummary = async () => {
     try {
       setLoading(true);
       setError('');
-      const data = await aiService.getSummary();
+      setDrafts({});
+      const data = await aiService.streamAnalysis('summary', (text) => appendDraft('summary', text));
       setSummary(data);
     } catch (err) {
       setError('Failed to generate AI summary. Make sure Groq API key is configured.');
       console.error(err);
     } finally {
       setLoading(false);
+      setDrafts({});
     }
   };
 
@@ -46,13 +71,15 @@ const AIInsights = () => {
     try {
       setLoading(true);
       setError('');
-      const data = await aiService.getPrediction();
+      setDrafts({});
+      const data = await aiService.streamAnalysis('prediction', (text) => appendDraft('prediction', text));
       setPrediction(data);
     } catch (err) {
       setError('Failed to generate AI prediction. Make sure Groq API key is configured.');
       console.error(err);
     } finally {
       setLoading(false);
+      setDrafts({});
     }
   };
 
@@ -60,13 +87,15 @@ const AIInsights = () => {
     try {
       setLoading(true);
       setError('');
-      const data = await aiService.getTurnoutAnalysis();
+      setDrafts({});
+      const data = await aiService.streamAnalysis('turnout', (text) => appendDraft('turnout', text));
       setTurnout(data);
     } catch (err) {
       setError('Failed to generate turnout analysis. Make sure Groq API key is configured.');
       console.error(err);
     } finally {
       setLoading(false);
+      setDrafts({});
     }
   };
 
@@ -117,7 +146,17 @@ const AIInsights = () => {
                   }
                 >
                   <div className="p-4">
-                    {loading ? (
+                    {loading && drafts.summary ? (
+                      <div className="ai-insights-box mb-4">
+                        <div className="markdown-content">
+                          <ReactMarkdown>{drafts.summary}</ReactMarkdown>
+                        </div>
+                        <small className="text-muted">
+                          <span className="spinner-border spinner-border-sm me-2" role="status"></span>
+                          Writing...
+                        </small>
+                      </div>
+                    ) : loading ? (
                       <LoadingSpinner message="Generating AI summary..." />
                     ) : summary ? (
                       <>
@@ -194,7 +233,17 @@ const AIInsights = () => {
                   }
                 >
                   <div className="p-4">
-                    {loading ? (
+                    {loading && drafts.prediction ? (
+                      <div className="ai-insights-box mb-4">
+                        <div className="markdown-content">
+                          <ReactMarkdown>{drafts.prediction}</ReactMarkdown>
+                        </div>
+                        <small className="text-muted">
+                          <span className="spinner-border spinner-border-sm me-2" role="status"></span>
+                          Writing...
+                        </small>
+                      </div>
+                    ) : loading ? (
                       <LoadingSpinner message="Analyzing competition..." />
                     ) : prediction ? (
                       <>
@@ -261,7 +310,17 @@ const AIInsights = () => {
                   }
                 >
                   <div className="p-4">
-                    {loading ? (
+                    {loading && drafts.turnout ? (
+                      <div className="ai-insights-box mb-4">
+                        <div className="markdown-content">
+                          <ReactMarkdown>{drafts.turnout}</ReactMarkdown>
+                        </div>
+                        <small className="text-muted">
+                          <span className="spinner-border spinner-border-sm me-2" role="status"></span>
+                          Writing...
+                        </small>
+                      </div>
+                    ) : loading ? (
                       <LoadingSpinner message="Analyzing turnout..." />
                     ) : turnout ? (
                       <>
@@ -303,6 +362,10 @@ const AIInsights = () => {
                           <div className="markdown-content">
                             <ReactMarkdown>{turnout.turnout_analysis}</ReactMarkdown>
                           </div>
+                          <small className="text-muted">
+                            <i className="bi bi-cpu me-1"></i>
+                            Analysis by {turnout.model}
+                          </small>
                         </div>
 
                         <div className="text-end">
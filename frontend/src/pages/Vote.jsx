@@ -103,10 +103,64 @@ const Vote = () => {
     }
   };
 
+  const handleBallotSubmit = async () => {
+    const votes = Object.entries(selectedCandidates)
+      .filter(([positionId]) => !votingStatus[positionId])
+      .map(([positionId, candidateId]) => ({
+        position: Number(positionId),
+        candidate: candidateId,
+      }));
+
+    if (votes.length === 0) {
+      setError('Please select at least one candidate');
+      return;
+    }
+
+    try {
+      setSubmitting(true);
+      setError('');
+
+      await votingService.castBallot(votes);
+
+      setSuccess(`Ballot submitted: ${votes.length} ${votes.length === 1 ? 'vote' : 'votes'} cast!`);
+
+      // Update voting status
+      const newStatus = { ...votingStatus };
+      votes.forEach(vote => {
+        newStatus[vote.position] = true;
+      });
+      setVotingStatus(newStatus);
+      setSelectedCandidates({});
+
+      // Refresh data
+      setTimeout(() => {
+        fetchVotingData();
+        setSuccess('');
+      }, 2000);
+
+    } catch (err) {
+      const positionErrors = err.response?.data?.positions;
+      const errorMsg = positionErrors
+        ? positions
+            .filter(pos => positionErrors[pos.id])
+            .map(pos => `${pos.name}: ${positionErrors[pos.id]}`)
+            .join(' ')
+        : err.response?.data?.votes ||
+          err.response?.data?.error ||
+          'Failed to submit ballot';
+      setError(errorMsg);
+    } finally {
+      setSubmitting(false);
+    }
+  };
+
   if (loading) return <LoadingSpinner message="Loading voting positions..." />;
 
   // Check if all positions are voted
   const allVoted = positions.every(pos => votingStatus[pos.id]);
+  const pendingSelections = positions.filter(
+    pos => !votingStatus[pos.id] && selectedCandidates[pos.id]
+  ).length;
 
   return (
     <>
@@ -238,6 +292,20 @@ const Vote = () => {
             );
           })}
 
+          {!allVoted && positions.length > 1 && (
+            <div className="mb-4 text-end">
+              <Button
+                variant="success"
+                size="lg"
+                onClick={handleBallotSubmit}
+                disabled={pendingSelections === 0 || submitting}
+              >
+                <i className="bi bi-send-check me-2"></i>
+                Submit Ballot ({pendingSelections} {pendingSelections === 1 ? 'selection' : 'selections'})
+              </Button>
+            </div>
+          )}
+
           {positions.length === 0 && (
             <Alert variant="info">
               <i className="bi bi-info-circle me-2"></i>
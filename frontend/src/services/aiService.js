@@ -1,8 +1,116 @@
 /**
  * AI Analysis Service
  * Handles AI-powered insights using Groq API
+ * Analyses that are not cached yet come back as 202 Accepted with a job id;
+ * the job is polled until the analysis is ready. The streaming variants show
+ * the text while the model writes it, falling back to the buffered endpoints
  */
-import api from './api';
+import api, { API_BASE_URL } from './api';
+
+const POLL_INTERVAL_MS = 1000;
+const POLL_TIMEOUT_MS = 120000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Poll a background AI job until it finishes
+ * @param {string} jobId - Job id from the 202 response
+ * @returns {Promise} The analysis the endpoint would have returned
+ */
+async function waitForJob(jobId) {
+  const deadline = Date.now() + POLL_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    await sleep(POLL_INTERVAL_MS);
+    const { data: job } = await api.get(`/ai/jobs/${jobId}/`);
+    if (job.status === 'succeeded') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'AI analysis failed');
+    }
+  }
+  throw new Error('AI analysis timed out');
+}
+
+/**
+ * Fetch an AI endpoint, waiting for its background job when needed
+ * @param {string} url - AI endpoint path
+ * @returns {Promise} Analysis data
+ */
+async function getAnalysis(url) {
+  const response = await api.get(url);
+  if (response.status === 202) {
+    return waitForJob(response.data.job_id);
+  }
+  return response.data;
+}
+
+/**
+ * Read server-sent events from a fetch response
+ * @param {Response} response - text/event-stream response
+ * @yields {{event: string, data: Object}} Parsed messages
+ */
+async function* readEvents(response) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+      const message = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const fields = {};
+      message.split('\n').forEach((line) => {
+        const separator = line.indexOf(': ');
+        if (separator > 0) fields[line.slice(0, separator)] = line.slice(separator + 2);
+      });
+      if (fields.event && fields.data) {
+        yield { event: fields.event, data: JSON.parse(fields.data) };
+      }
+    }
+  }
+}
+
+/**
+ * Stream an AI endpoint, passing text to onText as the model writes it
+ * Answers that are not streamed (WSGI server, streaming disabled, expired
+ * token) are handled like getAnalysis()
+ * @param {string} url - AI endpoint path
+ * @param {Function} onText - Called with each piece of text (and the section, for insights)
+ * @returns {Promise} Analysis data, as the buffered endpoint returns it
+ */
+async function streamAnalysis(url, onText) {
+  let response;
+  try {
+    response = await fetch(`${API_BASE_URL}${url}stream/`, {
+      headers: {
+        Authorization: `Bearer ${localStorage.getItem('access_token')}`,
+        Accept: 'text/event-stream',
+      },
+    });
+  } catch (err) {
+    return getAnalysis(url);
+  }
+  const type = response.headers.get('Content-Type') || '';
+  if (!response.ok || !type.startsWith('text/event-stream')) {
+    if (response.status === 200 && type.startsWith('application/json')) {
+      return response.json();
+    }
+    if (response.status === 202) {
+      return waitForJob((await response.json()).job_id);
+    }
+    return getAnalysis(url);
+  }
+  for await (const { event, data } of readEvents(response)) {
+    if (event === 'token') onText(data.text, data.section);
+    if (event === 'done') return data;
+    if (event === 'error') throw new Error(data.detail || data.error);
+  }
+  throw new Error('AI stream ended early');
+}
 
 const aiService = {
   /**
@@ -10,8 +118,7 @@ const aiService = {
    * @returns {Promise} AI summary with voting insights
    */
   async getSummary() {
-    const response = await api.get('/ai/summary/');
-    return response.data;
+    return getAnalysis('/ai/summary/');
   },
 
   /**
@@ -19,8 +126,7 @@ const aiService = {
    * @returns {Promise} AI prediction analysis
    */
   async getPrediction() {
-    const response = await api.get('/ai/prediction/');
-    return response.data;
+    return getAnalysis('/ai/prediction/');
   },
 
   /**
@@ -28,8 +134,26 @@ const aiService = {
    * @returns {Promise} Turnout analysis
    */
   async getTurnoutAnalysis() {
-    const response = await api.get('/ai/turnout/');
-    return response.data;
+    return getAnalysis('/ai/turnout/');
+  },
+
+  /**
+   * Get summary, prediction and turnout analysis in one request
+   * Sections that failed are null, with the reason in `errors`
+   * @returns {Promise} Combined insights
+   */
+  async getInsights() {
+    return getAnalysis('/ai/insights/');
+  },
+
+  /**
+   * Stream an analysis while it is generated
+   * @param {string} kind - summary, prediction, turnout or insights
+   * @param {Function} onText - Called with each piece of text (and the section, for insights)
+   * @returns {Promise} The analysis the buffered endpoint would return
+   */
+  async streamAnalysis(kind, onText) {
+    return streamAnalysis(`/ai/${kind}/`, onText);
   },
 };
 
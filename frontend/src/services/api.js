@@ -5,7 +5,7 @@
 import axios from 'axios';
 
 // Base URL for API (Django backend)
-const API_BASE_URL = 'http://127.0.0.1:8000/api';
+export const API_BASE_URL = 'http://127.0.0.1:8000/api';
 
 // Create axios instance with default config
 const api = axios.create({
@@ -75,6 +75,20 @@ const votingService = {
     return response.data;
   },
 
+  /**
+   * Cast votes for several positions in one request (all-or-nothing)
+   * @param {Array} votes - [{ position, candidate }, ...]
+   * @returns {Promise} Ballot confirmation
+   */
+  async castBallot(votes) {
+    const response = await api.post('/ballot/', { votes });
+    // Clear relevant caches after voting
+    cache.clear('votingStatus');
+    cache.clear('myVotes');
+    cache.clear('stats');
+    return response.data;
+  },
+
   /**
    * Get user's voting history
    * @returns {Promise} List of user's votes